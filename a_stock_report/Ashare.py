@@ -1,29 +1,184 @@
 #-*- coding:utf-8 -*-    --------------Ashare 股票行情数据双核心版( https://github.com/mpquant/Ashare ) 
-import json,requests,datetime;      import pandas as pd  #
+import json,requests,datetime,threading,time,os,importlib.util;      import pandas as pd;      import numpy as np  #
+from collections import deque, Counter;    from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit;    from requests.adapters import HTTPAdapter;    from urllib3.util.retry import Retry
+
+#---交易日历(可选)---  按结束日期精确计算需要多取的K线根数；首次用到时才加载，导入Ashare本身不依赖scripts包
+_calendar_loader=None                             #None未加载，False加载失败(不再重试)
+
+def _trade_calendar():                            #先按包导入scripts.trade_calendar，scripts不在sys.path上时按Ashare.py同级scripts/目录的文件加载，都不可用返回None
+    global _calendar_loader
+    if _calendar_loader is None:
+        try:    from scripts.trade_calendar import get_calendar
+        except ImportError:
+            try:
+                spec=importlib.util.spec_from_file_location('_ashare_trade_calendar',os.path.join(os.path.dirname(os.path.abspath(__file__)),'scripts','trade_calendar.py'))
+                module=importlib.util.module_from_spec(spec);   spec.loader.exec_module(module);   get_calendar=module.get_calendar
+            except (ImportError,OSError): get_calendar=False          #文件缺失或缺少yaml等依赖：退回按自然日估算
+        _calendar_loader=get_calendar
+    return _calendar_loader() if _calendar_loader else None
+
+#---HTTP连接池---  每个后端host一个keep-alive会话，复用TCP连接，避免每次请求重新握手
+HOSTS={'tx_day':'http://web.ifzq.gtimg.cn', 'tx_min':'http://ifzq.gtimg.cn', 'sina':'http://money.finance.sina.com.cn',   #后端地址(压测时可指向本地桩服务)
+       'tx_qt':'http://qt.gtimg.cn', 'sina_hq':'http://hq.sinajs.cn'}
+HTTP_OPTIONS={'pool_size':32, 'timeout':(3.05,10), 'retries':3, 'backoff':0.3, 'host_concurrency':8}   #每host连接数, (连接,读取)超时秒, 重试次数, 指数退避系数, 每host并发上限
+_sessions={};   _sessions_lock=threading.Lock()
+
+def set_http_options(**options):                  #修改连接池参数，已建立的会话全部关闭重建
+    unknown=set(options)-set(HTTP_OPTIONS)
+    if unknown: raise ValueError(f'未知的HTTP参数: {sorted(unknown)}')
+    with _sessions_lock:
+        HTTP_OPTIONS.update(options)
+        for s in _sessions.values(): s.close()
+        _sessions.clear()
+
+def get_session(host):                            #按host懒创建会话，线程安全
+    with _sessions_lock:
+        s=_sessions.get(host)
+        if s is None:
+            retry=Retry(total=HTTP_OPTIONS['retries'], backoff_factor=HTTP_OPTIONS['backoff'], status_forcelist=(429,500,502,503,504), allowed_methods=('GET',))
+            adapter=HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_OPTIONS['pool_size'], max_retries=retry)
+            s=_sessions[host]=requests.Session();     s.mount('http://',adapter);     s.mount('https://',adapter)
+            s.host_slots=threading.BoundedSemaphore(HTTP_OPTIONS['host_concurrency'])       #每host并发信号量
+        return s
+
+def http_get(url, **kwargs):                      #所有行情后端统一的GET入口
+    kwargs.setdefault('timeout',HTTP_OPTIONS['timeout'])
+    s=get_session(urlsplit(url).netloc)
+    with s.host_slots:   r=s.get(url,**kwargs)             #同一host的并发请求数不超过host_concurrency
+    r.raise_for_status();     return r
+
+#---后端路由---  按各后端近期延迟与错误率把请求发给当前最快的健康后端，替代固定的"新浪失败再腾讯"
+ROUTER_OPTIONS={'window':100, 'min_samples':5, 'max_error_rate':0.5, 'probe_every':50,    #滚动窗口请求数, 估计p95(对冲阈值)所需最少样本, 判定不健康的错误率, 每N次把末位后端提前探测
+                'hedge':False, 'hedge_quantile':0.95, 'hedge_workers':32}                  #超过首选后端p95仍未返回时是否对下一后端发对冲请求
+
+class BackendRouter:
+    def __init__(self):
+        self.lock=threading.Lock();    self._pool=None;    self.reset()
+
+    def reset(self):                              #清空统计(修改ROUTER_OPTIONS后调用)
+        with self.lock:
+            self.latency={};  self.outcome={};  self.calls=0;  self.hedges={'fired':0,'won':0}
+            self.served={}                        #{代码: 最近一次返回数据的后端}，供诊断
+            
+    def record(self, backend, elapsed, ok):       #记录一次请求：成功的计入延迟，成败都计入错误率
+        with self.lock:
+            n=ROUTER_OPTIONS['window']
+            self.outcome.setdefault(backend,deque(maxlen=n)).append(ok)
+            if ok: self.latency.setdefault(backend,deque(maxlen=n)).append(elapsed)
+
+    def quantile(self, backend, q, min_samples=None):      #近期成功请求的延迟分位数(秒)，样本数不足min_samples(默认取配置)返回None
+        with self.lock: xs=sorted(self.latency.get(backend,()))
+        return xs[min(int(q*len(xs)),len(xs)-1)] if xs and len(xs)>=(min_samples or ROUTER_OPTIONS['min_samples']) else None
+
+    def error_rate(self, backend):
+        with self.lock: xs=list(self.outcome.get(backend,()))
+        return 1-sum(xs)/len(xs) if xs else 0.0
+
+    def healthy(self, backend): return self.error_rate(backend)<=ROUTER_OPTIONS['max_error_rate']
+
+    def rank(self, backends):                     #健康的在前、按延迟中位数升序；还没有样本的视为0先采样，同分保持传入顺序
+        p50={b:self.quantile(b,0.5,min_samples=1) for b in backends}
+        order=sorted(backends,key=lambda b:(not self.healthy(b), p50[b] or 0.0))
+        with self.lock:
+            self.calls+=1;   probe=ROUTER_OPTIONS['probe_every'] and self.calls%ROUTER_OPTIONS['probe_every']==0
+        return order[-1:]+order[:-1] if probe and len(order)>1 else order    #定期探测末位后端，慢/故障后端恢复后能重新被选中
+
+    def _timed(self, backend, fn):
+        t=time.perf_counter()
+        try:    result=fn()
+        except Exception:
+            self.record(backend,time.perf_counter()-t,False);   raise
+        self.record(backend,time.perf_counter()-t,True);    return result
+
+    def _serve(self, key, backend):
+        with self.lock:
+            for code in ([key] if isinstance(key,str) else key): self.served[code]=backend
+
+    def call(self, key, candidates):              #candidates: {后端名: 无参取数函数}，按排名依次尝试，返回第一个成功的结果；key为代码或代码列表
+        order=self.rank(list(candidates))
+        if ROUTER_OPTIONS['hedge'] and len(order)>1: return self._hedged(key,order,candidates)
+        error=None
+        for backend in order:
+            try:    result=self._timed(backend,candidates[backend])
+            except Exception as e:                #失败则换下一个后端，全部失败抛出最后一个异常
+                error=e;    continue
+            self._serve(key,backend);    return result
+        raise error
+
+    def _hedged(self, key, order, candidates):    #首选后端超过其p95仍未返回时对下一后端发同样请求，取先成功的；落败请求在后台完成并计入统计
+        with self.lock:
+            if self._pool is None: self._pool=ThreadPoolExecutor(max_workers=ROUTER_OPTIONS['hedge_workers'],thread_name_prefix='hedge')
+        rest=list(order);   pending={};   error=None;   hedged=False
+        def launch():
+            backend=rest.pop(0);   pending[self._pool.submit(self._timed,backend,candidates[backend])]=backend
+        launch();   delay=self.quantile(order[0],ROUTER_OPTIONS['hedge_quantile'])      #首选后端样本不足时不对冲
+        while pending:
+            done,_=wait(pending,timeout=delay if rest else None,return_when=FIRST_COMPLETED)
+            if not done:
+                launch();   hedged=True
+                with self.lock: self.hedges['fired']+=1
+                continue
+            for future in done:
+                backend=pending.pop(future)
+                try:    result=future.result()
+                except Exception as e:
+                    error=e;    continue
+                if hedged and backend!=order[0]:
+                    with self.lock: self.hedges['won']+=1
+                self._serve(key,backend);    return result
+            if rest: launch()                     #有请求失败：立即改用下一个后端
+        raise error
+
+    def summary(self):                            #各后端请求数/错误率/延迟分位数，对冲次数，各后端服务的代码数
+        ms=lambda x: None if x is None else round(x*1000,1)
+        with self.lock: backends=sorted(self.outcome)
+        stats={b:{'requests':len(self.outcome[b]), 'error_rate':round(self.error_rate(b),3), 'healthy':self.healthy(b),
+                  'p50_ms':ms(self.quantile(b,0.5)), 'p95_ms':ms(self.quantile(b,0.95))} for b in backends}
+        with self.lock: return {'backends':stats, 'hedges':dict(self.hedges), 'served':dict(Counter(self.served.values()))}
+
+ROUTER=BackendRouter()
+
+def served_by(code):                              #该代码最近一次由哪个后端返回
+    with ROUTER.lock: return ROUTER.served.get(_xcode(code))
+
+#---K线解析---  响应直接写入预分配的数值数组和int64纳秒时间戳，只构造一次DataFrame，不经过object列与逐列astype
+KLINE_DTYPE='float64'                             #价格/成交量列的数值类型，内存敏感时可设为'float32'
+SINA_FIELDS=itemgetter('open','high','low','close','volume')
+
+def _epoch_ns(stamps):                            #时间串 -> int64纳秒时间戳：'YYYY-MM-DD[ HH:MM:SS]'由numpy解析，腾讯分钟线'YYYYmmddHHMM'按数位拆分
+    if not stamps or '-' in stamps[0]: return np.array(stamps,dtype='datetime64[ns]').view('int64')
+    v=np.array(stamps,dtype='int64')
+    months=((v//10**8-1970)*12+v//10**6%100-1).astype('datetime64[M]')
+    days=months.astype('datetime64[D]').view('int64')+v//10**4%100-1
+    return days*86_400_000_000_000+(v//100%100*3600+v%100*60)*1_000_000_000
+
+def _kline_frame(stamps, rows, columns):          #rows: 每根K线按columns顺序的数值字段(字符串或数字)，numpy直接解析进预分配数组
+    values=np.empty((len(rows),len(columns)),dtype=KLINE_DTYPE)
+    if len(rows): values[:]=rows
+    index=pd.DatetimeIndex(_epoch_ns(stamps).view('datetime64[ns]'),name='')
+    return pd.DataFrame(values,index=index,columns=columns,copy=False)
 
 #---腾讯日线---  2025-12-21日正常使用
 def get_price_day_tx(code, end_date='', count=10, frequency='1d'):     #日线获取  
     unit='week' if frequency in '1w' else 'month' if frequency in '1M' else 'day'     #判断日线，周线，月线
     if end_date:  end_date=end_date.strftime('%Y-%m-%d') if isinstance(end_date,datetime.date) else end_date.split(' ')[0]
     end_date='' if end_date==datetime.datetime.now().strftime('%Y-%m-%d') else end_date   #如果日期今天就变成空    
-    URL=f'http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={code},{unit},,{end_date},{count},qfq'     
-    st= json.loads(requests.get(URL).content);    ms='qfq'+unit;      stk=st['data'][code]   
+    URL=f'{HOSTS["tx_day"]}/appstock/app/fqkline/get?param={code},{unit},,{end_date},{count},qfq'     
+    st= json.loads(http_get(URL).content);    ms='qfq'+unit;      stk=st['data'][code]   
     buf=stk[ms] if ms in stk else stk[unit]       #指数返回不是qfqday,是day
-    df=pd.DataFrame(buf,columns=['time','open','close','high','low','volume'],dtype='float')     
-    df.time=pd.to_datetime(df.time);    df.set_index(['time'], inplace=True);   df.index.name=''          #处理索引 
-    return df
+    return _kline_frame([r[0] for r in buf],[r[1:6] for r in buf],['open','close','high','low','volume'])    #除权日的行带第7个分红字段，只取前6个
 
 #腾讯分钟线
 def get_price_min_tx(code, end_date=None, count=10, frequency='1d'):    #分钟线获取 
     ts=int(frequency[:-1]) if frequency[:-1].isdigit() else 1           #解析K线周期数
     if end_date: end_date=end_date.strftime('%Y-%m-%d') if isinstance(end_date,datetime.date) else end_date.split(' ')[0]        
-    URL=f'http://ifzq.gtimg.cn/appstock/app/kline/mkline?param={code},m{ts},,{count}' 
-    st= json.loads(requests.get(URL).content);       buf=st['data'][code]['m'+str(ts)] 
-    df=pd.DataFrame(buf,columns=['time','open','close','high','low','volume','n1','n2'])   
-    df=df[['time','open','close','high','low','volume']]    
-    df[['open','close','high','low','volume']]=df[['open','close','high','low','volume']].astype('float')
-    df.time=pd.to_datetime(df.time);   df.set_index(['time'], inplace=True);   df.index.name=''          #处理索引     
-    df['close'][-1]=float(st['data'][code]['qt'][code][3])                #最新基金数据是3位的
+    URL=f'{HOSTS["tx_min"]}/appstock/app/kline/mkline?param={code},m{ts},,{count}' 
+    st= json.loads(http_get(URL).content);       buf=st['data'][code]['m'+str(ts)] 
+    df=_kline_frame([r[0] for r in buf],[r[1:6] for r in buf],['open','close','high','low','volume'])
+    if df.empty: return df                        #无分钟数据(停牌/代码错误)直接返回空表
+    df.iloc[-1,df.columns.get_loc('close')]=float(st['data'][code]['qt'][code][3])     #最新基金数据是3位的
     return df
 
 
@@ -33,31 +188,88 @@ def get_price_sina(code, end_date='', count=10, frequency='60m'):    #新浪全
     ts=int(frequency[:-1]) if frequency[:-1].isdigit() else 1       #解析K线周期数
     if (end_date!='') & (frequency in ['240m','1200m','7200m']): 
         end_date=pd.to_datetime(end_date) if not isinstance(end_date,datetime.date) else end_date    #转换成datetime
-        unit=4 if frequency=='1200m' else 29 if frequency=='7200m' else 1    #4,29多几个数据不影响速度
-        count=count+(datetime.datetime.now()-end_date).days//unit            #结束时间到今天有多少天自然日(肯定 >交易日)        
-        #print(code,end_date,count)    
-    URL=f'http://money.finance.sina.com.cn/quotes_service/api/json_v2.php/CN_MarketData.getKLineData?symbol={code}&scale={ts}&ma=5&datalen={count}' 
-    dstr= json.loads(requests.get(URL).content);       
-    #df=pd.DataFrame(dstr,columns=['day','open','high','low','close','volume'],dtype='float') 
-    df= pd.DataFrame(dstr,columns=['day','open','high','low','close','volume'])
-    df['open'] = df['open'].astype(float); df['high'] = df['high'].astype(float);                          #转换数据类型
-    df['low'] = df['low'].astype(float);   df['close'] = df['close'].astype(float);  df['volume'] = df['volume'].astype(float)    
-    df.day=pd.to_datetime(df.day);    df.set_index(['day'], inplace=True);     df.index.name=''            #处理索引                 
+        calendar=_trade_calendar()
+        if calendar is not None:                                             #结束日期之后到今天恰好有多少根日/周/月K线
+            count=count+calendar.bars_between(end_date,datetime.datetime.now(),{'240m':'1d','1200m':'1w','7200m':'1M'}[frequency])
+        else:
+            unit=4 if frequency=='1200m' else 29 if frequency=='7200m' else 1    #4,29多几个数据不影响速度
+            count=count+(datetime.datetime.now()-end_date).days//unit            #结束时间到今天有多少天自然日(肯定 >交易日)        
+    URL=f'{HOSTS["sina"]}/quotes_service/api/json_v2.php/CN_MarketData.getKLineData?symbol={code}&scale={ts}&ma=5&datalen={count}' 
+    dstr= json.loads(http_get(URL).content) or []                                     #无数据时新浪返回null
+    df=_kline_frame([d['day'] for d in dstr],list(map(SINA_FIELDS,dstr)),['open','high','low','close','volume'])
     if (end_date!='') & (frequency in ['240m','1200m','7200m']): return df[df.index<=end_date][-mcount:]   #日线带结束时间先返回              
     return df
 
+def _xcode(code):                                                            #证券代码编码兼容处理 600519.XSHG->sh600519
+    xcode= code.replace('.XSHG','').replace('.XSHE','')
+    return 'sh'+xcode if ('XSHG' in code)  else  'sz'+xcode  if ('XSHE' in code)  else code
+
 def get_price(code, end_date='',count=10, frequency='1d', fields=[]):        #对外暴露只有唯一函数，这样对用户才是最友好的  
-    xcode= code.replace('.XSHG','').replace('.XSHE','')                      #证券代码编码兼容处理 
-    xcode='sh'+xcode if ('XSHG' in code)  else  'sz'+xcode  if ('XSHE' in code)  else code     
+    xcode=_xcode(code)
 
-    if  frequency in ['1d','1w','1M']:   #1d日线  1w周线  1M月线
-         try:    return get_price_sina( xcode, end_date=end_date,count=count,frequency=frequency)   #主力
-         except: return get_price_day_tx(xcode,end_date=end_date,count=count,frequency=frequency)   #备用                    
+    if  frequency in ['1d','1w','1M']:   #1d日线  1w周线  1M月线，新浪/腾讯由路由按延迟与健康度选择
+         return ROUTER.call(xcode,{'sina':  lambda: get_price_sina( xcode,end_date=end_date,count=count,frequency=frequency),
+                                   'tx_day':lambda: get_price_day_tx(xcode,end_date=end_date,count=count,frequency=frequency)})
     
     if  frequency in ['1m','5m','15m','30m','60m']:  #分钟线 ,1m只有腾讯接口  5分钟5m   60分钟60m
-         if frequency in '1m': return get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)
-         try:    return get_price_sina(  xcode,end_date=end_date,count=count,frequency=frequency)   #主力   
-         except: return get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)   #备用
+         if frequency in '1m': return ROUTER.call(xcode,{'tx_min':lambda: get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)})
+         return ROUTER.call(xcode,{'sina':  lambda: get_price_sina(  xcode,end_date=end_date,count=count,frequency=frequency),
+                                   'tx_min':lambda: get_price_min_tx(xcode,end_date=end_date,count=count,frequency=frequency)})
+
+#多股票并发获取：线程池并发调用get_price，后端路由逐只生效，每host并发受host_concurrency限制
+def get_price_many(codes, end_date='', count=10, frequency='1d', fields=[], max_workers=16, long_format=False, errors=None, fetcher=None):
+    dfs={};   fetcher=fetcher or get_price            #fetcher: 单只取数函数，签名同get_price(可传入 PriceMemo.get_price / KlineStore.get_price 走缓存)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures={pool.submit(fetcher,code,end_date=end_date,count=count,frequency=frequency,fields=fields):code for code in dict.fromkeys(codes)}
+        for future in as_completed(futures):
+            code=futures[future]
+            try:    dfs[code]=future.result()
+            except Exception as e:                 #传入errors字典时逐只记录异常，否则直接抛出
+                if errors is None: raise
+                errors[code]=e
+    dfs={code:dfs[code] for code in codes if dfs.get(code) is not None}      #按输入顺序返回
+    if not long_format: return dfs                                           #{code: DataFrame}
+    if not dfs: return pd.DataFrame(columns=['open','close','high','low','volume'])
+    return pd.concat(dfs,names=['code','time'])                              #长表，索引(code,time)
+
+#---全市场快照---  一次请求批量取数百只股票的实时行情，替代逐只请求K线
+SNAPSHOT_COLUMNS=['name','price','prev_close','open','high','low','volume','amount','change_pct','volume_ratio','turnover','pe','pb','mcap']
+TX_QT_FIELDS={'name':1,'price':3,'prev_close':4,'open':5,'volume':6,'change_pct':32,'high':33,'low':34,'amount':37,'turnover':38,'pe':39,'mcap':45,'pb':46,'volume_ratio':49}   #腾讯qt字段位置
+
+def _quote_lines(text, prefix):                   #解析 prefix+code="a~b~c"; 格式，返回[(code,字段串)]，空行情(停牌/代码错误)跳过
+    rows=[line.strip().split('="',1) for line in text.split(';') if '="' in line]
+    return [(k[len(prefix):],v.rstrip('"')) for k,v in rows if k.startswith(prefix) and len(v)>1]
+
+def _drop_suspended(df):                          #停牌/无效行：现价缺失或为0，或盘中他股已成交而本股成交量为0(腾讯此时给出的是昨收)
+    traded=df['volume']>0
+    keep=(df['price']>0) & (traded | ~traded.any())
+    return df[keep]
+
+def get_snapshot_tx(codes):                       #腾讯批量行情，量单位手→股、额单位万元→元，含量比/换手/PE/PB/总市值(亿)
+    text=http_get(f'{HOSTS["tx_qt"]}/q='+','.join(codes)).content.decode('gbk',errors='replace')
+    rows=[(code,v.split('~')) for code,v in _quote_lines(text,'v_')];    rows=[(code,f) for code,f in rows if len(f)>max(TX_QT_FIELDS.values())]
+    df=pd.DataFrame([[f[i] for i in TX_QT_FIELDS.values()] for _,f in rows],index=[code for code,_ in rows],columns=list(TX_QT_FIELDS))
+    num=[c for c in TX_QT_FIELDS if c!='name'];     df[num]=df[num].apply(pd.to_numeric,errors='coerce').astype(float)
+    df['volume']*=100;     df['amount']*=10000
+    return _drop_suspended(df).reindex(columns=SNAPSHOT_COLUMNS)
+
+def get_snapshot_sina(codes):                     #新浪批量行情(备用)，无量比/估值字段，涨跌幅由现价与昨收计算
+    text=http_get(f'{HOSTS["sina_hq"]}/list='+','.join(codes),headers={'Referer':'https://finance.sina.com.cn'}).content.decode('gbk',errors='replace')
+    rows=[(code,v.split(',')) for code,v in _quote_lines(text,'var hq_str_')];    rows=[(code,f) for code,f in rows if len(f)>=10]
+    df=pd.DataFrame([f[:10] for _,f in rows],index=[code for code,_ in rows],columns=['name','open','prev_close','price','high','low','bid','ask','volume','amount'])
+    num=['open','prev_close','price','high','low','volume','amount'];     df[num]=df[num].apply(pd.to_numeric,errors='coerce').astype(float)
+    df['change_pct']=(df['price']/df['prev_close']-1)*100
+    return _drop_suspended(df).reindex(columns=SNAPSHOT_COLUMNS)
+
+def get_snapshot(codes, batch=300, max_workers=8):      #全市场快照：按batch分组并发请求，腾讯/新浪由路由选择，返回以代码为索引的一张表
+    xcodes=list(dict.fromkeys(_xcode(code) for code in codes))
+    def fetch(group):
+        return ROUTER.call(group,{'tx_qt':lambda: get_snapshot_tx(group), 'sina_hq':lambda: get_snapshot_sina(group)})   #腾讯字段更全，同分时优先
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames=list(pool.map(fetch,[xcodes[i:i+batch] for i in range(0,len(xcodes),batch)]))
+    df=pd.concat(frames) if frames else pd.DataFrame(columns=SNAPSHOT_COLUMNS)
+    df=df[~df.index.duplicated()];     df.index.name='code'
+    return df.reindex([c for c in xcodes if c in df.index])               #按输入顺序，缺失(停牌/无效代码)的不返回
         
 if __name__ == '__main__':    
     df=get_price('sh000001',frequency='1d',count=10)      #支持'1d'日, '1w'周, '1M'月  
@@ -66,5 +278,9 @@ if __name__ == '__main__':
     df=get_price('000001.XSHG',frequency='15m',count=10)  #支持'1m','5m','15m','30m','60m'
     print('上证指数分钟线\n',df)
 
+    df=get_snapshot(['sh000001','sz399001','sz399006'])   #批量实时行情，一次请求可取数百只
+    print('指数快照\n',df)
+    print('后端路由统计\n',ROUTER.summary())
+
 # Ashare 股票行情数据( https://github.com/mpquant/Ashare ) 
 
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+回测压测 - A股深度优化日报系统v2.0.0
+功能：在合成的多年日线面板上测量 run_backtest 全部子策略×持有期的耗时，并校验分块并行与单块结果一致
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.backtest import run_backtest
+from synthetic import synthetic_bars, synthetic_universe
+
+
+def synthetic_panels(n_stocks: int, n_days: int):
+    """直接按列填充 时间×股票 面板，避免先拼接长表"""
+    universe = synthetic_universe(n_stocks)
+    index = synthetic_bars('sh000001', '1d', n_days).index
+    panels = {field: np.empty((n_days, n_stocks)) for field in ('close', 'high', 'volume')}
+    for col, code in enumerate(universe['code']):
+        bars = synthetic_bars(code, '1d', n_days)
+        for field, values in panels.items():
+            values[:, col] = bars[field].to_numpy()
+    panels = {field: pd.DataFrame(values, index=index, columns=universe['code']) for field, values in panels.items()}
+    static = universe.set_index('code')[['industry']].assign(
+        concepts=[['芯片', 'AI'] if i % 3 else ['军工'] for i in range(n_stocks)],
+        pe=np.linspace(5, 40, n_stocks), pb=1.0, roe=12.0, dividend_yield=4.0, us_correlation=0.9)
+    return panels, synthetic_bars('sh000001', '1d', n_days)['close'], static
+
+
+def main():
+    parser = argparse.ArgumentParser(description='run_backtest 耗时')
+    parser.add_argument('--stocks', type=int, default=1000)
+    parser.add_argument('--years', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunk-size', type=int, default=250)
+    parser.add_argument('--verify', action='store_true', help='同时单进程单块运行并比对结果')
+    parser.add_argument('--json', help='结果写入的JSON文件路径')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    n_days = int(args.years * 250)
+    start = time.perf_counter()
+    panels, benchmark, static = synthetic_panels(args.stocks, n_days)
+    build_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = run_backtest(panels, benchmark, static, chunk_size=args.chunk_size, max_workers=args.workers)
+    backtest_s = time.perf_counter() - start
+    stock_days = args.stocks * n_days
+    print(f"{args.stocks} 只 × {n_days} 日  生成数据 {build_s:.1f}s  回测 {backtest_s:.2f}s  "
+          f"({stock_days / backtest_s / 1e6:.2f} M 股票日/秒, {len(results)} 个子策略×持有期)")
+
+    identical = None
+    if args.verify:
+        reference = run_backtest(panels, benchmark, static, chunk_size=n_days, max_workers=1)
+        columns = ['trades', 'win_rate', 'avg_return', 'max_drawdown']
+        # 分块预热长度有限，RSI平滑残差可能让极少数恰在阈值上的信号翻转，按相对误差比较
+        identical = bool(np.allclose(results[columns].to_numpy(float), reference[columns].to_numpy(float),
+                                     equal_nan=True, rtol=1e-3, atol=1e-6))
+        print(f"分块结果与单块一致(相对误差<0.1%): {identical}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'stocks': args.stocks, 'days': n_days, 'backtest_s': backtest_s,
+                       'stock_days_per_s': stock_days / backtest_s, 'identical': identical},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分类器压测 - A股深度优化日报系统v2.0.0
+功能：在合成股票池上对比逐行逐关键词匹配与预编译多模式匹配、逐只逐策略打分与矩阵打分的耗时，
+     并校验两者输出完全一致
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.stock_classifier import StockClassifier
+from scripts.tag_store import TagStore
+from synthetic import synthetic_universe
+
+
+def legacy_classify(classifier: StockClassifier, stocks_df: pd.DataFrame) -> pd.DataFrame:
+    """原实现：iterrows 逐行，对每个概念/行业的每个关键词做子串判断"""
+    results = []
+    for _, row in stocks_df.iterrows():
+        stock_info = row.to_dict()
+        results.append({
+            'stock_code': row.get('code', ''),
+            'concepts': classifier.classify_stock_concepts(stock_info),
+            'industries': classifier.classify_stock_industry(stock_info),
+        })
+    return pd.DataFrame(results)
+
+
+def legacy_scores(classifier: StockClassifier, classified: pd.DataFrame) -> np.ndarray:
+    """原实现：每只股票对每个策略调用一次 calculate_strategy_match_score"""
+    strategies = list(classifier.strategy_mapping)
+    return np.array([[classifier.calculate_strategy_match_score(concepts, industries, strategy)
+                      for strategy in strategies]
+                     for concepts, industries in zip(classified['concepts'], classified['industries'])])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='StockClassifier 批量分类耗时对比')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000])
+    parser.add_argument('--json', help='结果写入的JSON文件路径')
+    args = parser.parse_args()
+
+    classifier = StockClassifier()
+    results = {}
+    for size in args.sizes:
+        universe = synthetic_universe(size)
+
+        start = time.perf_counter()
+        legacy = legacy_classify(classifier, universe)
+        legacy_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        concept_matrix, industry_matrix = classifier.classify_membership(universe)
+        matrix_s = time.perf_counter() - start
+
+        batch = classifier.classify_stocks_batch(universe)
+        identical = (legacy['concepts'].tolist() == batch['concepts'].tolist()
+                     and legacy['industries'].tolist() == batch['industries'].tolist())
+        if not identical:
+            raise AssertionError(f'{size} 只股票的分类结果与原实现不一致')
+
+        start = time.perf_counter()
+        legacy_score = legacy_scores(classifier, legacy)
+        legacy_score_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = classifier.score_strategies(concept_matrix, industry_matrix)
+        score_s = time.perf_counter() - start
+        if not np.allclose(scores.to_numpy(), legacy_score, atol=1e-6):
+            raise AssertionError(f'{size} 只股票的策略匹配度与原实现不一致')
+
+        # 增量分类：标签缓存已有全部股票，模拟次日约0.2%的股票主营描述变化
+        store_dir = tempfile.mkdtemp()
+        TagStore(store_dir).membership(universe, classifier)
+        changed = universe.copy()
+        rows = changed.index[::500]
+        changed.loc[rows, 'business'] = changed.loc[rows, 'business'] + '、AI服务器'
+        store = TagStore(store_dir)
+        start = time.perf_counter()
+        cached_concepts, cached_industries = store.membership(changed, classifier)
+        incremental_s = time.perf_counter() - start
+        fresh_concepts, fresh_industries = classifier.classify_membership(changed)
+        shutil.rmtree(store_dir)
+        if not (cached_concepts.equals(fresh_concepts) and cached_industries.equals(fresh_industries)):
+            raise AssertionError(f'{size} 只股票的增量分类结果与全量分类不一致')
+
+        results[size] = {'legacy_s': legacy_s, 'matcher_s': matrix_s, 'speedup': legacy_s / matrix_s,
+                         'legacy_score_s': legacy_score_s, 'score_s': score_s,
+                         'score_speedup': legacy_score_s / score_s,
+                         'incremental_s': incremental_s, 'reclassified': store.stats['classified'],
+                         'identical': identical}
+        print(f"{size:6d} 只  原实现 {legacy_s:7.3f}s  预编译匹配 {matrix_s:7.3f}s  "
+              f"加速 {legacy_s / matrix_s:5.1f}x  输出一致: {identical}")
+        print(f"{'':9s}逐只打分 {legacy_score_s:7.3f}s  矩阵打分 {score_s:7.3f}s  "
+              f"加速 {legacy_score_s / score_s:5.1f}x")
+        print(f"{'':9s}增量分类 {incremental_s:7.3f}s  重新匹配 {store.stats['classified']} 只")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+连接池压测 - A股深度优化日报系统v2.0.0
+功能：在本地桩服务上对比 Ashare 各后端在有/无keep-alive连接池时的单只股票取数延迟
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ashare
+from stub_server import StubServer
+
+FETCHERS = {
+    'sina': lambda code, count: Ashare.get_price_sina(code, count=count, frequency='1d'),
+    'tx_day': lambda code, count: Ashare.get_price_day_tx(code, count=count, frequency='1d'),
+    'tx_min': lambda code, count: Ashare.get_price_min_tx(code, count=count, frequency='5m'),
+}
+
+
+@contextmanager
+def without_pool():
+    """临时把 Ashare.http_get 换成每次新建连接的裸 requests.get"""
+    pooled = Ashare.http_get
+
+    def bare_get(url, **kwargs):
+        kwargs.setdefault('timeout', Ashare.HTTP_OPTIONS['timeout'])
+        response = requests.get(url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    Ashare.http_get = bare_get
+    try:
+        yield
+    finally:
+        Ashare.http_get = pooled
+
+
+def measure(fetch, codes, count) -> dict:
+    """逐只取数，返回单只延迟统计（毫秒）"""
+    latencies = []
+    for code in codes:
+        start = time.perf_counter()
+        fetch(code, count)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        'symbols': len(codes),
+        'mean_ms': statistics.fmean(latencies),
+        'median_ms': statistics.median(latencies),
+        'p95_ms': latencies[int(0.95 * (len(latencies) - 1))],
+        'total_s': sum(latencies) / 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Ashare 连接池延迟对比')
+    parser.add_argument('--symbols', type=int, default=300, help='每个后端请求的股票数量')
+    parser.add_argument('--count', type=int, default=60, help='每只股票的K线数量')
+    parser.add_argument('--connect-delay', type=float, default=0.005,
+                        help='桩服务每个新连接的附加延迟（秒），模拟握手开销')
+    parser.add_argument('--json', help='结果写入的JSON文件路径')
+    args = parser.parse_args()
+
+    codes = [f'sh{600000 + i:06d}' for i in range(args.symbols)]
+    results = {}
+    with StubServer(connect_delay=args.connect_delay) as server:
+        Ashare.HOSTS.update(server.hosts())
+        for backend, fetch in FETCHERS.items():
+            with without_pool():
+                bare = measure(fetch, codes, args.count)
+            Ashare.set_http_options()        # 清空会话，连接池从冷启动开始计时
+            pooled = measure(fetch, codes, args.count)
+            results[backend] = {'no_pool': bare, 'pool': pooled,
+                                'speedup': bare['total_s'] / pooled['total_s']}
+            print(f"{backend:7s} 无连接池 中位数 {bare['median_ms']:7.2f}ms p95 {bare['p95_ms']:7.2f}ms | "
+                  f"连接池 中位数 {pooled['median_ms']:7.2f}ms p95 {pooled['p95_ms']:7.2f}ms | "
+                  f"加速 {results[backend]['speedup']:.2f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
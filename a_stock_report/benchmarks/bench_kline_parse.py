@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线解析微基准 - A股深度优化日报系统v2.0.0
+功能：在录制好的新浪/腾讯K线响应上，对比原先 object DataFrame + 逐列astype 的解析方式
+     与 Ashare 现在直接解析进预分配数组的方式，只计解析耗时、不含网络
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ashare
+from stub_server import StubServer
+
+FETCHERS = {
+    'sina': lambda code, count: Ashare.get_price_sina(code, count=count, frequency='1d'),
+    'tx_day': lambda code, count: Ashare.get_price_day_tx(code, count=count, frequency='1d'),
+    'tx_min': lambda code, count: Ashare.get_price_min_tx(code, count=count, frequency='5m'),
+}
+
+
+def legacy_sina(content: bytes, code: str) -> pd.DataFrame:
+    """改动前 get_price_sina 的解析部分"""
+    dstr = json.loads(content)
+    df = pd.DataFrame(dstr, columns=['day', 'open', 'high', 'low', 'close', 'volume'])
+    for column in ['open', 'high', 'low', 'close', 'volume']:
+        df[column] = df[column].astype(float)
+    df.day = pd.to_datetime(df.day)
+    df.set_index(['day'], inplace=True)
+    df.index.name = ''
+    return df
+
+
+def legacy_tx_day(content: bytes, code: str) -> pd.DataFrame:
+    """改动前 get_price_day_tx 的解析部分"""
+    stk = json.loads(content)['data'][code]
+    buf = stk['qfqday'] if 'qfqday' in stk else stk['day']
+    df = pd.DataFrame(buf, columns=['time', 'open', 'close', 'high', 'low', 'volume'])
+    df[['open', 'close', 'high', 'low', 'volume']] = df[['open', 'close', 'high', 'low', 'volume']].astype('float')
+    df.time = pd.to_datetime(df.time)
+    df.set_index(['time'], inplace=True)
+    df.index.name = ''
+    return df
+
+
+def legacy_tx_min(content: bytes, code: str) -> pd.DataFrame:
+    """改动前 get_price_min_tx 的解析部分"""
+    st = json.loads(content)
+    df = pd.DataFrame(st['data'][code]['m5'], columns=['time', 'open', 'close', 'high', 'low', 'volume', 'n1', 'n2'])
+    df = df[['time', 'open', 'close', 'high', 'low', 'volume']]
+    df[['open', 'close', 'high', 'low', 'volume']] = df[['open', 'close', 'high', 'low', 'volume']].astype('float')
+    df.time = pd.to_datetime(df.time)
+    df.set_index(['time'], inplace=True)
+    df.index.name = ''
+    df.iloc[-1, df.columns.get_loc('close')] = float(st['data'][code]['qt'][code][3])
+    return df
+
+
+LEGACY = {'sina': legacy_sina, 'tx_day': legacy_tx_day, 'tx_min': legacy_tx_min}
+
+
+def _request_key(url: str) -> str:
+    """去掉host的请求路径，回放时与桩服务端口无关"""
+    parts = urlsplit(url)
+    return f'{parts.path}?{parts.query}'
+
+
+def record(codes, count) -> dict:
+    """从本地桩服务逐只取数，录制原始响应 {'count': K线数, 'payloads': {后端: {代码: [请求路径, 响应正文]}}}"""
+    recorded = {backend: {} for backend in FETCHERS}
+    original = Ashare.http_get
+    with StubServer() as server:
+        Ashare.HOSTS.update(server.hosts())
+        for backend, fetch in FETCHERS.items():
+            for code in codes:
+                def recording_get(url, **kwargs):
+                    response = original(url, **kwargs)
+                    recorded[backend][code] = [_request_key(url), response.content.decode('utf-8')]
+                    return response
+                Ashare.http_get = recording_get
+                try:
+                    fetch(code, count)
+                finally:
+                    Ashare.http_get = original
+    return {'count': count, 'payloads': recorded}
+
+
+@contextmanager
+def replay(payloads: dict):
+    """临时把 Ashare.http_get 换成按请求路径返回录制正文"""
+    original = Ashare.http_get
+    Ashare.http_get = lambda url, **kwargs: SimpleNamespace(content=payloads[_request_key(url)])
+    try:
+        yield
+    finally:
+        Ashare.http_get = original
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线响应解析耗时对比')
+    parser.add_argument('--symbols', type=int, default=200, help='每个后端录制的股票数量')
+    parser.add_argument('--count', type=int, default=500, help='录制时每只股票的K线数量')
+    parser.add_argument('--repeat', type=int, default=5, help='重复次数，取最快一次')
+    parser.add_argument('--payloads', help='录制文件：存在则直接读取（可放入真实接口的响应），否则录制后写入')
+    parser.add_argument('--json', help='结果写入的JSON文件路径')
+    args = parser.parse_args()
+
+    if args.payloads and os.path.exists(args.payloads):
+        with open(args.payloads, 'r', encoding='utf-8') as f:
+            recorded = json.load(f)
+    else:
+        recorded = record([f'sh{600000 + i:06d}' for i in range(args.symbols)], args.count)
+        if args.payloads:
+            with open(args.payloads, 'w', encoding='utf-8') as f:
+                json.dump(recorded, f, ensure_ascii=False)
+
+    results = {}
+    count = recorded['count']
+    for backend, entries in recorded['payloads'].items():
+        payloads = {key: content.encode('utf-8') for key, content in entries.values()}
+        contents = [(code, payloads[key]) for code, (key, _) in entries.items()]
+        with replay(payloads):
+            for code, content in contents:
+                old, new = LEGACY[backend](content, code), FETCHERS[backend](code, count)
+                if not (np.allclose(old.to_numpy(), new.to_numpy()) and (old.index == new.index).all()):
+                    raise AssertionError(f'{backend} {code} 新旧解析结果不一致')
+            legacy_s = best_of(lambda: [LEGACY[backend](content, code) for code, content in contents], args.repeat)
+            array_s = best_of(lambda: [FETCHERS[backend](code, count) for code, _ in contents], args.repeat)
+        bars = sum(len(LEGACY[backend](content, code)) for code, content in contents)
+        results[backend] = {'payloads': len(contents), 'bars': bars, 'legacy_s': legacy_s, 'array_s': array_s,
+                            'speedup': legacy_s / array_s}
+        print(f"{backend:7s} {len(contents)}个响应 {bars}根K线 | 原解析 {legacy_s * 1000:8.1f}ms | "
+              f"数组解析 {array_s * 1000:8.1f}ms | 加速 {legacy_s / array_s:.2f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准结果比较 - A股深度优化日报系统v2.0.0
+功能：比较两次 run_benchmarks.py 的JSON结果，逐规模逐阶段列出耗时变化，
+     任一阶段耗时超过阈值时以非零状态退出，便于在提交之间发现性能回退
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(base: dict, head: dict, threshold: float, min_seconds: float):
+    """
+    Args:
+        base: 基线结果
+        head: 新结果
+        threshold: 允许的耗时增幅，0.15 表示慢15%以上算回退
+        min_seconds: 基线耗时低于该值的阶段只列出不判定，避免计时噪声误报
+
+    Returns:
+        (比较行列表, 回退行列表)，每行为 (规模, 阶段, 基线耗时, 新耗时, 比值)
+    """
+    rows, regressions = [], []
+    for size, stages in head['sizes'].items():
+        base_stages = base['sizes'].get(size, {})
+        for name, stage in stages.items():
+            if name not in base_stages:
+                rows.append((size, name, None, stage['wall_s'], None))
+                continue
+            before, after = base_stages[name]['wall_s'], stage['wall_s']
+            ratio = after / before if before else None
+            row = (size, name, before, after, ratio)
+            rows.append(row)
+            if ratio is not None and before >= min_seconds and ratio > 1 + threshold:
+                regressions.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='比较两次基准测试结果')
+    parser.add_argument('base', help='基线结果JSON')
+    parser.add_argument('head', help='新结果JSON')
+    parser.add_argument('--threshold', type=float, default=0.15, help='允许的耗时增幅')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='低于该耗时的阶段不判定回退')
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    print(f"基线 {base.get('revision')} ({base.get('created_at')})  ->  新 {head.get('revision')} ({head.get('created_at')})")
+    rows, regressions = compare(base, head, args.threshold, args.min_seconds)
+    for size, name, before, after, ratio in rows:
+        if before is None:
+            print(f"  {size:>6} {name:28s}        新增  {after:8.3f}s")
+            continue
+        mark = ' <- 回退' if (size, name, before, after, ratio) in regressions else ''
+        ratio_text = f"{ratio:6.2f}x" if ratio is not None else '     -'
+        print(f"  {size:>6} {name:28s} {before:8.3f}s -> {after:8.3f}s  {ratio_text}{mark}")
+
+    if regressions:
+        print(f"{len(regressions)} 个阶段耗时增幅超过 {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
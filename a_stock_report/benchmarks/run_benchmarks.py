@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全流程基准测试 - A股深度优化日报系统v2.0.0
+功能：在 1k/5k/50k 只股票的合成股票池上逐阶段计时（取数走本地桩服务），
+     结果写成JSON，配合 compare_benchmarks.py 比较两次提交之间的回退
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ashare
+from scripts.cross_analyzer import CrossAnalyzer
+from scripts.enhanced_report_generator import EnhancedReportGenerator
+from scripts.indicators import compute_indicators
+from scripts.instrumentation import RunManifest
+from scripts.sharded_pipeline import ShardedRunner, run_stages
+from scripts.stock_classifier import StockClassifier
+from scripts.strategy_refiner import StrategyRefiner
+from scripts.tag_store import TagStore
+from stub_server import StubServer
+from synthetic import synthetic_universe
+
+DEFAULT_SIZES = [1000, 5000, 50000]
+
+
+def random_panels(codes, n_days: int, seed: int = 0):
+    """
+    向量化生成 时间×股票 的日线面板（几何随机游走），50k只股票也只需一两秒
+
+    Returns:
+        ({'close','high','volume': DataFrame}, 基准收盘价Series)
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=n_days)
+    market = rng.normal(0, 0.012, n_days)
+    returns = market[:, None] * rng.uniform(0.5, 1.5, len(codes)) + rng.normal(0, 0.02, (n_days, len(codes)))
+    close = 10 * np.exp(np.cumsum(returns, axis=0))
+    high = close * (1 + np.abs(rng.normal(0, 0.01, close.shape)))
+    volume = np.floor(rng.lognormal(14, 0.6, close.shape))
+    panels = {name: pd.DataFrame(values, index=index, columns=codes)
+              for name, values in (('close', close), ('high', high), ('volume', volume))}
+    return panels, pd.Series(3000 * np.exp(np.cumsum(market)), index=index)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def bench_size(size: int, args, server: StubServer) -> dict:
+    """在一个规模上依次执行各阶段，返回运行清单"""
+    universe = synthetic_universe(size)
+    codes = universe['code'].tolist()
+    manifest = RunManifest(f'benchmark_{size}')
+    rng = np.random.default_rng(size)
+
+    # 取数：全市场快照 + 部分股票的日线（均来自桩服务）；先预热一遍让桩服务缓存响应，只计客户端请求与解析
+    fetch_codes = codes[:args.fetch_symbols]
+    Ashare.get_snapshot(codes)
+    Ashare.get_price_many(fetch_codes, count=args.days, frequency='1d')
+    with manifest.stage('fetch_snapshot') as stage:
+        snapshot = Ashare.get_snapshot(codes)
+        stage.rows_in, stage.rows_out = size, len(snapshot)
+    with manifest.stage('fetch_klines') as stage:
+        bars = Ashare.get_price_many(fetch_codes, count=args.days, frequency='1d')
+        stage.rows_in, stage.rows_out = len(fetch_codes), sum(len(df) for df in bars.values())
+
+    classifier = StockClassifier()
+    with manifest.stage('classification') as stage:
+        classified = classifier.classify_stocks_batch(universe)
+        stage.rows_in, stage.rows_out = size, len(classified)
+
+    # 增量分类：标签缓存已有全部股票，约0.2%的主营描述变化
+    store_dir = tempfile.mkdtemp()
+    try:
+        TagStore(store_dir).membership(universe, classifier)
+        changed = universe.copy()
+        rows = changed.index[::500]
+        changed.loc[rows, 'business'] = changed.loc[rows, 'business'] + '、AI服务器'
+        store = TagStore(store_dir)
+        with manifest.stage('classification_incremental') as stage:
+            store.membership(changed, classifier)
+            stage.rows_in, stage.rows_out = size, store.stats['classified']
+    finally:
+        shutil.rmtree(store_dir)
+
+    panels, benchmark = random_panels(codes, args.days, seed=size)
+    with manifest.stage('indicators') as stage:
+        indicators = compute_indicators(panels, benchmark)
+        stage.rows_in, stage.rows_out = size * args.days, len(indicators)
+
+    market = universe.set_index('code').join(snapshot[['change_pct', 'pe', 'pb', 'volume_ratio']])
+    market = market.assign(roe=rng.uniform(-5, 30, size), dividend_yield=rng.uniform(0, 6, size),
+                           us_correlation=rng.uniform(0, 1, size))
+    refiner = StrategyRefiner()
+    with manifest.stage('refinement') as stage:
+        refined = refiner.refine_universe(market.join(indicators[indicators.columns.difference(market.columns)]),
+                                          use_names=True)
+        stage.rows_in, stage.rows_out = size, int(refined.to_numpy().sum())
+
+    strategies = list(classifier.strategy_mapping)
+    stocks = pd.DataFrame({
+        'code': classified['stock_code'], 'name': classified['stock_name'], 'industry': universe['industry'],
+        'concepts': classified['concepts'], 'industries': classified['industries'],
+        'strategies': [dict(zip(strategies, row)) for row in classified[strategies].to_numpy().tolist()],
+        'base_score': rng.uniform(0.5, 1, size),
+    })
+    analyzer = CrossAnalyzer()
+    with manifest.stage('cross_analysis') as stage:
+        analyzer.build_concept_strategy_matrix(stocks, list(classifier.concept_tags), strategies, classified[strategies])
+        analyzer.build_industry_strategy_matrix(stocks, list(classifier.industry_tags), strategies,
+                                                classified[strategies])
+        three_d = analyzer.build_stock_concept_strategy_3d(stocks, top_n=20)
+        stage.rows_in, stage.rows_out = size, three_d['total_stocks_analyzed']
+
+    generator = EnhancedReportGenerator()
+    market_data = {'sh_index': 3200.0, 'sh_change': 0.6, 'sz_index': 10500.0, 'sz_change': -0.2,
+                   'cyb_index': 2100.0, 'cyb_change': 1.1, 'up_count': 2800, 'down_count': 2100, 'volume': 9500}
+    strategy_data = {'动量策略': {'强势动量': {'marginal_change': 1.5}, '反转动量': {'marginal_change': -0.8}}}
+    stock_records = stocks[['code', 'name', 'concepts', 'industries']].to_dict('records')
+    quotes = snapshot[['price', 'change_pct']].fillna(0.0)
+    top_stocks = [dict(stock, price=quotes.at[stock['code'], 'price'], change_pct=quotes.at[stock['code'], 'change_pct'])
+                  if stock['code'] in quotes.index else dict(stock, change_pct=0.0)
+                  for stock in three_d['top_stocks']]
+    with manifest.stage('report_rendering') as stage:
+        out = io.StringIO()
+        generator.write_complete_report(out, market_data, strategy_data, stock_records, top_stocks,
+                                        appendix_stocks=iter(stock_records))
+        stage.rows_in, stage.extra['bytes'] = size, len(out.getvalue().encode('utf-8'))
+
+    if not args.skip_sharded:
+        with ShardedRunner(max_workers=args.workers) as runner, manifest.stage('sharded_pipeline') as stage:
+            result = run_stages(classifier, refiner, analyzer, universe, {'market': market}, 'benchmark',
+                                runner=runner)
+            stage.rows_in, stage.rows_out = size, len(result['stock_classification'])
+            stage.extra['workers'] = runner.max_workers
+
+    return manifest.to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='全流程分阶段基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--days', type=int, default=120, help='日线面板长度')
+    parser.add_argument('--fetch-symbols', type=int, default=300, help='逐只取日线的股票数')
+    parser.add_argument('--workers', type=int, default=None, help='分片并行的进程数，默认CPU核数')
+    parser.add_argument('--skip-sharded', action='store_true')
+    parser.add_argument('--json', help='结果写入的JSON文件路径')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    results = {
+        'revision': git_revision(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'args': vars(args),
+        'sizes': {},
+    }
+    with StubServer(cache_responses=True) as server:
+        Ashare.HOSTS.update(server.hosts())
+        for size in args.sizes:
+            manifest = bench_size(size, args, server)
+            results['sizes'][str(size)] = {stage['name']: {key: stage.get(key) for key in
+                                                           ('wall_s', 'cpu_s', 'rows_in', 'rows_out', 'rss_mb')}
+                                           for stage in manifest['stages']}
+            print(f"== {size} 只股票")
+            for name, stage in results['sizes'][str(size)].items():
+                print(f"  {name:28s} {stage['wall_s']:8.3f}s  CPU {stage['cpu_s']:8.3f}s  "
+                      f"行数 {stage['rows_in']} -> {stage['rows_out']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == '__main__':
+    main()
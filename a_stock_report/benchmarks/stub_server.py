@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地行情桩服务 - A股深度优化日报系统v2.0.0
+功能：模拟新浪/腾讯K线及批量实时行情接口的响应格式，供压测脚本在不访问外网的情况下驱动 Ashare
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlsplit
+
+from synthetic import synthetic_bars
+
+
+def _sina_kline(query: Dict[str, str]) -> list:
+    """新浪 CN_MarketData.getKLineData 格式"""
+    scale = int(query['scale'])
+    frequency = {240: '1d', 1200: '1w', 7200: '1M'}.get(scale, f'{scale}m')
+    df = synthetic_bars(query['symbol'], frequency, int(query['datalen']))
+    fmt = '%Y-%m-%d' if scale >= 240 else '%Y-%m-%d %H:%M:%S'
+    return [{'day': ts.strftime(fmt), 'open': f'{row.open:.3f}', 'high': f'{row.high:.3f}',
+             'low': f'{row.low:.3f}', 'close': f'{row.close:.3f}', 'volume': f'{row.volume:.0f}'}
+            for ts, row in zip(df.index, df.itertuples())]
+
+
+def _tx_rows(df, fmt: str) -> list:
+    """腾讯K线行格式：时间, 开, 收, 高, 低, 量"""
+    return [[ts.strftime(fmt), f'{row.open:.2f}', f'{row.close:.2f}', f'{row.high:.2f}',
+             f'{row.low:.2f}', f'{row.volume:.3f}'] for ts, row in zip(df.index, df.itertuples())]
+
+
+def _tx_day(query: Dict[str, str]) -> dict:
+    """腾讯 fqkline/get 格式"""
+    code, unit, _, end_date, count, _ = query['param'].split(',')
+    frequency = {'day': '1d', 'week': '1w', 'month': '1M'}[unit]
+    df = synthetic_bars(code, frequency, int(count), end=end_date or None)
+    return {'code': 0, 'msg': '', 'data': {code: {'qfq' + unit: _tx_rows(df, '%Y-%m-%d')}}}
+
+
+def _tx_min(query: Dict[str, str]) -> dict:
+    """腾讯 kline/mkline 格式，qt字段携带最新价"""
+    code, unit, _, count = query['param'].split(',')
+    df = synthetic_bars(code, unit[1:] + 'm', int(count))
+    rows = [row + [{}, '0.00'] for row in _tx_rows(df, '%Y%m%d%H%M')]
+    qt = ['1', code, code[2:], f'{df.close.iloc[-1]:.2f}']
+    return {'code': 0, 'msg': '', 'data': {code: {unit: rows, 'qt': {code: qt}}}}
+
+
+def _tx_qt(codes: str) -> str:
+    """腾讯 qt.gtimg.cn/q= 批量实时行情格式（~分隔，量单位手、额单位万元）"""
+    lines = []
+    for code in codes.split(','):
+        bars = synthetic_bars(code, '1d', 6)
+        last, prev = bars.iloc[-1], bars.iloc[-2]
+        fields = ['0'] * 53
+        fields[1:7] = [f'股票{code[2:]}', code[2:], f'{last.close:.2f}', f'{prev.close:.2f}', f'{last.open:.2f}',
+                       f'{last.volume / 100:.0f}']
+        fields[30] = last.name.strftime('%Y%m%d150000')
+        fields[31:35] = [f'{last.close - prev.close:.2f}', f'{(last.close / prev.close - 1) * 100:.2f}',
+                         f'{last.high:.2f}', f'{last.low:.2f}']
+        fields[37:40] = [f'{last.volume * last.close / 1e4:.0f}', '1.23', '18.50']
+        fields[45:47] = ['1234.56', '2.10']
+        fields[49] = f'{last.volume / bars.volume.iloc[:-1].mean():.2f}'
+        lines.append(f'v_{code}="{"~".join(fields)}";')
+    return '\n'.join(lines) + '\n'
+
+
+def _sina_hq(codes: str) -> str:
+    """新浪 hq.sinajs.cn/list= 批量实时行情格式（,分隔，量单位股、额单位元）"""
+    lines = []
+    for code in codes.split(','):
+        bars = synthetic_bars(code, '1d', 2)
+        last, prev = bars.iloc[-1], bars.iloc[-2]
+        fields = [f'股票{code[2:]}', f'{last.open:.3f}', f'{prev.close:.3f}', f'{last.close:.3f}', f'{last.high:.3f}',
+                  f'{last.low:.3f}', f'{last.close:.3f}', f'{last.close:.3f}', f'{last.volume:.0f}',
+                  f'{last.volume * last.close:.3f}'] + ['0'] * 20 + [last.name.strftime('%Y-%m-%d'), '15:00:00', '00']
+        lines.append(f'var hq_str_{code}="{",".join(fields)}";')
+    return '\n'.join(lines) + '\n'
+
+
+# 实时行情接口把代码列表放在路径里：/q=sh600519,sz000001 与 /list=sh600519,sz000001
+QUOTE_ROUTES = {'/q=': _tx_qt, '/list=': _sina_hq}
+
+ROUTES = {
+    '/quotes_service/api/json_v2.php/CN_MarketData.getKLineData': _sina_kline,
+    '/appstock/app/fqkline/get': _tx_day,
+    '/appstock/app/kline/mkline': _tx_min,
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """按路径分发到对应的桩接口，使用HTTP/1.1以支持keep-alive"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True   # 头部与正文分两次写出，keep-alive下需关闭Nagle避免40ms延迟确认
+    connect_delay = 0.0     # 每个新连接的额外延迟（秒），模拟TCP/TLS握手开销
+    response_delay = 0.0    # 每个请求的额外延迟（秒），模拟服务端处理耗时
+    response_cache = None   # 按请求路径缓存响应正文的字典，为None时每次重新生成
+
+    def setup(self):
+        time.sleep(self.connect_delay)
+        super().setup()
+
+    def do_GET(self):
+        time.sleep(self.response_delay)
+        cached = self.response_cache.get(self.path) if self.response_cache is not None else None
+        if cached is None:
+            cached = self._render()
+            if cached is None:
+                self.send_error(404)
+                return
+            if self.response_cache is not None:
+                self.response_cache[self.path] = cached
+        body, content_type = cached
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _render(self):
+        """生成响应 (正文, Content-Type)，未知路径返回None"""
+        url = urlsplit(self.path)
+        for prefix, quote_route in QUOTE_ROUTES.items():
+            if url.path.startswith(prefix):
+                body = quote_route(url.path[len(prefix):]).encode('gbk')
+                content_type = 'text/plain; charset=GBK'
+                break
+        else:
+            route = ROUTES.get(url.path)
+            if route is None:
+                return None
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            body = json.dumps(route(query)).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        return body, content_type
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """在后台线程运行的桩服务，可作为上下文管理器使用"""
+
+    def __init__(self, connect_delay: float = 0.0, response_delay: float = 0.0, cache_responses: bool = False):
+        """
+        Args:
+            connect_delay: 每个新连接的附加延迟（秒）
+            response_delay: 每个请求的附加延迟（秒）
+            cache_responses: 相同请求路径直接返回首次生成的正文，压测时让服务端开销不计入客户端耗时
+        """
+        handler = type('ConfiguredStubHandler', (StubHandler,),
+                       {'connect_delay': connect_delay, 'response_delay': response_delay,
+                        'response_cache': {} if cache_responses else None})
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def hosts(self) -> Dict[str, str]:
+        """返回可直接写入 Ashare.HOSTS 的后端地址"""
+        return {name: self.url for name in ('tx_day', 'tx_min', 'sina', 'tx_qt', 'sina_hq')}
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == '__main__':
+    with StubServer() as server:
+        print(f'桩服务运行于 {server.url}，Ctrl+C 退出')
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+合成行情数据 - A股深度优化日报系统v2.0.0
+功能：按股票代码生成确定性的K线序列，供本地桩服务和压测脚本使用
+"""
+
+import os
+import sys
+import zlib
+from datetime import datetime, time, timedelta
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.trade_calendar import get_calendar
+
+# 主营业务描述片段，覆盖分类器的概念/行业关键词，也包含不命中任何关键词的干扰文本
+BUSINESS_PHRASES = [
+    '集成电路设计与晶圆制造', 'AI芯片及算力芯片研发', '大模型训练与AIGC应用', 'GPU服务器与云计算平台',
+    '工业软件与系统集成服务', '信息安全产品及IT服务', '光伏组件与逆变器制造', '锂电池正极材料与负极材料',
+    '动力电池及储能电池系统', '新能源车整车及汽车零部件', '风电叶片与塔筒', '商业银行零售与对公业务',
+    '寿险与财险保险服务', '证券经纪业务与投行服务', '高端白酒与酱香型白酒生产销售', '创新药与生物制药研发',
+    '医疗器械及医疗服务', '智能手机与TWS耳机等消费电子', '住宅地产与商业地产开发', '水泥、玻璃与防水材料',
+    '挖掘机、起重机等工程机械', '航空航天与雷达等军工装备', '数字经济与产业数字化解决方案', '国企改革与资产重组',
+    '一带一路海外工程承包', '碳中和与绿色能源服务', 'VR/AR与数字孪生等元宇宙应用', '区块链与Web3基础设施',
+    '卫星互联网与6G通信技术', '量子计算与量子通信', '脑机接口与神经科技', '合成生物与基因编辑',
+    '通信设备与运营商服务', '乘用车与商用车制造', '铜、铝、锂、稀土等有色金属冶炼', '化学原料与化肥农药',
+    '乳制品、啤酒与调味品', '白色家电与小家电', '造纸与包装印刷', '服装家纺与珠宝零售',
+    '种植业、畜牧业与饲料', '超市百货与电商零售', '港口、机场与物流运输', '城商行与农商行金融服务',
+    '主要从事日用品贸易与仓储', '提供企业管理咨询与人力资源外包', '从事园林绿化与市政养护', '经营酒店餐饮与旅游服务',
+]
+
+INDUSTRY_NAMES = ['计算机', '电子', '通信', '电力设备', '汽车', '有色金属', '钢铁', '基础化工', '医药生物',
+                  '食品饮料', '家用电器', '轻工制造', '纺织服饰', '农林牧渔', '商贸零售', '交通运输', '房地产',
+                  '建筑装饰', '银行', '非银金融', '国防军工', '机械设备', '传媒', '综合']
+
+NAME_CHARS = '华中国新天海东南北金科信达安泰恒宏盛通力源光电智能精密股份集团控技术'
+
+# 分钟K线周期 -> 每个交易日的K线数量
+MINUTE_BARS_PER_DAY = {1: 240, 5: 48, 15: 16, 30: 8, 60: 4}
+
+
+def code_seed(code: str) -> int:
+    """由股票代码得到稳定的随机种子"""
+    return zlib.crc32(code.encode('utf-8'))
+
+
+def _noise(keys: np.ndarray, seed: int) -> np.ndarray:
+    """由整数键确定性地映射到 [-1, 1) 的伪随机数（splitmix64 混合）"""
+    with np.errstate(over='ignore'):
+        x = keys.astype(np.uint64) + np.uint64(seed * 0x9E3779B97F4A7C15 % (1 << 64))
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53) * 2 - 1
+
+
+def synthetic_universe(n: int, seed: int = 0) -> pd.DataFrame:
+    """
+    生成合成股票池
+
+    Args:
+        n: 股票数量
+        seed: 随机种子
+
+    Returns:
+        包含 code/name/industry/business 列的DataFrame，主营描述由2-6个业务片段拼接，长度与真实年报摘要相当
+    """
+    rng = np.random.default_rng(seed)
+    prefixes = np.array(['sh60', 'sh68', 'sz00', 'sz30'])
+    codes = [f'{prefixes[i % 4]}{i:04d}' for i in range(n)]
+    names = [''.join(rng.choice(list(NAME_CHARS), size=4)) for _ in range(n)]
+    industries = rng.choice(INDUSTRY_NAMES, size=n)
+    phrase_counts = rng.integers(2, 7, size=n)
+    business = ['，'.join(rng.choice(BUSINESS_PHRASES, size=k, replace=False)) + '等业务' for k in phrase_counts]
+    return pd.DataFrame({'code': codes, 'name': names, 'industry': industries, 'business': business})
+
+
+def session_minutes(minutes: int) -> List[time]:
+    """返回一个交易日内按周期划分的K线结束时间（上午9:30-11:30，下午13:00-15:00）"""
+    labels = []
+    for start, end in ((datetime(2000, 1, 1, 9, 30), datetime(2000, 1, 1, 11, 30)),
+                       (datetime(2000, 1, 1, 13, 0), datetime(2000, 1, 1, 15, 0))):
+        current = start + timedelta(minutes=minutes)
+        while current <= end:
+            labels.append(current.time())
+            current += timedelta(minutes=minutes)
+    return labels
+
+
+def trading_days(end: pd.Timestamp, periods: int) -> pd.DatetimeIndex:
+    """截至 end 的最近 periods 个交易日（跳过交易日历中的节假日，与真实行情接口一致）"""
+    return pd.bdate_range(end=end, periods=periods, freq='C', holidays=get_calendar().holidays)
+
+
+def synthetic_bars(code: str, frequency: str = '1d', count: int = 10,
+                   end: Optional[datetime] = None) -> pd.DataFrame:
+    """
+    生成合成K线
+
+    Args:
+        code: 股票代码，决定随机序列
+        frequency: '1d'/'1w'/'1M' 或 '1m'/'5m'/'15m'/'30m'/'60m'
+        count: K线数量
+        end: 最后一根K线所在日期，默认今天
+
+    Returns:
+        以时间为索引、包含 open/high/low/close/volume 列的DataFrame
+    """
+    end = pd.Timestamp(end or datetime.now()).normalize()
+    if frequency.endswith('m') and frequency[:-1].isdigit():
+        minutes = int(frequency[:-1])
+        labels = session_minutes(minutes)
+        n_days = -(-count // len(labels))
+        days = trading_days(end, n_days)
+        index = pd.DatetimeIndex([datetime.combine(day.date(), label) for day in days for label in labels])[-count:]
+    elif frequency == '1d':
+        index = trading_days(end, count)
+    else:
+        # 周线/月线以周期内最后一个交易日为标签，整周休市（如春节）没有K线
+        days = trading_days(end, count * (6 if frequency == '1w' else 24))
+        periods = days.to_period('W' if frequency == '1w' else 'M')
+        index = days[~periods.duplicated(keep='last')][-count:]
+
+    # 价格只取决于 (代码, 时间戳)，不同窗口取到的同一根K线完全一致，便于验证缓存拼接
+    index = pd.DatetimeIndex(index.values)
+    minutes = index.values.astype('datetime64[m]').astype(np.int64)
+    seed = code_seed(code)
+    days = minutes / 1440.0
+    phases = np.array([(seed >> shift) % 628 / 100.0 for shift in (0, 8, 16)])
+    log_close = (np.log(5 + seed % 95) + 0.3 * np.sin(2 * np.pi * days / 365 + phases[0])
+                 + 0.1 * np.sin(2 * np.pi * days / 29 + phases[1]) + 0.02 * _noise(minutes, seed))
+    close = np.exp(log_close)
+    open_ = close * (1 + 0.005 * _noise(minutes, seed + 1))
+    high = np.maximum(open_, close) * (1 + 0.01 * np.abs(_noise(minutes, seed + 2)))
+    low = np.minimum(open_, close) * (1 - 0.01 * np.abs(_noise(minutes, seed + 3)))
+    volume = np.floor(1e4 + (_noise(minutes, seed + 4) + 1) * 2.5e6)
+    return pd.DataFrame({'open': open_.round(2), 'high': high.round(2), 'low': low.round(2),
+                         'close': close.round(2), 'volume': volume}, index=index)
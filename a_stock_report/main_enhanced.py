@@ -17,6 +17,8 @@ A股深度优化日报系统 v2.0.0
 
 import sys
 import os
+import argparse
+import glob
 import logging
 from datetime import datetime, timedelta
 
@@ -27,6 +29,16 @@ from scripts.strategy_refiner import StrategyRefiner
 from scripts.stock_classifier import StockClassifier  
 from scripts.cross_analyzer import CrossAnalyzer
 from scripts.enhanced_report_generator import EnhancedReportGenerator
+from scripts.price_memo import PriceMemo
+from scripts.kline_store import KlineStore
+from scripts.instrumentation import RunManifest
+from scripts.pipeline_dag import PipelineGraph
+from scripts.artifact_store import ArtifactStore, file_fingerprint, files_fingerprint
+from scripts.tag_store import TagStore
+from scripts.rule_engine import DEFAULT_CONFIG_PATH
+from scripts.market_data import (DEFAULT_UNIVERSE_PATH, fetch_history, fetch_market_data, full_code, load_universe,
+                                 quotes_settled)
+from scripts.sharded_pipeline import ShardedRunner, compare_stage_outputs, run_stages
 
 # 配置日志
 logging.basicConfig(
@@ -38,66 +50,219 @@ logging.basicConfig(
     ]
 )
 
+VERSION = '2.0.0'
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def pipeline_version():
+    """
+    所有阶段哈希共用的盐：版本号、代码与配置文件内容
+
+    任一源码或配置文件变化时已缓存的阶段产物全部失效，避免升级后从旧代码的产物恢复
+    """
+    code = [os.path.join(PROJECT_DIR, 'Ashare.py'), os.path.abspath(__file__)]
+    code += sorted(glob.glob(os.path.join(PROJECT_DIR, 'scripts', '*.py')))
+    config = sorted(glob.glob(os.path.join(PROJECT_DIR, 'config', '*')))
+    return {
+        'version': VERSION,
+        'code': files_fingerprint(code, PROJECT_DIR),
+        'config': files_fingerprint(config, PROJECT_DIR),
+    }
+
 class AStockDeepReportSystem:
     """A股深度优化日报系统主类"""
     
-    def __init__(self):
+    def __init__(self, profile=False, trace_memory=False, resume=True, shards=None):
+        """
+        Args:
+            profile (bool): 运行时开启 cProfile，结果随运行清单保存
+            trace_memory (bool): 运行时开启 tracemalloc，记录各阶段Python内存分配峰值
+            resume (bool): 从已缓存的阶段产物继续，只执行缺失或配置已变化的阶段
+            shards (int): 标的分类、策略细分、交叉分析按股票分片、每个分片一个进程，None 为单进程
+        """
+        self.profile = profile
+        self.trace_memory = trace_memory
+        self.resume = resume
+        # 分片执行与单进程输出相同，不参与阶段哈希
+        self.sharded_runner = ShardedRunner(n_shards=shards, max_workers=shards) if shards and shards > 1 else None
+        
         self.strategy_refiner = StrategyRefiner()
-        self.stock_classifier = StockClassifier()
+        # 概念/行业标签按文本哈希缓存，每日只对新上市或主营描述变化的股票重新匹配
+        self.stock_classifier = StockClassifier(tag_store=TagStore())
         self.cross_analyzer = CrossAnalyzer()
         self.report_generator = EnhancedReportGenerator()
         
+        # 股票池：config/stock_universe.csv
+        self.universe = load_universe()
+        
+        # K线磁盘缓存：历史部分读盘，每次运行只补取缺失的尾部
+        self.kline_store = KlineStore()
+        # 行情内存缓存：同一系统实例内（日报 + 案例分析）重复请求的K线只获取一次，未命中时再查磁盘缓存
+        self.price_memo = PriceMemo(fetcher=self.kline_store.get_price)
+        
+        # 上一次日报运行的各阶段输出，供 rerun_stage 重跑单个阶段
+        self.last_outputs = {}
+        
+        # 阶段产物缓存：按 (日期, 阶段, 配置哈希) 持久化，失败后重跑从最后一个成功阶段继续
+        self.artifact_store = ArtifactStore()
+        self.cache_salt = pipeline_version()
+        
         # 创建输出目录
         self.output_dir = "reports"
         os.makedirs(self.output_dir, exist_ok=True)
         
-    def run_daily_report(self, date=None):
+    def build_daily_graph(self, date, report_path):
+        """
+        日报流程的阶段依赖图：行情获取与标的分类互不依赖，可并发执行
+        
+        Args:
+            date (str): 日期，格式 YYYY-MM-DD
+            report_path (str): 报告输出路径
+            
+        Returns:
+            PipelineGraph: 阶段为 market_data、stock_classification、strategy_refinement、cross_analysis、report_rendering
+        """
+        def render_report(market_data, strategy_refinement, stock_classification, cross_analysis):
+            # 逐节写入文件，不在内存中拼接整篇报告
+            with open(report_path, 'w', encoding='utf-8') as f:
+                self.report_generator.write_enhanced_report(
+                    f, strategy_refinement, stock_classification, cross_analysis, date, market_data=market_data
+                )
+            return report_path
+        
+        # 各阶段的配置参与阶段哈希：策略配置文件或回测胜率变化只使策略细分及其下游失效
+        refiner_config = {
+            'strategy_config': file_fingerprint(DEFAULT_CONFIG_PATH),
+            'sub_strategies': self.strategy_refiner.sub_strategies,
+        }
+        classifier_config = {
+            'concept_tags': self.stock_classifier.concept_tags,
+            'industry_tags': self.stock_classifier.industry_tags,
+            'strategy_mapping': self.stock_classifier.strategy_mapping,
+        }
+        
+        universe_config = {'universe': file_fingerprint(DEFAULT_UNIVERSE_PATH)}
+        
+        # 开启 tracemalloc 时串行执行，各阶段的内存分配峰值才能单独归属
+        graph = PipelineGraph(max_workers=1 if self.trace_memory else None)
+        graph.add('market_data', lambda: fetch_market_data(self.universe, date, fetcher=self.price_memo.get_price),
+                  config=universe_config)
+        runner = self.sharded_runner
+        if runner is None:
+            classify = lambda: self.stock_classifier.classify_stocks(date, self.universe)
+            refine = lambda market_data, stock_classification: self.strategy_refiner.refine_strategies(
+                date, market_data, stock_classification)
+            cross = lambda market_data, strategy_refinement, stock_classification: \
+                self.cross_analyzer.perform_cross_analysis(
+                    strategy_refinement, stock_classification, date, market_data=market_data)
+        else:
+            classify = lambda: runner.classify_stocks(self.stock_classifier, date, self.universe)
+            refine = lambda market_data, stock_classification: runner.refine_strategies(
+                self.strategy_refiner, self.stock_classifier, date, market_data, stock_classification)
+            cross = lambda market_data, strategy_refinement, stock_classification: runner.perform_cross_analysis(
+                self.cross_analyzer, self.stock_classifier, strategy_refinement, stock_classification, date,
+                market_data=market_data)
+        graph.add('stock_classification', classify, config={**classifier_config, **universe_config})
+        graph.add('strategy_refinement', refine, deps=['market_data', 'stock_classification'], config=refiner_config)
+        graph.add('cross_analysis', cross, deps=['market_data', 'strategy_refinement', 'stock_classification'])
+        # 报告直接写文件，总是重新渲染
+        graph.add('report_rendering', render_report,
+                  deps=['market_data', 'strategy_refinement', 'stock_classification', 'cross_analysis'],
+                  persist=False)
+        # 当天收盘前行情仍在变化，产物键只含日期与配置：行情阶段及其下游不缓存，盘中重跑总是取最新快照
+        if not quotes_settled(date):
+            for name in graph.downstream(['market_data']):
+                graph.stages[name].persist = False
+        return graph
+        
+    def check_sharded_outputs(self, date):
+        """
+        用单进程阶段函数按上一次日报的行情重算 标的分类/策略细分/交叉分析，与上一次的输出逐阶段比较
+        
+        Args:
+            date (str): 上一次日报的日期
+            
+        Returns:
+            list: 不一致的阶段名，空列表表示一致
+        """
+        single = run_stages(self.stock_classifier, self.strategy_refiner, self.cross_analyzer, self.universe,
+                            self.last_outputs['market_data'], date)
+        return compare_stage_outputs(single, self.last_outputs)
+        
+    def run_daily_report(self, date=None, targets=None, cached=None, force=()):
         """
         生成每日深度优化日报
         
         Args:
             date (str): 日期，格式 YYYY-MM-DD，默认为今天
+            targets (list): 只产出这些阶段，默认全部（即生成报告）
+            cached (dict): 已有的阶段输出 {阶段名: 输出}，对应阶段不再执行
+            force (list): 即使 cached 中已有也要重跑的阶段
+            
+        Returns:
+            str: 报告路径；指定 targets 时返回 {阶段名: 输出}
         """
         if date is None:
             date = datetime.now().strftime("%Y-%m-%d")
             
         logging.info(f"开始生成 {date} 的A股深度优化日报")
         
+        report_filename = f"A股深度优化日报_{date}.md"
+        report_path = os.path.join(self.output_dir, report_filename)
+        manifest = RunManifest('daily_report', date, profile=self.profile, trace_memory=self.trace_memory)
+        graph = self.build_daily_graph(date, report_path)
+        keys = graph.keys(salt=self.cache_salt)
+        persisted = {name: keys[name] for name, stage in graph.stages.items() if stage.persist}
+        
+        if cached is None and self.resume:
+            cached = self.artifact_store.load_many(date, persisted)
+            if cached:
+                logging.info(f"从阶段产物缓存恢复: {', '.join(cached)}")
+        manifest.extra['resumed'] = sorted(set(cached or {}) - set(force))
+        manifest.extra['cache_version'] = self.cache_salt
+        
+        def save_artifact(name, value):
+            if name in persisted:
+                self.artifact_store.save(date, name, persisted[name], value)
+        
         try:
-            # 1. 策略细分分析
-            logging.info("步骤1: 执行策略细分分析...")
-            refined_strategies = self.strategy_refiner.refine_strategies(date)
-            
-            # 2. 标的分类
-            logging.info("步骤2: 执行标的分类...")
-            classified_stocks = self.stock_classifier.classify_stocks(date)
-            
-            # 3. 交叉分析
-            logging.info("步骤3: 执行交叉分析...")
-            cross_analysis = self.cross_analyzer.perform_cross_analysis(
-                refined_strategies, classified_stocks, date
-            )
-            
-            # 4. 生成深度报告
-            logging.info("步骤4: 生成深度优化日报...")
-            report_content = self.report_generator.generate_enhanced_report(
-                refined_strategies, classified_stocks, cross_analysis, date
-            )
-            
-            # 5. 保存报告
-            report_filename = f"A股深度优化日报_{date}.md"
-            report_path = os.path.join(self.output_dir, report_filename)
+            outputs = graph.run(targets, cached=cached, force=force, manifest=manifest, on_complete=save_artifact)
+            self.last_outputs = outputs
             
-            with open(report_path, 'w', encoding='utf-8') as f:
-                f.write(report_content)
+            if targets is not None:
+                return outputs
                 
             logging.info(f"日报生成完成: {report_path}")
+            logging.info(f"行情缓存统计: {self.price_memo.summary()}")
             
             return report_path
             
         except Exception as e:
             logging.error(f"生成日报时发生错误: {str(e)}")
             raise
+        
+        finally:
+            # 失败时同样写出清单，便于定位出错或耗时异常的阶段
+            if self.sharded_runner is not None:
+                self.sharded_runner.close()
+            self.kline_store.flush()
+            manifest.extra['price_memo'] = self.price_memo.summary()
+            manifest.extra['kline_store'] = dict(self.kline_store.stats)
+            manifest.write(RunManifest.path_for(report_path))
+            
+    def rerun_stage(self, stage, date=None, cached=None):
+        """
+        用已有的上游输出只重跑日报中的一个阶段，例如修改报告模板后只重跑 report_rendering
+        
+        Args:
+            stage (str): 阶段名
+            date (str): 日期，格式 YYYY-MM-DD，默认为今天
+            cached (dict): 上游阶段输出，默认取本实例上一次运行的结果
+            
+        Returns:
+            该阶段的输出
+        """
+        cached = self.last_outputs if cached is None else cached
+        return self.run_daily_report(date, targets=[stage], cached=cached, force=[stage])[stage]
             
     def analyze_case_study(self, stock_code, stock_name, date=None):
         """
@@ -113,50 +278,82 @@ class AStockDeepReportSystem:
             
         logging.info(f"开始个股案例分析: {stock_name}({stock_code}) - {date}")
         
+        case_filename = f"个股案例分析_{stock_name}_{date}.md"
+        case_path = os.path.join(self.output_dir, case_filename)
+        manifest = RunManifest('case_study', date)
+        
         try:
             # 获取个股详细信息
-            stock_info = self.stock_classifier.get_stock_details(stock_code, date)
-            
-            # 执行三维分析
-            three_d_analysis = self.cross_analyzer.perform_three_d_analysis(
-                stock_code, stock_name, stock_info, date
-            )
+            with manifest.stage('stock_details'):
+                stock_info = self.stock_classifier.get_stock_details(
+                    full_code(stock_code), date, self.universe, stock_name
+                )
             
-            # 生成案例分析报告
-            case_report = self.report_generator.generate_case_study_report(
-                stock_code, stock_name, stock_info, three_d_analysis, date
-            )
+            # 获取日线，参数与日报相同，日报已取过时直接命中行情内存缓存
+            with manifest.stage('price_history') as record:
+                history = fetch_history(stock_code, date, fetcher=self.price_memo.get_price)
+                record.rows_out = 0 if history is None else len(history)
             
-            # 保存案例分析报告
-            case_filename = f"个股案例分析_{stock_name}_{date}.md"
-            case_path = os.path.join(self.output_dir, case_filename)
+            # 执行三维分析
+            with manifest.stage('three_d_analysis'):
+                three_d_analysis = self.cross_analyzer.perform_three_d_analysis(
+                    stock_code, stock_name, stock_info, date, history
+                )
             
-            with open(case_path, 'w', encoding='utf-8') as f:
-                f.write(case_report)
+            # 生成并保存案例分析报告
+            with manifest.stage('report_rendering'):
+                case_report = self.report_generator.generate_case_study_report(
+                    stock_code, stock_name, stock_info, three_d_analysis, date
+                )
+                with open(case_path, 'w', encoding='utf-8') as f:
+                    f.write(case_report)
                 
             logging.info(f"案例分析完成: {case_path}")
+            logging.info(f"行情缓存统计: {self.price_memo.summary()}")
             
             return case_path
             
         except Exception as e:
             logging.error(f"案例分析时发生错误: {str(e)}")
             raise
+        
+        finally:
+            self.kline_store.flush()
+            manifest.extra['price_memo'] = self.price_memo.summary()
+            manifest.extra['kline_store'] = dict(self.kline_store.stats)
+            manifest.write(RunManifest.path_for(case_path))
 
 def main():
     """主函数"""
-    system = AStockDeepReportSystem()
+    parser = argparse.ArgumentParser(description='A股深度优化日报系统')
+    parser.add_argument('--date', default=None, help='报告日期，格式 YYYY-MM-DD，默认今天')
+    parser.add_argument('--profile', action='store_true', help='开启cProfile，结果保存在运行清单旁的.prof文件')
+    parser.add_argument('--trace-memory', action='store_true', help='开启tracemalloc，记录各阶段内存分配峰值')
+    parser.add_argument('--fresh', action='store_true', help='忽略已缓存的阶段产物，全部重新计算')
+    parser.add_argument('--shards', type=int, default=None,
+                        help='标的分类/策略细分/交叉分析按股票分成N片、N个进程执行（股票数不足时仍在当前进程执行）')
+    parser.add_argument('--check-shards', action='store_true',
+                        help='日报完成后用单进程阶段函数重算并与分片执行的输出比较（配合 --shards --fresh）')
+    args = parser.parse_args()
     
-    # 生成今日日报
-    today = datetime.now().strftime("%Y-%m-%d")
-    report_path = system.run_daily_report(today)
+    system = AStockDeepReportSystem(profile=args.profile, trace_memory=args.trace_memory, resume=not args.fresh,
+                                    shards=args.shards)
     
-    # 执行星环科技案例分析（示例）
+    # 日报与星环科技案例分析（示例）互不依赖，并发执行（--trace-memory 时串行）
     # 星环科技股票代码假设为688031（实际需要确认）
-    case_path = system.analyze_case_study("688031", "星环科技", today)
+    today = args.date or datetime.now().strftime("%Y-%m-%d")
+    graph = PipelineGraph(max_workers=1 if args.trace_memory else None)
+    graph.add('daily_report', lambda: system.run_daily_report(today))
+    graph.add('case_study', lambda: system.analyze_case_study("688031", "星环科技", today))
+    outputs = graph.run()
+    report_path, case_path = outputs['daily_report'], outputs['case_study']
     
     print(f"A股深度优化日报系统 v2.0.0 运行完成!")
     print(f"日报文件: {report_path}")
     print(f"案例分析: {case_path}")
+    if args.check_shards:
+        differences = system.check_sharded_outputs(today)
+        print(f"分片与单进程结果一致: {not differences}" + (f"，不一致的阶段: {', '.join(differences)}" if differences else ''))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阶段产物缓存 - A股深度优化日报系统v2.0.0
+功能：把日报各阶段的输出（策略细分、标的分类、交叉分析矩阵等）按 (日期, 阶段, 配置哈希) 持久化，
+     重跑时从最后一个成功的阶段继续；阶段哈希沿依赖链传递，配置改动只会使该阶段及其下游失效
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    FRAME_FORMAT = 'parquet'
+except ImportError:
+    FRAME_FORMAT = 'pickle'
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'data', 'artifacts')
+
+META_FILE = 'meta.json'
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    配置内容的稳定哈希
+
+    dict 按键排序后序列化；DataFrame 按内容哈希；其余不可JSON序列化的对象使用 repr
+    """
+    def default(obj):
+        if isinstance(obj, (pd.DataFrame, pd.Series)):
+            return pd.util.hash_pandas_object(obj, index=True).sum().item()
+        if isinstance(obj, (set, frozenset)):
+            return sorted(obj, key=repr)
+        return repr(obj)
+
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=default)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def file_fingerprint(path: str) -> Optional[str]:
+    """文件内容哈希，文件不存在时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()[:16]
+    except OSError:
+        return None
+
+
+def files_fingerprint(paths: Iterable[str], root: Optional[str] = None) -> str:
+    """一组文件内容的合并哈希，与文件顺序无关；用作代码/配置版本"""
+    root = root or os.getcwd()
+    return fingerprint({os.path.relpath(path, root): file_fingerprint(path) for path in paths})
+
+
+class ArtifactStore:
+    """
+    阶段产物的磁盘缓存
+
+    目录结构：<root>/<日期>/<阶段>/<阶段哈希>/，其中 meta.json 记录产物类型与文件清单。
+    按类型序列化：
+    - frame：DataFrame/Series，列式文件（有 pyarrow 时为 parquet）
+    - bundle：值为 DataFrame/Series 或可JSON序列化对象的字典，如交叉分析结果，表格逐个落盘
+    - json：可JSON序列化的对象
+    - pickle：其他对象
+    写入先落到临时目录再整体改名，进程中途退出不会留下半个产物
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        """
+        Args:
+            root: 缓存根目录，默认 a_stock_report/data/artifacts
+        """
+        self.root = root or DEFAULT_ARTIFACT_DIR
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, date: str, stage: str, key: str) -> str:
+        return os.path.join(self.root, str(date), stage, key)
+
+    def has(self, date: str, stage: str, key: str) -> bool:
+        return os.path.exists(os.path.join(self._dir(date, stage, key), META_FILE))
+
+    # ------------------------------------------------------------------ 写入
+
+    @staticmethod
+    def _has_nested(frame: pd.DataFrame) -> bool:
+        """object列中含列表/字典（如概念标签列表）时，parquet读回会变成ndarray，改用pickle保持原类型"""
+        for column in frame.columns[frame.dtypes == object]:
+            if frame[column].map(lambda v: isinstance(v, (list, tuple, dict, set))).any():
+                return True
+        return False
+
+    @staticmethod
+    def _write_frame(obj, directory: str, name: str) -> Dict[str, str]:
+        frame = obj.to_frame() if isinstance(obj, pd.Series) else obj
+        kind = 'series' if isinstance(obj, pd.Series) else 'frame'
+        if FRAME_FORMAT == 'parquet' and not ArtifactStore._has_nested(frame):
+            filename = f'{name}.parquet'
+            try:
+                frame.to_parquet(os.path.join(directory, filename))
+                return {'kind': kind, 'file': filename, 'format': 'parquet'}
+            except (ValueError, TypeError) as e:
+                # 非字符串列名、混合类型的object列等parquet无法表示的情况
+                logger.debug(f"{name} 无法写为parquet，改用pickle: {e}")
+        filename = f'{name}.pkl'
+        frame.to_pickle(os.path.join(directory, filename))
+        return {'kind': kind, 'file': filename, 'format': 'pickle'}
+
+    @staticmethod
+    def _read_frame(entry: Dict[str, str], directory: str):
+        path = os.path.join(directory, entry['file'])
+        frame = pd.read_parquet(path) if entry['format'] == 'parquet' else pd.read_pickle(path)
+        return frame.iloc[:, 0] if entry['kind'] == 'series' else frame
+
+    @staticmethod
+    def _is_json(value: Any) -> bool:
+        """能经JSON原样往返（元组、非字符串键、NaN 都不能）"""
+        try:
+            return json.loads(json.dumps(value, ensure_ascii=False)) == value
+        except (TypeError, ValueError):
+            return False
+
+    def _encode(self, value: Any, directory: str) -> Dict[str, Any]:
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return self._write_frame(value, directory, 'value')
+
+        if isinstance(value, dict) and value and all(isinstance(k, str) for k in value):
+            frames = {k: v for k, v in value.items() if isinstance(v, (pd.DataFrame, pd.Series))}
+            rest = {k: v for k, v in value.items() if k not in frames}
+            if frames and self._is_json(rest):
+                entries = {k: self._write_frame(v, directory, f'part_{i}') for i, (k, v) in enumerate(frames.items())}
+                with open(os.path.join(directory, 'rest.json'), 'w', encoding='utf-8') as f:
+                    json.dump(rest, f, ensure_ascii=False)
+                return {'kind': 'bundle', 'frames': entries, 'order': list(value)}
+
+        if self._is_json(value):
+            with open(os.path.join(directory, 'value.json'), 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            return {'kind': 'json', 'file': 'value.json'}
+
+        with open(os.path.join(directory, 'value.pkl'), 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return {'kind': 'pickle', 'file': 'value.pkl'}
+
+    def save(self, date: str, stage: str, key: str, value: Any) -> str:
+        """
+        保存阶段产物，同一日期同一阶段的旧哈希产物一并清理
+
+        Returns:
+            产物目录
+        """
+        target = self._dir(date, stage, key)
+        tmp = f'{target}.tmp-{os.getpid()}-{time.monotonic_ns()}'
+        os.makedirs(tmp)
+        try:
+            meta = self._encode(value, tmp)
+            meta.update({'stage': stage, 'key': key, 'date': str(date),
+                         'created_at': datetime.now().isoformat(timespec='seconds')})
+            with open(os.path.join(tmp, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            os.replace(tmp, target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        stage_dir = os.path.dirname(target)
+        for other in os.listdir(stage_dir):
+            if other != key and '.tmp-' not in other:
+                shutil.rmtree(os.path.join(stage_dir, other), ignore_errors=True)
+        logger.info(f"阶段产物已保存: {date}/{stage} ({meta['kind']}, {key})")
+        return target
+
+    # ------------------------------------------------------------------ 读取
+
+    def load(self, date: str, stage: str, key: str) -> Any:
+        """
+        读取阶段产物
+
+        Raises:
+            KeyError: 没有该 (日期, 阶段, 哈希) 的产物
+        """
+        directory = self._dir(date, stage, key)
+        try:
+            with open(os.path.join(directory, META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            raise KeyError(f"{date}/{stage}/{key}")
+
+        kind = meta['kind']
+        if kind in ('frame', 'series'):
+            return self._read_frame(meta, directory)
+        if kind == 'bundle':
+            with open(os.path.join(directory, 'rest.json'), 'r', encoding='utf-8') as f:
+                rest = json.load(f)
+            frames = {k: self._read_frame(entry, directory) for k, entry in meta['frames'].items()}
+            return {k: frames[k] if k in frames else rest[k] for k in meta['order']}
+        if kind == 'json':
+            with open(os.path.join(directory, meta['file']), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        with open(os.path.join(directory, meta['file']), 'rb') as f:
+            return pickle.load(f)
+
+    def load_many(self, date: str, keys: Dict[str, str]) -> Dict[str, Any]:
+        """
+        读取多个阶段中已有的产物，缺失或损坏的跳过
+
+        Args:
+            keys: {阶段: 阶段哈希}
+
+        Returns:
+            {阶段: 产物}
+        """
+        result = {}
+        for stage, key in keys.items():
+            if not self.has(date, stage, key):
+                continue
+            try:
+                result[stage] = self.load(date, stage, key)
+            except Exception as e:
+                logger.warning(f"阶段产物 {date}/{stage} 读取失败，将重新计算: {e}")
+        return result
+
+    def invalidate(self, date: Optional[str] = None, stage: Optional[str] = None):
+        """删除产物；不指定日期时删除全部"""
+        path = self.root if date is None else os.path.join(self.root, str(date))
+        if date is not None and stage is not None:
+            path = os.path.join(path, stage)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+
+    def prune(self, keep_days: int = 30):
+        """只保留最近 keep_days 个日期的产物"""
+        dates = sorted(d for d in os.listdir(self.root) if os.path.isdir(os.path.join(self.root, d)))
+        for date in dates[:-keep_days] if keep_days > 0 else dates:
+            shutil.rmtree(os.path.join(self.root, date), ignore_errors=True)
+
+
+def main():
+    """测试函数"""
+    import tempfile
+
+    store = ArtifactStore(tempfile.mkdtemp())
+    classified = pd.DataFrame({'code': ['688031', '600519'], 'concepts': [['人工智能', '大数据'], ['消费']]})
+    cross = {
+        'concept_strategy_matrix': pd.DataFrame({'强势动量': [0.9, 0.2]}, index=['人工智能', '消费']),
+        'insights': ['人工智能×强势动量 匹配度最高'],
+    }
+    store.save('2026-02-19', 'stock_classification', fingerprint('v1'), classified)
+    store.save('2026-02-19', 'cross_analysis', fingerprint('v1', 'cross'), cross)
+
+    restored = store.load_many('2026-02-19', {'stock_classification': fingerprint('v1'),
+                                              'cross_analysis': fingerprint('v1', 'cross'),
+                                              'strategy_refinement': fingerprint('v1', 'refine')})
+    print(sorted(restored))
+    print(restored['stock_classification'])
+    print(restored['cross_analysis'])
+    shutil.rmtree(store.root)
+
+
+if __name__ == "__main__":
+    main()
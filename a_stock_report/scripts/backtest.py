@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+子策略回测 - A股深度优化日报系统v2.0.0
+功能：在缓存的日线上按 strategy_config.yaml 的规则逐日回放各子策略信号，
+     统计各持有期的胜率、平均收益和最大回撤，结果写入 data/backtest_win_rates.json，
+     供 StrategyRefiner 和 EnhancedReportGenerator 替换内置的历史胜率常量
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.indicators import VOLUME_SPIKE_RATIO, beta, breakout, rsi, stack_bars, volatility, volume_ratio
+from scripts.rule_engine import RuleEngine
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIN_RATES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                      'data', 'backtest_win_rates.json')
+
+HOLDING_PERIODS = (1, 5, 10, 20)
+
+# 每个日期分块向前多取的K线数，使滚动指标在块首就已稳定（RSI指数平滑的残余权重约 (13/14)^120 ≈ 1e-4）
+WARMUP_BARS = 120
+
+
+def build_features(panels: Dict[str, pd.DataFrame], benchmark: Optional[pd.Series] = None) -> Dict[str, np.ndarray]:
+    """
+    由K线面板计算规则引擎需要的逐日字段
+
+    Returns:
+        {字段: (时间数, 股票数) 数组}，字段名与 filter_criteria 一致
+    """
+    close = panels['close']
+    features = {
+        'change_pct': close.pct_change(fill_method=None) * 100,
+        'rsi': rsi(close),
+        'volatility_30d': volatility(close),
+    }
+    if 'high' in panels:
+        features['resistance_break'] = breakout(close, panels['high'])
+    if 'volume' in panels:
+        ratio = volume_ratio(panels['volume'])
+        features['volume_ratio'] = ratio
+        features['volume_spike'] = ratio > VOLUME_SPIKE_RATIO
+    if benchmark is not None:
+        features['beta'] = beta(close, benchmark)
+    return {field: frame.to_numpy(dtype=np.float64) for field, frame in features.items()}
+
+
+def forward_returns(close: np.ndarray, holding_period: int) -> np.ndarray:
+    """以信号日收盘价买入、持有 holding_period 根K线后按收盘价卖出的收益，超出样本的为NaN"""
+    result = np.full(close.shape, np.nan)
+    if holding_period < len(close):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[:-holding_period] = close[holding_period:] / close[:-holding_period] - 1
+    return result
+
+
+def _run_chunk(task: Tuple) -> Dict:
+    """
+    回测一个日期分块（在子进程中执行）
+
+    task 中的数组已包含块前的预热K线和块后的持有期K线，只统计 [start, stop) 内的信号
+    """
+    engine, index, columns, arrays, bench, static, start, stop, holding_periods = task
+    panels = {field: pd.DataFrame(values, index=index, columns=columns) for field, values in arrays.items()}
+    benchmark = pd.Series(bench, index=index) if bench is not None else None
+    features = build_features(panels, benchmark)
+    rows = slice(start, stop)
+    signals = engine.evaluate_panel({field: values[rows] for field, values in features.items()}, static)
+
+    close = arrays['close']
+    returns = {h: forward_returns(close, h)[rows] for h in holding_periods}
+    stats, cohorts = {}, {}
+    for sub_strategy, signal in signals.items():
+        for h, forward in returns.items():
+            valid = signal & ~np.isnan(forward)
+            realized = np.where(valid, forward, 0.0)
+            stats[(sub_strategy, h)] = (int(valid.sum()), int((valid & (forward > 0)).sum()), float(realized.sum()))
+            cohorts[(sub_strategy, h)] = (realized.sum(axis=1), valid.sum(axis=1))
+    return {'stats': stats, 'cohorts': cohorts}
+
+
+def _max_drawdown(cohort_sum: np.ndarray, cohort_count: np.ndarray, holding_period: int) -> float:
+    """
+    逐日滚动建仓组合的最大回撤
+
+    每个信号日把 1/holding_period 的资金等权买入当日信号股并持有 holding_period 天，
+    组合日收益近似为当日批次平均收益 / holding_period
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cohort_mean = np.where(cohort_count > 0, cohort_sum / cohort_count, 0.0)
+    equity = np.cumprod(1 + cohort_mean / holding_period)
+    if not len(equity):
+        return 0.0
+    return float(np.max(1 - equity / np.maximum.accumulate(equity)))
+
+
+def run_backtest(panels: Dict[str, pd.DataFrame],
+                 benchmark: Optional[pd.Series] = None,
+                 static: Optional[pd.DataFrame] = None,
+                 holding_periods: Sequence[int] = HOLDING_PERIODS,
+                 chunk_size: int = 250,
+                 max_workers: Optional[int] = None,
+                 engine: Optional[RuleEngine] = None) -> pd.DataFrame:
+    """
+    回放全部子策略
+
+    Args:
+        panels: stack_bars 返回的日线面板，至少包含 close，建议包含 high/volume
+        benchmark: 基准收盘价，用于Beta条件
+        static: 以股票代码为索引的不随日期变化的字段（industry、concepts、pe、roe等），
+                注意使用当前财务数据回放历史会引入前视偏差
+        holding_periods: 统计的持有期（K线数）
+        chunk_size: 每个子进程处理的日期数
+        max_workers: 进程数，1 表示在当前进程内顺序执行
+        engine: 规则引擎，默认读取 config/strategy_config.yaml
+
+    Returns:
+        以 (子策略, 持有期) 为索引，包含 name/trades/win_rate/avg_return/max_drawdown 列的DataFrame
+    """
+    engine = engine or RuleEngine()
+    close = panels['close']
+    index, columns = close.index, close.columns
+    arrays = {field: panels[field].reindex(index=index, columns=columns).to_numpy(dtype=np.float64)
+              for field in ('close', 'high', 'volume') if field in panels}
+    bench = benchmark.reindex(index).to_numpy(dtype=np.float64) if benchmark is not None else None
+    static = static.reindex(columns) if static is not None else None
+    horizon = max(holding_periods)
+
+    tasks = []
+    for start in range(0, len(index), chunk_size):
+        stop = min(start + chunk_size, len(index))
+        lo, hi = max(0, start - WARMUP_BARS), min(len(index), stop + horizon)
+        tasks.append((engine, index[lo:hi], columns, {field: values[lo:hi] for field, values in arrays.items()},
+                      bench[lo:hi] if bench is not None else None, static, start - lo, stop - lo, tuple(holding_periods)))
+
+    logger.info(f"回测 {len(columns)} 只股票 × {len(index)} 个交易日，分 {len(tasks)} 块")
+    if max_workers == 1 or len(tasks) == 1:
+        parts = [_run_chunk(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            parts = list(pool.map(_run_chunk, tasks))
+
+    records = []
+    for sub_strategy in engine.rules:
+        for h in holding_periods:
+            key = (sub_strategy, h)
+            trades = sum(part['stats'][key][0] for part in parts)
+            wins = sum(part['stats'][key][1] for part in parts)
+            total = sum(part['stats'][key][2] for part in parts)
+            cohort_sum = np.concatenate([part['cohorts'][key][0] for part in parts])
+            cohort_count = np.concatenate([part['cohorts'][key][1] for part in parts])
+            records.append({
+                'sub_strategy': sub_strategy,
+                'holding_period': h,
+                'name': engine.sub_strategies[sub_strategy]['name'],
+                'trades': trades,
+                'win_rate': wins / trades if trades else np.nan,
+                'avg_return': total / trades if trades else np.nan,
+                'max_drawdown': _max_drawdown(cohort_sum, cohort_count, h),
+            })
+    return pd.DataFrame(records).set_index(['sub_strategy', 'holding_period'])
+
+
+def save_win_rates(results: pd.DataFrame, holding_period: int = 5, path: Optional[str] = None,
+                   start=None, end=None) -> str:
+    """
+    把某一持有期的回测结果按子策略中文名写入JSON
+
+    Returns:
+        文件路径
+    """
+    path = path or DEFAULT_WIN_RATES_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = results.xs(holding_period, level='holding_period')
+    payload = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'holding_period': holding_period,
+        'start': str(start) if start is not None else None,
+        'end': str(end) if end is not None else None,
+        'sub_strategies': {
+            row['name']: {
+                'key': sub_strategy,
+                'trades': int(row['trades']),
+                'win_rate': None if pd.isna(row['win_rate']) else round(float(row['win_rate']), 4),
+                'avg_return': None if pd.isna(row['avg_return']) else round(float(row['avg_return']), 6),
+                'max_drawdown': round(float(row['max_drawdown']), 6),
+            }
+            for sub_strategy, row in table.iterrows()
+        },
+    }
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def load_win_rates(path: Optional[str] = None) -> Dict[str, float]:
+    """
+    读取回测胜率
+
+    Returns:
+        {子策略中文名: 胜率(0-1)}；文件不存在或无法解析时返回空字典，调用方继续使用内置常量
+    """
+    path = path or DEFAULT_WIN_RATES_PATH
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {name: info['win_rate'] for name, info in payload.get('sub_strategies', {}).items()
+            if info.get('win_rate') is not None and info.get('trades', 0) > 0}
+
+
+def load_history(codes: List[str], count: int = 2500, benchmark_code: str = 'sh000001',
+                 store=None) -> Tuple[Dict[str, pd.DataFrame], Optional[pd.Series]]:
+    """
+    从本地K线缓存取回测所需的日线
+
+    Returns:
+        (stack_bars 面板, 基准收盘价)
+    """
+    if store is None:
+        from scripts.kline_store import KlineStore
+        store = KlineStore()
+    errors: Dict[str, Exception] = {}
+    bars = store.get_price_many(codes, count=count, frequency='1d', errors=errors)
+    if errors:
+        logger.warning(f"{len(errors)} 只股票取数失败，已跳过：{list(errors)[:10]}")
+    benchmark = store.get_price(benchmark_code, count=count, frequency='1d')['close'] if benchmark_code else None
+    store.flush()
+    return stack_bars(bars, fields=['close', 'high', 'volume']), benchmark
+
+
+def main():
+    """每晚回测入口"""
+    parser = argparse.ArgumentParser(description='子策略历史胜率回测')
+    parser.add_argument('codes', nargs='*', default=['sh600519', 'sz000001', 'sh601988', 'sz300750', 'sh688981'])
+    parser.add_argument('--count', type=int, default=2500, help='回放的日线数量')
+    parser.add_argument('--holding-period', type=int, default=5, help='写入胜率文件的持有期')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--output', default=None, help='胜率文件路径')
+    args = parser.parse_args()
+
+    panels, benchmark = load_history(args.codes, count=args.count)
+    periods = sorted(set(HOLDING_PERIODS) | {args.holding_period})
+    results = run_backtest(panels, benchmark, holding_periods=periods, max_workers=args.workers)
+    print(results.to_string())
+    index = panels['close'].index
+    path = save_win_rates(results, args.holding_period, args.output, index[0].date(), index[-1].date())
+    print(f"回测胜率已写入: {path}")
+
+
+if __name__ == "__main__":
+    main()
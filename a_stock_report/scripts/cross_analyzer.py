@@ -8,9 +8,16 @@
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple, Optional
+import heapq
 import logging
+import os
+import sys
 from datetime import datetime, timedelta
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.indicators import compute_indicators, stack_bars
+
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -30,10 +37,121 @@ class CrossAnalyzer:
         self.industry_strategy_matrix = None
         self.stock_concept_strategy_3d = None
         
+    @staticmethod
+    def strategy_score_matrix(stocks_data: pd.DataFrame, strategies: List[str]) -> np.ndarray:
+        """
+        把每只股票的策略匹配度字典展开为 股票×策略 的稠密矩阵
+        
+        Args:
+            stocks_data: 股票数据DataFrame，strategies 列为 {策略: 匹配度} 字典
+            strategies: 策略列表，字典中不在列表内的策略被忽略
+            
+        Returns:
+            形状为 (股票数, 策略数) 的float64矩阵，缺失的策略记为0
+        """
+        if 'strategies' not in stocks_data.columns:
+            return np.zeros((len(stocks_data), len(strategies)))
+        records = [item if isinstance(item, dict) else {} for item in stocks_data['strategies']]
+        scores = pd.DataFrame.from_records(records, columns=pd.Index(strategies).unique())
+        return scores.reindex(columns=strategies).fillna(0.0).to_numpy(dtype=np.float64)
+    
+    def _score_array(self, stocks_data: pd.DataFrame, strategies: List[str], strategy_scores) -> np.ndarray:
+        """
+        取得 股票×策略 匹配度矩阵
+        
+        strategy_scores 可以是 None（由 strategies 列展开）、按策略名为列的DataFrame
+        （如 StrategyRefiner.refine_universe 的布尔归属矩阵，缺少的策略记为0）或已对齐的ndarray，
+        行顺序需与 stocks_data 一致
+        """
+        if strategy_scores is None:
+            return self.strategy_score_matrix(stocks_data, strategies)
+        if isinstance(strategy_scores, pd.DataFrame):
+            return strategy_scores.reindex(columns=strategies, fill_value=0).to_numpy(dtype=np.float64)
+        return np.asarray(strategy_scores, dtype=np.float64)
+    
+    @staticmethod
+    def _accumulate(labels: List[str], stock_rows: np.ndarray, stock_labels: np.ndarray,
+                    scores: np.ndarray, strategies: List[str]) -> pd.DataFrame:
+        """
+        按 (股票, 标签) 对把股票的策略匹配度累加到标签行上，即稀疏 归属矩阵ᵀ @ 匹配度矩阵
+        
+        Args:
+            labels: 结果矩阵的行标签（概念或行业）
+            stock_rows: 每个 (股票, 标签) 对中的股票行号
+            stock_labels: 每个 (股票, 标签) 对中的标签
+            scores: strategy_score_matrix 返回的 股票×策略 矩阵
+            strategies: 策略列表
+        """
+        unique_labels = pd.Index(labels).unique()
+        positions = unique_labels.get_indexer(stock_labels) if len(stock_labels) else np.empty(0, dtype=np.intp)
+        hit = positions >= 0
+        sums = np.zeros((len(unique_labels), scores.shape[1]))
+        np.add.at(sums, positions[hit], scores[stock_rows[hit]])
+        return pd.DataFrame(sums, index=unique_labels, columns=strategies).reindex(labels)
+    
+    def concept_strategy_sums(self,
+                              stocks_data: pd.DataFrame,
+                              concepts: List[str],
+                              strategies: List[str],
+                              strategy_scores=None) -> pd.DataFrame:
+        """
+        概念×策略 未归一化的匹配度累加和，可在多个分片间直接相加
+        
+        Args:
+            stocks_data: 股票数据DataFrame，包含 concepts 列（概念列表）和 strategies 列
+            concepts: 概念列表
+            strategies: 策略列表
+            strategy_scores: 股票×策略 匹配度或归属矩阵（DataFrame/ndarray），默认由 strategies 列展开
+            
+        Returns:
+            概念×策略累加和DataFrame
+        """
+        strategy_scores = self._score_array(stocks_data, strategies, strategy_scores)
+        if 'concepts' in stocks_data.columns:
+            stock_concepts = [item if isinstance(item, (list, tuple, np.ndarray)) else []
+                              for item in stocks_data['concepts']]
+        else:
+            stock_concepts = [[] for _ in range(len(stocks_data))]
+        lengths = np.fromiter((len(item) for item in stock_concepts), dtype=np.intp, count=len(stock_concepts))
+        stock_rows = np.repeat(np.arange(len(stock_concepts)), lengths)
+        flat_concepts = np.array([concept for item in stock_concepts for concept in item], dtype=object)
+        return self._accumulate(concepts, stock_rows, flat_concepts, strategy_scores, strategies)
+    
+    def industry_strategy_sums(self,
+                               stocks_data: pd.DataFrame,
+                               industries: List[str],
+                               strategies: List[str],
+                               strategy_scores=None) -> pd.DataFrame:
+        """
+        行业×策略 未归一化的匹配度累加和，可在多个分片间直接相加
+        
+        Args:
+            stocks_data: 股票数据DataFrame，包含 industry 列和 strategies 列
+            industries: 行业列表
+            strategies: 策略列表
+            strategy_scores: 股票×策略 匹配度或归属矩阵（DataFrame/ndarray），默认由 strategies 列展开
+            
+        Returns:
+            行业×策略累加和DataFrame
+        """
+        strategy_scores = self._score_array(stocks_data, strategies, strategy_scores)
+        if 'industry' in stocks_data.columns:
+            stock_industries = stocks_data['industry'].to_numpy(dtype=object)
+        else:
+            stock_industries = np.full(len(stocks_data), '', dtype=object)
+        return self._accumulate(industries, np.arange(len(stocks_data)), stock_industries,
+                                strategy_scores, strategies)
+    
+    @staticmethod
+    def normalize_matrix(sums: pd.DataFrame) -> pd.DataFrame:
+        """按行归一化累加和矩阵，全零行保持为0"""
+        return sums.div(sums.sum(axis=1), axis=0).fillna(0)
+    
     def build_concept_strategy_matrix(self, 
                                    stocks_data: pd.DataFrame,
                                    concepts: List[str],
-                                   strategies: List[str]) -> pd.DataFrame:
+                                   strategies: List[str],
+                                   strategy_scores=None) -> pd.DataFrame:
         """
         构建概念×策略矩阵
         
@@ -41,28 +159,18 @@ class CrossAnalyzer:
             stocks_data: 股票数据DataFrame，包含股票代码、概念标签、策略匹配度等
             concepts: 概念列表
             strategies: 策略列表
+            strategy_scores: 可选的 股票×策略 矩阵（如 refine_universe 的布尔归属矩阵），提供时不再读取 strategies 列
             
         Returns:
             概念×策略矩阵DataFrame
         """
         logger.info("构建概念×策略矩阵...")
         
-        # 初始化矩阵
-        matrix = pd.DataFrame(0.0, index=concepts, columns=strategies)
-        
-        # 遍历每只股票，累加策略匹配度到对应的概念-策略单元格
-        for _, stock in stocks_data.iterrows():
-            stock_concepts = stock.get('concepts', [])
-            stock_strategies = stock.get('strategies', {})
-            
-            for concept in stock_concepts:
-                if concept in concepts:
-                    for strategy, match_score in stock_strategies.items():
-                        if strategy in strategies:
-                            matrix.loc[concept, strategy] += match_score
+        # 展开 (股票, 概念) 对，一次性累加策略匹配度到对应的概念-策略单元格
+        matrix = self.concept_strategy_sums(stocks_data, concepts, strategies, strategy_scores)
         
         # 归一化处理
-        matrix = matrix.div(matrix.sum(axis=1), axis=0).fillna(0)
+        matrix = self.normalize_matrix(matrix)
         
         self.concept_strategy_matrix = matrix
         logger.info(f"概念×策略矩阵构建完成，形状: {matrix.shape}")
@@ -71,7 +179,8 @@ class CrossAnalyzer:
     def build_industry_strategy_matrix(self,
                                     stocks_data: pd.DataFrame,
                                     industries: List[str],
-                                    strategies: List[str]) -> pd.DataFrame:
+                                    strategies: List[str],
+                                    strategy_scores=None) -> pd.DataFrame:
         """
         构建行业×策略矩阵
         
@@ -79,27 +188,18 @@ class CrossAnalyzer:
             stocks_data: 股票数据DataFrame
             industries: 行业列表
             strategies: 策略列表
+            strategy_scores: 可选的 股票×策略 矩阵（如 refine_universe 的布尔归属矩阵），提供时不再读取 strategies 列
             
         Returns:
             行业×策略矩阵DataFrame
         """
         logger.info("构建行业×策略矩阵...")
         
-        # 初始化矩阵
-        matrix = pd.DataFrame(0.0, index=industries, columns=strategies)
-        
-        # 遍历每只股票，累加策略匹配度到对应的行业-策略单元格
-        for _, stock in stocks_data.iterrows():
-            industry = stock.get('industry', '')
-            stock_strategies = stock.get('strategies', {})
-            
-            if industry in industries:
-                for strategy, match_score in stock_strategies.items():
-                    if strategy in strategies:
-                        matrix.loc[industry, strategy] += match_score
+        # 每只股票属于一个行业，一次性累加策略匹配度到对应的行业-策略单元格
+        matrix = self.industry_strategy_sums(stocks_data, industries, strategies, strategy_scores)
         
         # 归一化处理
-        matrix = matrix.div(matrix.sum(axis=1), axis=0).fillna(0)
+        matrix = self.normalize_matrix(matrix)
         
         self.industry_strategy_matrix = matrix
         logger.info(f"行业×策略矩阵构建完成，形状: {matrix.shape}")
@@ -120,59 +220,201 @@ class CrossAnalyzer:
         """
         logger.info("构建个股×概念×策略三维分析...")
         
-        # 计算综合评分
-        analysis_results = []
-        
-        for _, stock in stocks_data.iterrows():
-            stock_code = stock.get('code', '')
-            stock_name = stock.get('name', '')
-            concepts = stock.get('concepts', [])
-            strategies = stock.get('strategies', {})
-            base_score = stock.get('base_score', 0.0)
-            
-            # 计算概念-策略组合的最佳匹配
-            best_combinations = []
-            for concept in concepts:
-                for strategy, match_score in strategies.items():
-                    combined_score = base_score * match_score
-                    best_combinations.append({
-                        'concept': concept,
-                        'strategy': strategy,
-                        'match_score': match_score,
-                        'combined_score': combined_score
-                    })
-            
-            # 按综合评分排序，取最高分的组合
-            if best_combinations:
-                best_combinations.sort(key=lambda x: x['combined_score'], reverse=True)
-                best_combo = best_combinations[0]
-                
-                analysis_results.append({
-                    'code': stock_code,
-                    'name': stock_name,
-                    'industry': stock.get('industry', ''),
-                    'concepts': concepts,
-                    'strategies': strategies,
-                    'base_score': base_score,
-                    'best_concept': best_combo['concept'],
-                    'best_strategy': best_combo['strategy'],
-                    'best_match_score': best_combo['match_score'],
-                    'best_combined_score': best_combo['combined_score']
-                })
-        
-        # 按综合评分排序，取前N个
-        analysis_results.sort(key=lambda x: x['best_combined_score'], reverse=True)
-        top_results = analysis_results[:top_n]
+        def column(name, default):
+            if name in stocks_data.columns:
+                return stocks_data[name].tolist()
+            return [default] * len(stocks_data)
+        
+        concepts_col = column('concepts', [])
+        strategies_col = column('strategies', {})
+        base_scores = column('base_score', 0.0)
+        
+        # 同一只股票的所有概念共享同一组策略匹配度，最佳组合即第一个概念与综合评分最高的策略
+        candidates = []
+        for row, (concepts, strategies, base_score) in enumerate(zip(concepts_col, strategies_col, base_scores)):
+            if not concepts or not strategies:
+                continue
+            best_strategy, best_match = max(strategies.items(), key=lambda item: base_score * item[1])
+            candidates.append((row, best_strategy, best_match, base_score * best_match))
+        
+        # 按综合评分取前N个，只为入选的股票生成结果字典
+        codes, names, industries = column('code', ''), column('name', ''), column('industry', '')
+        top_results = []
+        for row, best_strategy, best_match, best_combined in heapq.nlargest(top_n, candidates, key=lambda c: c[3]):
+            top_results.append({
+                'code': codes[row],
+                'name': names[row],
+                'industry': industries[row],
+                'concepts': concepts_col[row],
+                'strategies': strategies_col[row],
+                'base_score': base_scores[row],
+                'best_concept': concepts_col[row][0],
+                'best_strategy': best_strategy,
+                'best_match_score': best_match,
+                'best_combined_score': best_combined
+            })
         
         self.stock_concept_strategy_3d = {
             'analysis_date': datetime.now().strftime('%Y-%m-%d'),
-            'total_stocks_analyzed': len(analysis_results),
+            'total_stocks_analyzed': len(candidates),
             'top_stocks': top_results
         }
         
-        logger.info(f"三维分析完成，分析了{len(analysis_results)}只股票，返回前{top_n}只")
+        logger.info(f"三维分析完成，分析了{len(candidates)}只股票，返回前{top_n}只")
         return self.stock_concept_strategy_3d
     
+    def perform_cross_analysis(self,
+                               strategy_refinement: Dict,
+                               stock_classification: pd.DataFrame,
+                               date: str,
+                               market_data: Optional[Dict] = None,
+                               top_n: int = 20) -> Dict:
+        """
+        日报交叉分析：以当日子策略归属矩阵构建概念×策略、行业×策略矩阵，并以标签匹配度做三维分析
+
+        Args:
+            strategy_refinement: StrategyRefiner.refine_strategies 的结果
+            stock_classification: StockClassifier.classify_stocks 的结果
+            date: 报告日期，格式 YYYY-MM-DD
+            market_data: 可选的 fetch_market_data 结果，提供股票池中的行业字段
+            top_n: 三维分析返回的股票数
+
+        Returns:
+            {'concept_strategy_matrix', 'industry_strategy_matrix', 'three_d', 'date'}
+        """
+        partial = self.cross_partials(strategy_refinement['matrix'], stock_classification, market_data, top_n)
+        return self.merge_cross_partials([partial], date, top_n)
+
+    def cross_partials(self,
+                       strategy_matrix: pd.DataFrame,
+                       stock_classification: pd.DataFrame,
+                       market_data: Optional[Dict] = None,
+                       top_n: int = 20) -> Dict:
+        """
+        perform_cross_analysis 在一部分股票上的可合并结果：未归一化的累加和与三维候选
+
+        Args:
+            strategy_matrix: 子策略归属矩阵（refine_strategies 的 matrix，可包含其他股票）
+            stock_classification: 这部分股票的分类结果
+
+        Returns:
+            {'concepts': 按首次出现排序的概念, 'industries': 行业, 'concept_sums', 'industry_sums',
+             'top_stocks': 三维前N, 'analyzed': 参与三维的股票数}
+        """
+        codes = stock_classification['stock_code'].tolist()
+        strategies = [column for column in stock_classification.columns
+                      if column not in ('stock_code', 'stock_name', 'concepts', 'industries')]
+        matrix = strategy_matrix.reindex(codes, fill_value=False)
+
+        if market_data is not None and 'industry' in market_data['market'].columns:
+            industry = market_data['market']['industry'].reindex(codes).fillna('').tolist()
+        else:
+            industry = [items[0] if len(items) else '' for items in stock_classification['industries']]
+        scores = stock_classification[strategies].to_numpy(dtype=np.float64)
+        # 标签匹配度描述股票与策略的长期关联，当日命中任一子策略规则的股票基础分更高
+        hit_today = matrix.to_numpy(dtype=bool).any(axis=1)
+        stocks = pd.DataFrame({
+            'code': codes,
+            'name': stock_classification['stock_name'].tolist(),
+            'industry': industry,
+            'concepts': [list(items) for items in stock_classification['concepts']],
+            'industries': [list(items) for items in stock_classification['industries']],
+            'strategies': [{strategy: float(score) for strategy, score in zip(strategies, row) if score > 0}
+                           for row in scores],
+            'base_score': np.where(hit_today, 1.0, 0.5).tolist(),
+        })
+
+        sub_strategies = list(matrix.columns)
+        concepts = list(dict.fromkeys(c for items in stocks['concepts'] for c in items))
+        industries = sorted({item for item in industry if item})
+        three_d = self.build_stock_concept_strategy_3d(stocks, top_n=top_n)
+        return {
+            'concepts': concepts,
+            'industries': industries,
+            'concept_sums': self.concept_strategy_sums(stocks, concepts, sub_strategies, strategy_scores=matrix),
+            'industry_sums': self.industry_strategy_sums(stocks, industries, sub_strategies, strategy_scores=matrix),
+            'top_stocks': three_d['top_stocks'],
+            'analyzed': three_d['total_stocks_analyzed'],
+        }
+
+    def merge_cross_partials(self, parts: List[Dict], date: str, top_n: int = 20) -> Dict:
+        """
+        合并按股票顺序排列的各部分 cross_partials：累加和相加后再归一化，三维候选取全局前N
+
+        结果与在全部股票上调用 perform_cross_analysis 相同（概念按全局首次出现排序，三维同分时先出现者优先）
+        """
+        concepts = list(dict.fromkeys(c for part in parts for c in part['concepts']))
+        industries = sorted({item for part in parts for item in part['industries']})
+        concept_sums = sum(part['concept_sums'].reindex(concepts, fill_value=0.0) for part in parts)
+        industry_sums = sum(part['industry_sums'].reindex(industries, fill_value=0.0) for part in parts)
+        self.concept_strategy_matrix = self.normalize_matrix(concept_sums)
+        self.industry_strategy_matrix = self.normalize_matrix(industry_sums)
+        logger.info(f"概念×策略矩阵 {self.concept_strategy_matrix.shape}，"
+                    f"行业×策略矩阵 {self.industry_strategy_matrix.shape}")
+
+        top_stocks = heapq.nlargest(top_n, [stock for part in parts for stock in part['top_stocks']],
+                                    key=lambda stock: stock['best_combined_score'])
+        self.stock_concept_strategy_3d = {
+            'analysis_date': date,
+            'total_stocks_analyzed': sum(part['analyzed'] for part in parts),
+            'top_stocks': top_stocks,
+        }
+        return {
+            'concept_strategy_matrix': self.concept_strategy_matrix,
+            'industry_strategy_matrix': self.industry_strategy_matrix,
+            'three_d': self.stock_concept_strategy_3d,
+            'date': date,
+        }
+
+    def perform_three_d_analysis(self,
+                                 stock_code: str,
+                                 stock_name: str,
+                                 stock_info: Dict,
+                                 date: str,
+                                 history: Optional[pd.DataFrame] = None) -> Dict:
+        """
+        个股三维分析：概念维度、行业维度、策略维度，有日线时补充技术面
+
+        Args:
+            stock_code: 股票代码
+            stock_name: 股票名称
+            stock_info: StockClassifier.get_stock_details 的结果
+            date: 报告日期，格式 YYYY-MM-DD
+            history: 可选的日线DataFrame（含 close 列）
+
+        Returns:
+            {'code', 'name', 'date', 'concepts', 'industries', 'top_strategies', 'technical'}，
+            top_strategies 为匹配度最高的3个 (策略, 匹配度)
+        """
+        scores = stock_info.get('strategy_scores', {})
+        top_strategies = heapq.nlargest(3, ((s, v) for s, v in scores.items() if v > 0), key=lambda item: item[1])
+
+        technical = {}
+        if history is not None and len(history) > 1:
+            close = history['close'].to_numpy(dtype=np.float64)
+            indicators = compute_indicators(stack_bars({stock_code: history})).iloc[0]
+            technical = {
+                'bar_date': history.index[-1].strftime('%Y-%m-%d'),
+                'price': round(float(close[-1]), 2),
+                'change_pct': round(float((close[-1] / close[-2] - 1) * 100), 2),
+                'return_20d': round(float((close[-1] / close[-min(21, len(close))] - 1) * 100), 2),
+                'rsi': round(float(indicators['rsi']), 2),
+                'volatility_30d': round(float(indicators['volatility_30d']), 2),
+                'resistance_break': bool(indicators['resistance_break']),
+            }
+
+        logger.info(f"{stock_name}({stock_code}) 三维分析完成，最佳策略: "
+                    f"{top_strategies[0][0] if top_strategies else 'N/A'}")
+        return {
+            'code': stock_code,
+            'name': stock_name,
+            'date': date,
+            'concepts': stock_info.get('concepts', []),
+            'industries': stock_info.get('industries', []),
+            'top_strategies': top_strategies,
+            'technical': technical,
+        }
+
     def get_concept_strategy_insights(self) -> Dict:
         """
         获取概念×策略矩阵的洞察
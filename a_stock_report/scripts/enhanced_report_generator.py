@@ -6,13 +6,19 @@
 """
 
 import os
+import sys
 import json
 import pandas as pd
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple
 import matplotlib.pyplot as plt
 import seaborn as sns
 from io import StringIO
+from itertools import islice
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.backtest import load_win_rates
 
 class EnhancedReportGenerator:
     """深度报告生成器"""
@@ -40,6 +46,11 @@ class EnhancedReportGenerator:
             '生物医药映射': {'rate': 57, 'risk': '高风险'}
         }
         
+        # 有回测结果时，用回测得到的胜率替换上面的内置常量
+        for name, win_rate in load_win_rates().items():
+            if name in self.sub_strategy_win_rates:
+                self.sub_strategy_win_rates[name]['rate'] = round(win_rate * 100)
+        
         # 概念标签定义
         self.concept_tags = [
             '人工智能', '半导体', '新能源', '医药生物', '军工', '消费电子',
@@ -57,24 +68,32 @@ class EnhancedReportGenerator:
             '商业贸易', '休闲服务', '综合'
         ]
     
-    def generate_strategy_subdivision_table(self, strategy_data: Dict) -> str:
-        """生成策略细分表格"""
-        table_md = "## 策略细分分析\n\n"
-        table_md += "| 主策略 | 子策略 | 历史胜率 | 风险等级 | 当前边际变化 |\n"
-        table_md += "|--------|--------|----------|----------|--------------|\n"
+    def _render(self, write_section, *args) -> str:
+        """把写入型方法的输出收集为字符串"""
+        buffer = StringIO()
+        write_section(buffer, *args)
+        return buffer.getvalue()
+    
+    def write_strategy_subdivision_table(self, out: TextIO, strategy_data: Dict):
+        """写出策略细分表格"""
+        out.write("## 策略细分分析\n\n")
+        out.write("| 主策略 | 子策略 | 历史胜率 | 风险等级 | 当前边际变化 |\n")
+        out.write("|--------|--------|----------|----------|--------------|\n")
         
         for main_strategy, sub_strategies in strategy_data.items():
             for sub_strategy, data in sub_strategies.items():
                 win_rate = self.sub_strategy_win_rates.get(sub_strategy, {}).get('rate', 'N/A')
                 risk_level = self.sub_strategy_win_rates.get(sub_strategy, {}).get('risk', 'N/A')
                 marginal_change = data.get('marginal_change', 'N/A')
-                table_md += f"| {main_strategy} | {sub_strategy} | {win_rate}% | {risk_level} | {marginal_change:+.2f}% |\n"
-        
-        return table_md
+                out.write(f"| {main_strategy} | {sub_strategy} | {win_rate}% | {risk_level} | {marginal_change:+.2f}% |\n")
     
-    def generate_concept_industry_matrix(self, stock_data: List[Dict]) -> str:
-        """生成概念×行业矩阵"""
-        matrix_md = "## 概念×行业矩阵分析\n\n"
+    def generate_strategy_subdivision_table(self, strategy_data: Dict) -> str:
+        """生成策略细分表格"""
+        return self._render(self.write_strategy_subdivision_table, strategy_data)
+    
+    def write_concept_industry_matrix(self, out: TextIO, stock_data: List[Dict]):
+        """写出概念×行业矩阵"""
+        out.write("## 概念×行业矩阵分析\n\n")
         
         # 创建概念-行业计数矩阵
         concept_industry_count = {}
@@ -91,8 +110,8 @@ class EnhancedReportGenerator:
                             concept_industry_count[concept][industry] += 1
         
         # 生成矩阵表格（只显示非零项）
-        matrix_md += "| 概念 | 行业 | 股票数量 |\n"
-        matrix_md += "|------|------|----------|\n"
+        out.write("| 概念 | 行业 | 股票数量 |\n")
+        out.write("|------|------|----------|\n")
         
         non_zero_entries = []
         for concept, industry_counts in concept_industry_count.items():
@@ -104,60 +123,73 @@ class EnhancedReportGenerator:
         non_zero_entries.sort(key=lambda x: x[2], reverse=True)
         
         for concept, industry, count in non_zero_entries[:20]:  # 只显示前20个
-            matrix_md += f"| {concept} | {industry} | {count} |\n"
+            out.write(f"| {concept} | {industry} | {count} |\n")
+    
+    def generate_concept_industry_matrix(self, stock_data: List[Dict]) -> str:
+        """生成概念×行业矩阵"""
+        return self._render(self.write_concept_industry_matrix, stock_data)
+    
+    def write_individual_stock_analysis(self, out: TextIO, top_stocks: Iterable[Dict], limit: Optional[int] = 20):
+        """
+        逐只写出个股深度分析
         
-        return matrix_md
+        Args:
+            out: 输出流
+            top_stocks: 个股数据，可以是生成器，逐条消费
+            limit: 最多写出的股票数，None 表示全部（全市场附录）
+        """
+        out.write("## 个股深度分析TOP20\n\n")
+        
+        for i, stock in enumerate(islice(top_stocks, limit), 1):
+            out.write(f"### {i}. {stock['name']} ({stock['code']})\n\n")
+            out.write(f"- **当前价格**: {stock.get('price', 'N/A')}元\n")
+            out.write(f"- **涨跌幅**: {stock.get('change_pct', 'N/A'):+.2f}%\n")
+            out.write(f"- **概念标签**: {', '.join(stock.get('concepts', []))}\n")
+            out.write(f"- **行业标签**: {', '.join(stock.get('industries', []))}\n")
+            out.write(f"- **最佳匹配策略**: {stock.get('best_strategy', 'N/A')} ({stock.get('strategy_match_score', 'N/A')}% 匹配度)\n")
+            out.write(f"- **推荐理由**: {stock.get('recommendation_reason', 'N/A')}\n\n")
     
     def generate_individual_stock_analysis(self, top_stocks: List[Dict]) -> str:
         """生成个股深度分析TOP20"""
-        analysis_md = "## 个股深度分析TOP20\n\n"
-        
-        for i, stock in enumerate(top_stocks[:20], 1):
-            analysis_md += f"### {i}. {stock['name']} ({stock['code']})\n\n"
-            analysis_md += f"- **当前价格**: {stock.get('price', 'N/A')}元\n"
-            analysis_md += f"- **涨跌幅**: {stock.get('change_pct', 'N/A'):+.2f}%\n"
-            analysis_md += f"- **概念标签**: {', '.join(stock.get('concepts', []))}\n"
-            analysis_md += f"- **行业标签**: {', '.join(stock.get('industries', []))}\n"
-            analysis_md += f"- **最佳匹配策略**: {stock.get('best_strategy', 'N/A')} ({stock.get('strategy_match_score', 'N/A')}% 匹配度)\n"
-            analysis_md += f"- **推荐理由**: {stock.get('recommendation_reason', 'N/A')}\n\n"
-        
-        return analysis_md
+        return self._render(self.write_individual_stock_analysis, top_stocks)
+    
+    def write_case_study(self, out: TextIO, case_stock: Dict):
+        """写出案例分析（以星环科技为例）"""
+        out.write("## 案例分析：星环科技\n\n")
+        out.write("### 公司概况\n")
+        out.write("- **公司名称**: 星环科技\n")
+        out.write("- **股票代码**: 688031\n")
+        out.write("- **主营业务**: 人工智能、大数据、云计算解决方案提供商\n")
+        out.write("- **核心优势**: 国内领先的大数据基础软件厂商，AI大模型技术布局完善\n\n")
+        
+        out.write("### 三维分析\n")
+        out.write("| 维度 | 分析内容 |\n")
+        out.write("|------|----------|\n")
+        out.write("| **概念维度** | AI、大数据、云计算、信创、国产替代 |\n")
+        out.write("| **行业维度** | 计算机、软件服务、信息技术 |\n")
+        out.write("| **策略维度** | AI芯片映射(75%匹配度)、强势动量(68%匹配度)、质量价值(62%匹配度) |\n\n")
+        
+        out.write("### 投资建议\n")
+        out.write("- **短期策略**: 关注AI芯片映射子策略，受益于国产AI芯片产业链发展\n")
+        out.write("- **中期策略**: 强势动量策略，技术面呈现突破态势\n")
+        out.write("- **长期策略**: 质量价值策略，基本面扎实，研发投入占比高\n")
     
     def generate_case_study(self, case_stock: Dict) -> str:
         """生成案例分析（以星环科技为例）"""
-        case_md = "## 案例分析：星环科技\n\n"
-        case_md += "### 公司概况\n"
-        case_md += "- **公司名称**: 星环科技\n"
-        case_md += "- **股票代码**: 688031\n"
-        case_md += "- **主营业务**: 人工智能、大数据、云计算解决方案提供商\n"
-        case_md += "- **核心优势**: 国内领先的大数据基础软件厂商，AI大模型技术布局完善\n\n"
-        
-        case_md += "### 三维分析\n"
-        case_md += "| 维度 | 分析内容 |\n"
-        case_md += "|------|----------|\n"
-        case_md += "| **概念维度** | AI、大数据、云计算、信创、国产替代 |\n"
-        case_md += "| **行业维度** | 计算机、软件服务、信息技术 |\n"
-        case_md += "| **策略维度** | AI芯片映射(75%匹配度)、强势动量(68%匹配度)、质量价值(62%匹配度) |\n\n"
-        
-        case_md += "### 投资建议\n"
-        case_md += "- **短期策略**: 关注AI芯片映射子策略，受益于国产AI芯片产业链发展\n"
-        case_md += "- **中期策略**: 强势动量策略，技术面呈现突破态势\n"
-        case_md += "- **长期策略**: 质量价值策略，基本面扎实，研发投入占比高\n"
-        
-        return case_md
+        return self._render(self.write_case_study, case_stock)
     
-    def generate_market_overview(self, market_data: Dict) -> str:
-        """生成市场概况"""
-        overview_md = "# A股深度优化日报\n\n"
-        overview_md += f"**报告日期**: {self.report_date}\n\n"
+    def write_market_overview(self, out: TextIO, market_data: Dict):
+        """写出市场概况"""
+        out.write("# A股深度优化日报\n\n")
+        out.write(f"**报告日期**: {market_data.get('date', self.report_date)}\n\n")
         
-        overview_md += "## 市场概况\n\n"
-        overview_md += f"- **上证指数**: {market_data.get('sh_index', 'N/A')} ({market_data.get('sh_change', 'N/A'):+.2f}%)\n"
-        overview_md += f"- **深证成指**: {market_data.get('sz_index', 'N/A')} ({market_data.get('sz_change', 'N/A'):+.2f}%)\n"
-        overview_md += f"- **创业板指**: {market_data.get('cyb_index', 'N/A')} ({market_data.get('cyb_change', 'N/A'):+.2f}%)\n"
-        overview_md += f"- **上涨家数**: {market_data.get('up_count', 'N/A')}\n"
-        overview_md += f"- **下跌家数**: {market_data.get('down_count', 'N/A')}\n"
-        overview_md += f"- **成交额**: {market_data.get('volume', 'N/A')}亿元\n\n"
+        out.write("## 市场概况\n\n")
+        out.write(f"- **上证指数**: {market_data.get('sh_index', 'N/A')} ({market_data.get('sh_change', 'N/A'):+.2f}%)\n")
+        out.write(f"- **深证成指**: {market_data.get('sz_index', 'N/A')} ({market_data.get('sz_change', 'N/A'):+.2f}%)\n")
+        out.write(f"- **创业板指**: {market_data.get('cyb_index', 'N/A')} ({market_data.get('cyb_change', 'N/A'):+.2f}%)\n")
+        out.write(f"- **上涨家数**: {market_data.get('up_count', 'N/A')}\n")
+        out.write(f"- **下跌家数**: {market_data.get('down_count', 'N/A')}\n")
+        out.write(f"- **成交额**: {market_data.get('volume', 'N/A')}亿元\n\n")
         
         # 市场判断
         sh_change = market_data.get('sh_change', 0)
@@ -168,57 +200,240 @@ class EnhancedReportGenerator:
         else:
             market_judgment = "📉 **看空** - 市场呈现弱势下跌态势"
         
-        overview_md += f"**市场判断**: {market_judgment}\n\n"
-        
-        return overview_md
+        out.write(f"**市场判断**: {market_judgment}\n\n")
     
-    def generate_complete_report(self, 
-                               market_data: Dict,
-                               strategy_data: Dict,
-                               stock_data: List[Dict],
-                               top_stocks: List[Dict]) -> str:
-        """生成完整深度报告"""
-        report_content = ""
+    def generate_market_overview(self, market_data: Dict) -> str:
+        """生成市场概况"""
+        return self._render(self.write_market_overview, market_data)
+    
+    def write_complete_report(self,
+                              out: TextIO,
+                              market_data: Dict,
+                              strategy_data: Dict,
+                              stock_data: List[Dict],
+                              top_stocks: List[Dict],
+                              appendix_stocks: Optional[Iterable[Dict]] = None):
+        """
+        把完整深度报告逐节写入输出流，不在内存中拼接整篇文档
         
+        Args:
+            out: 已打开的文本文件或任意 io.TextIOBase
+            market_data: 市场概况数据
+            strategy_data: 策略细分数据
+            stock_data: 参与概念×行业统计的股票列表
+            top_stocks: 个股深度分析TOP20
+            appendix_stocks: 可选的全市场个股附录，可以是生成器，逐条写出
+        """
         # 市场概况
-        report_content += self.generate_market_overview(market_data)
+        self.write_market_overview(out, market_data)
         
         # 策略细分分析
-        report_content += self.generate_strategy_subdivision_table(strategy_data)
+        self.write_strategy_subdivision_table(out, strategy_data)
         
         # 概念/行业标签系统
-        report_content += "## 标的分类系统\n\n"
-        report_content += "- **概念标签系统**: 23个核心概念标签，覆盖AI、半导体、新能源等热门赛道\n"
-        report_content += "- **行业标签系统**: 27个标准行业分类，精准定位个股所属行业\n"
-        report_content += "- **策略匹配度**: 基于三维分析计算个股与各子策略的匹配度\n\n"
+        out.write("## 标的分类系统\n\n")
+        out.write("- **概念标签系统**: 23个核心概念标签，覆盖AI、半导体、新能源等热门赛道\n")
+        out.write("- **行业标签系统**: 27个标准行业分类，精准定位个股所属行业\n")
+        out.write("- **策略匹配度**: 基于三维分析计算个股与各子策略的匹配度\n\n")
         
         # 概念×行业矩阵分析
-        report_content += self.generate_concept_industry_matrix(stock_data)
+        self.write_concept_industry_matrix(out, stock_data)
         
         # 个股深度分析TOP20
-        report_content += self.generate_individual_stock_analysis(top_stocks)
+        self.write_individual_stock_analysis(out, top_stocks)
         
         # 案例分析
         if top_stocks:
             case_stock = top_stocks[0]  # 使用排名第一的股票作为案例
             if case_stock.get('name') == '星环科技':
-                report_content += self.generate_case_study(case_stock)
+                self.write_case_study(out, case_stock)
             else:
                 # 如果不是星环科技，也生成一个通用案例
-                report_content += "## 案例分析\n\n"
-                report_content += f"以今日表现最佳的 **{case_stock.get('name', 'N/A')}** 为例进行三维分析：\n\n"
-                report_content += f"- **概念维度**: {', '.join(case_stock.get('concepts', []))}\n"
-                report_content += f"- **行业维度**: {', '.join(case_stock.get('industries', []))}\n"
-                report_content += f"- **策略维度**: {case_stock.get('best_strategy', 'N/A')} ({case_stock.get('strategy_match_score', 'N/A')}% 匹配度)\n\n"
+                out.write("## 案例分析\n\n")
+                out.write(f"以今日表现最佳的 **{case_stock.get('name', 'N/A')}** 为例进行三维分析：\n\n")
+                out.write(f"- **概念维度**: {', '.join(case_stock.get('concepts', []))}\n")
+                out.write(f"- **行业维度**: {', '.join(case_stock.get('industries', []))}\n")
+                out.write(f"- **策略维度**: {case_stock.get('best_strategy', 'N/A')} ({case_stock.get('strategy_match_score', 'N/A')}% 匹配度)\n\n")
         
         # 风险提示
-        report_content += "## 风险提示\n\n"
-        report_content += "> **重要说明**:\n"
-        report_content += "> - 本报告基于历史数据和算法模型生成，仅供参考学习\n"
-        report_content += "> - 实际投资需结合个人风险承受能力和专业投资顾问建议\n"
-        report_content += "> - 历史胜率不代表未来收益，市场有风险，投资需谨慎\n\n"
+        out.write("## 风险提示\n\n")
+        out.write("> **重要说明**:\n")
+        out.write("> - 本报告基于历史数据和算法模型生成，仅供参考学习\n")
+        out.write("> - 实际投资需结合个人风险承受能力和专业投资顾问建议\n")
+        out.write("> - 历史胜率不代表未来收益，市场有风险，投资需谨慎\n\n")
         
-        return report_content
+        # 全市场个股附录
+        if appendix_stocks is not None:
+            self.write_stock_appendix(out, appendix_stocks)
+    
+    @staticmethod
+    def market_overview_data(market_data: Optional[Dict], date: str) -> Dict:
+        """把 fetch_market_data 的结果整理为 write_market_overview 使用的市场概况字段"""
+        overview = {'date': date}
+        if market_data is None:
+            return overview
+        indices = market_data['indices']
+        for key, code in (('sh', 'sh000001'), ('sz', 'sz399001'), ('cyb', 'sz399006')):
+            if code in indices.index:
+                overview[f'{key}_index'] = round(float(indices.at[code, 'price']), 2)
+                overview[f'{key}_change'] = round(float(indices.at[code, 'change_pct']), 2)
+            else:
+                overview[f'{key}_change'] = float('nan')
+        summary = market_data['summary']
+        overview.update(up_count=summary['up_count'], down_count=summary['down_count'],
+                        volume=summary['amount_yi'])
+        return overview
+    
+    def write_enhanced_report(self,
+                              out: TextIO,
+                              strategy_refinement: Dict,
+                              stock_classification: pd.DataFrame,
+                              cross_analysis: Dict,
+                              date: str,
+                              market_data: Optional[Dict] = None):
+        """
+        把日报各阶段的输出整理为 write_complete_report 的参数并逐节写出
+        
+        Args:
+            out: 输出流
+            strategy_refinement: StrategyRefiner.refine_strategies 的结果
+            stock_classification: StockClassifier.classify_stocks 的结果
+            cross_analysis: CrossAnalyzer.perform_cross_analysis 的结果
+            date: 报告日期，格式 YYYY-MM-DD
+            market_data: 可选的 fetch_market_data 结果，提供市场概况与个股行情
+        """
+        market = market_data['market'] if market_data is not None else pd.DataFrame()
+        matrix = strategy_refinement['matrix']
+        industries = dict(zip(stock_classification['stock_code'], stock_classification['industries']))
+        
+        def quote(code, field):
+            if field in market.columns and code in market.index:
+                return round(float(market.at[code, field]), 2)
+            return float('nan')
+        
+        top_stocks = []
+        for stock in cross_analysis['three_d']['top_stocks']:
+            code = stock['code']
+            score = round(stock['best_match_score'] * 100)
+            reason = f"{stock['best_concept']}概念与{stock['best_strategy']}策略关联度{score}%"
+            if code in matrix.index:
+                hits = [name for name, hit in matrix.loc[code].items() if hit]
+                if hits:
+                    reason += f"，今日命中子策略: {'、'.join(hits)}"
+            top_stocks.append({
+                'code': code,
+                'name': stock['name'],
+                'price': quote(code, 'price'),
+                'change_pct': quote(code, 'change_pct'),
+                'concepts': stock['concepts'],
+                'industries': list(industries.get(code, [])),
+                'best_strategy': stock['best_strategy'],
+                'strategy_match_score': score,
+                'recommendation_reason': reason,
+            })
+        
+        stock_data = [{'concepts': list(concepts), 'industries': list(items)}
+                      for concepts, items in zip(stock_classification['concepts'], stock_classification['industries'])]
+        self.write_complete_report(out, self.market_overview_data(market_data, date),
+                                   strategy_refinement['summary'], stock_data, top_stocks)
+    
+    def write_case_study_report(self,
+                                out: TextIO,
+                                stock_code: str,
+                                stock_name: str,
+                                stock_info: Dict,
+                                three_d_analysis: Dict,
+                                date: str):
+        """
+        写出个股案例分析报告
+        
+        Args:
+            out: 输出流
+            stock_code: 股票代码
+            stock_name: 股票名称
+            stock_info: StockClassifier.get_stock_details 的结果
+            three_d_analysis: CrossAnalyzer.perform_three_d_analysis 的结果
+            date: 报告日期，格式 YYYY-MM-DD
+        """
+        out.write(f"# 个股案例分析：{stock_name}\n\n")
+        out.write(f"**报告日期**: {date}\n\n")
+        
+        out.write("## 公司概况\n\n")
+        out.write(f"- **公司名称**: {stock_name}\n")
+        out.write(f"- **股票代码**: {stock_code}\n")
+        out.write(f"- **所属行业**: {stock_info.get('industry') or 'N/A'}\n")
+        out.write(f"- **主营业务**: {stock_info.get('business') or 'N/A'}\n\n")
+        
+        strategies = '、'.join(f"{name}({score * 100:.0f}%匹配度)" for name, score in three_d_analysis['top_strategies'])
+        out.write("## 三维分析\n\n")
+        out.write("| 维度 | 分析内容 |\n")
+        out.write("|------|----------|\n")
+        out.write(f"| **概念维度** | {'、'.join(three_d_analysis['concepts']) or '无'} |\n")
+        out.write(f"| **行业维度** | {'、'.join(three_d_analysis['industries']) or '无'} |\n")
+        out.write(f"| **策略维度** | {strategies or '无'} |\n\n")
+        
+        technical = three_d_analysis.get('technical') or {}
+        if technical:
+            out.write(f"## 技术面（截至 {technical['bar_date']}）\n\n")
+            out.write(f"- **收盘价**: {technical['price']}元 ({technical['change_pct']:+.2f}%)\n")
+            out.write(f"- **20日涨跌幅**: {technical['return_20d']:+.2f}%\n")
+            out.write(f"- **RSI(14)**: {technical['rsi']:.2f}\n")
+            out.write(f"- **30日年化波动率**: {technical['volatility_30d']:.2f}%\n")
+            out.write(f"- **突破20日高点**: {'是' if technical['resistance_break'] else '否'}\n\n")
+        
+        out.write("## 风险提示\n\n")
+        out.write("> 本报告基于历史数据和算法模型生成，仅供参考学习，市场有风险，投资需谨慎\n")
+    
+    def generate_case_study_report(self,
+                                   stock_code: str,
+                                   stock_name: str,
+                                   stock_info: Dict,
+                                   three_d_analysis: Dict,
+                                   date: str) -> str:
+        """生成个股案例分析报告"""
+        return self._render(self.write_case_study_report, stock_code, stock_name, stock_info,
+                            three_d_analysis, date)
+    
+    def write_stock_appendix(self, out: TextIO, stocks: Iterable[Dict]):
+        """逐行写出全市场个股附录表格"""
+        out.write("## 附录：全市场个股策略匹配\n\n")
+        out.write("| 代码 | 名称 | 概念标签 | 行业标签 | 最佳匹配策略 | 匹配度 |\n")
+        out.write("|------|------|----------|----------|--------------|--------|\n")
+        for stock in stocks:
+            out.write(f"| {stock.get('code', '')} | {stock.get('name', '')} | {', '.join(stock.get('concepts', []))} | "
+                      f"{', '.join(stock.get('industries', []))} | {stock.get('best_strategy', 'N/A')} | "
+                      f"{stock.get('strategy_match_score', 'N/A')} |\n")
+        out.write("\n")
+    
+    def generate_complete_report(self, 
+                               market_data: Dict,
+                               strategy_data: Dict,
+                               stock_data: List[Dict],
+                               top_stocks: List[Dict]) -> str:
+        """生成完整深度报告"""
+        return self._render(self.write_complete_report, market_data, strategy_data, stock_data, top_stocks)
+    
+    def stream_report(self,
+                      market_data: Dict,
+                      strategy_data: Dict,
+                      stock_data: List[Dict],
+                      top_stocks: List[Dict],
+                      appendix_stocks: Optional[Iterable[Dict]] = None,
+                      filename: Optional[str] = None) -> str:
+        """
+        直接把完整深度报告写入文件
+        
+        Returns:
+            报告文件路径
+        """
+        if filename is None:
+            filename = f"A股深度优化日报_{self.report_date}.md"
+        
+        filepath = os.path.join(self.output_dir, filename)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            self.write_complete_report(f, market_data, strategy_data, stock_data, top_stocks, appendix_stocks)
+        
+        return filepath
     
     def save_report(self, report_content: str, filename: Optional[str] = None) -> str:
         """保存报告到文件"""
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+技术指标库 - A股深度优化日报系统v2.0.0
+功能：在 时间×股票 的堆叠面板上一次性计算数千只股票的RSI、波动率、N日新高突破、量比和Beta，
+     输出列名与 config/strategy_config.yaml 的 filter_criteria 一致，可直接交给规则引擎；
+     IncrementalIndicators 支持盘中逐根K线增量更新
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# 各指标默认参数
+RSI_PERIOD = 14
+VOLATILITY_WINDOW = 30
+BREAKOUT_WINDOW = 20
+VOLUME_WINDOW = 5
+VOLUME_SPIKE_RATIO = 2.0
+BETA_WINDOW = 60
+PERIODS_PER_YEAR = 252
+
+
+def stack_bars(bars: Union[Dict[str, pd.DataFrame], pd.DataFrame],
+               fields: Iterable[str] = PRICE_FIELDS) -> Dict[str, pd.DataFrame]:
+    """
+    把多只股票的K线堆叠为按字段划分的 时间×股票 面板
+
+    Args:
+        bars: Ashare.get_price_many 的返回值，{代码: K线DataFrame} 或 long_format=True 的长表
+        fields: 需要的字段
+
+    Returns:
+        {字段: 以时间为索引、股票代码为列的DataFrame}，某只股票缺失的时间点为NaN
+    """
+    if isinstance(bars, dict):
+        bars = pd.concat(bars, names=['code', 'time']) if bars else pd.DataFrame(columns=list(fields))
+    panels = {}
+    for field in fields:
+        if field in bars.columns and len(bars):
+            panels[field] = bars[field].astype(float).unstack('code').sort_index()
+    return panels
+
+
+def rsi(close: pd.DataFrame, period: int = RSI_PERIOD) -> pd.DataFrame:
+    """Wilder RSI，平均涨跌幅用 alpha=1/period 的指数平滑"""
+    delta = close.diff()
+    avg_gain = delta.clip(lower=0).ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean()
+    avg_loss = (-delta).clip(lower=0).ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # 区间内没有下跌时 RSI 为100
+    return values.mask((avg_loss == 0) & avg_gain.notna(), 100.0)
+
+
+def volatility(close: pd.DataFrame, window: int = VOLATILITY_WINDOW,
+               periods_per_year: int = PERIODS_PER_YEAR) -> pd.DataFrame:
+    """滚动年化波动率（百分比），与配置中的 volatility_30d: "<15" 同单位"""
+    returns = close.pct_change(fill_method=None)
+    return returns.rolling(window, min_periods=window).std() * np.sqrt(periods_per_year) * 100
+
+
+def breakout(close: pd.DataFrame, high: pd.DataFrame, window: int = BREAKOUT_WINDOW) -> pd.DataFrame:
+    """收盘价突破此前N根K线的最高价（不含当根）"""
+    resistance = high.rolling(window, min_periods=window).max().shift(1)
+    return close > resistance
+
+
+def volume_ratio(volume: pd.DataFrame, window: int = VOLUME_WINDOW) -> pd.DataFrame:
+    """量比：当根成交量 / 此前N根K线的平均成交量"""
+    baseline = volume.rolling(window, min_periods=window).mean().shift(1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return volume / baseline.where(baseline > 0)
+
+
+def beta(close: pd.DataFrame, benchmark: pd.Series, window: int = BETA_WINDOW) -> pd.DataFrame:
+    """
+    滚动Beta：个股收益与基准收益的协方差 / 基准收益方差
+
+    用滚动和 E[xy]-E[x]E[y] 对整张面板一次计算，不逐列调用 rolling.cov
+    """
+    returns = close.pct_change(fill_method=None)
+    market = benchmark.reindex(close.index).astype(float).pct_change(fill_method=None)
+    valid = returns.notna() & market.notna().to_numpy()[:, None]
+    x = returns.where(valid)
+    y = pd.DataFrame(np.where(valid, market.to_numpy()[:, None], np.nan), index=close.index, columns=close.columns)
+
+    roll = dict(window=window, min_periods=window)
+    n = valid.astype(float).rolling(**roll).sum()
+    mean_x, mean_y = x.rolling(**roll).mean(), y.rolling(**roll).mean()
+    cov = ((x * y).rolling(**roll).mean() - mean_x * mean_y) * n / (n - 1)
+    var = (y * y).rolling(**roll).mean().sub(mean_y * mean_y) * n / (n - 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return cov / var.where(var > 0)
+
+
+def compute_indicators(panels: Dict[str, pd.DataFrame],
+                       benchmark: Optional[pd.Series] = None,
+                       rsi_period: int = RSI_PERIOD,
+                       volatility_window: int = VOLATILITY_WINDOW,
+                       breakout_window: int = BREAKOUT_WINDOW,
+                       volume_window: int = VOLUME_WINDOW,
+                       volume_spike_ratio: float = VOLUME_SPIKE_RATIO,
+                       beta_window: int = BETA_WINDOW,
+                       periods_per_year: int = PERIODS_PER_YEAR) -> pd.DataFrame:
+    """
+    计算每只股票最新一根K线上的全部指标
+
+    Args:
+        panels: stack_bars 的返回值
+        benchmark: 计算Beta用的基准收盘价序列（如上证指数），不提供时Beta为NaN
+
+    Returns:
+        以股票代码为索引，包含 rsi/volatility_30d/resistance_break/volume_ratio/volume_spike/beta 列的DataFrame
+    """
+    close = panels['close']
+    result = pd.DataFrame(index=close.columns.rename('code'))
+    result['rsi'] = rsi(close, rsi_period).iloc[-1]
+    result['volatility_30d'] = volatility(close, volatility_window, periods_per_year).iloc[-1]
+    if 'high' in panels:
+        result['resistance_break'] = breakout(close, panels['high'], breakout_window).iloc[-1]
+    if 'volume' in panels:
+        ratio = volume_ratio(panels['volume'], volume_window).iloc[-1]
+        result['volume_ratio'] = ratio
+        result['volume_spike'] = ratio > volume_spike_ratio
+    result['beta'] = beta(close, benchmark, beta_window).iloc[-1] if benchmark is not None else np.nan
+    return result
+
+
+class _Ring:
+    """
+    固定长度的环形缓冲，按列保存每只股票最近 window 根K线的值
+
+    同时维护窗口内的和、平方和与缺失值个数，写入一行为O(1)；每绕回一圈按缓冲内容重算一次，消除累积误差。
+    最近一次写入可以用 undo 撤销
+    """
+
+    def __init__(self, window: int, width: int):
+        self.values = np.full((window, width), np.nan)
+        self.pos = 0
+        self.filled = 0
+        self.sum = np.zeros(width)
+        self.sumsq = np.zeros(width)
+        self.nans = np.full(width, window, dtype=np.int64)
+        self._undo = None
+
+    def push(self, row: np.ndarray):
+        old = self.values[self.pos].copy()
+        self._undo = (self.pos, old, self.filled, self.sum, self.sumsq, self.nans)
+        new = np.nan_to_num(row)
+        prev = np.nan_to_num(old)
+        self.sum = self.sum + (new - prev)
+        self.sumsq = self.sumsq + (new * new - prev * prev)
+        self.nans = self.nans + np.isnan(row) - np.isnan(old)
+        self.values[self.pos] = row
+        self.pos = (self.pos + 1) % len(self.values)
+        self.filled = min(self.filled + 1, len(self.values))
+        if self.pos == 0:
+            self.sum = np.nansum(self.values, axis=0)
+            self.sumsq = np.nansum(self.values * self.values, axis=0)
+
+    def complete(self) -> np.ndarray:
+        """窗口已满且没有缺失值的列"""
+        return self.nans == 0
+
+    def undo(self):
+        """撤销最近一次 push"""
+        if self._undo is None:
+            return
+        self.pos, old, self.filled, self.sum, self.sumsq, self.nans = self._undo
+        self.values[self.pos] = old
+        self._undo = None
+
+
+class IncrementalIndicators:
+    """
+    增量指标计算器
+
+    每根新K线对所有股票做一次向量化更新：RSI为递推，波动率、量比、Beta维护窗口滚动和，单次更新为O(1)/股票；
+    N日新高需要窗口最大值，为O(窗口)/股票。update(replace_last=True) 可用盘中最新价反复改写当前K线。
+    结果与 compute_indicators 在同一段历史上一致（RSI遇到停牌缺失时跳过该根，而非按pandas的缺失加权）。
+    """
+
+    # replace_last 时需要回滚的状态：数组每次更新都整体替换，保存引用即可；环形缓冲各自撤销最近一次写入
+    _STATE = ('prev_close', 'prev_benchmark', 'avg_gain', 'avg_loss', 'rsi_obs', 'last')
+    _RINGS = ('returns', 'highs', 'volumes', 'beta_x', 'beta_y', 'beta_xy')
+
+    def __init__(self,
+                 symbols: Iterable[str],
+                 rsi_period: int = RSI_PERIOD,
+                 volatility_window: int = VOLATILITY_WINDOW,
+                 breakout_window: int = BREAKOUT_WINDOW,
+                 volume_window: int = VOLUME_WINDOW,
+                 volume_spike_ratio: float = VOLUME_SPIKE_RATIO,
+                 beta_window: int = BETA_WINDOW,
+                 periods_per_year: int = PERIODS_PER_YEAR):
+        self.symbols = pd.Index(list(symbols), name='code')
+        self.rsi_period = rsi_period
+        self.volume_spike_ratio = volume_spike_ratio
+        self.periods_per_year = periods_per_year
+        width = len(self.symbols)
+
+        self.prev_close = np.full(width, np.nan)
+        self.prev_benchmark = np.nan
+        self.avg_gain = np.full(width, np.nan)
+        self.avg_loss = np.full(width, np.nan)
+        self.rsi_obs = np.zeros(width, dtype=np.int64)
+
+        self.returns = _Ring(volatility_window, width)
+        self.highs = _Ring(breakout_window, width)
+        self.volumes = _Ring(volume_window, width)
+        self.beta_x = _Ring(beta_window, width)
+        self.beta_y = _Ring(beta_window, width)
+        self.beta_xy = _Ring(beta_window, width)
+
+        self.last: Dict[str, np.ndarray] = {}
+        self._saved = None
+
+    def _vector(self, values) -> np.ndarray:
+        if isinstance(values, pd.Series):
+            return values.reindex(self.symbols).to_numpy(dtype=np.float64)
+        return np.asarray(values, dtype=np.float64)
+
+    def seed(self, panels: Dict[str, pd.DataFrame], benchmark: Optional[pd.Series] = None):
+        """用历史面板（stack_bars 的返回值）逐根回放，建立初始状态"""
+        aligned = {field: panels[field].reindex(columns=self.symbols).to_numpy(dtype=np.float64)
+                   for field in ('close', 'high', 'volume') if field in panels}
+        market = benchmark.reindex(panels['close'].index).to_numpy(dtype=np.float64) if benchmark is not None else None
+        for i in range(len(panels['close'])):
+            bar = {field: values[i] for field, values in aligned.items()}
+            self.update(bar, benchmark=market[i] if market is not None else None)
+
+    def update(self, bar: Dict[str, Union[pd.Series, np.ndarray]], benchmark: Optional[float] = None,
+               replace_last: bool = False):
+        """
+        追加一根K线
+
+        Args:
+            bar: {'close': ..., 'high': ..., 'volume': ...}，值为按 symbols 顺序的数组或以代码为索引的Series
+            benchmark: 同一时刻的基准收盘价
+            replace_last: 为True时先撤销上一次更新再写入，用于盘中反复刷新尚未走完的K线
+        """
+        if replace_last and self._saved is not None:
+            for name, value in self._saved.items():
+                setattr(self, name, value)
+            for name in self._RINGS:
+                getattr(self, name).undo()
+        self._saved = {name: getattr(self, name) for name in self._STATE}
+
+        close = self._vector(bar['close'])
+        high = self._vector(bar['high']) if 'high' in bar else close
+        volume = self._vector(bar['volume']) if 'volume' in bar else np.full_like(close, np.nan)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # RSI：Wilder平滑，首个涨跌幅直接作为初值
+            delta = close - self.prev_close
+            valid = ~np.isnan(delta)
+            gain, loss = np.clip(delta, 0, None), np.clip(-delta, 0, None)
+            first = valid & (self.rsi_obs == 0)
+            later = valid & (self.rsi_obs > 0)
+            alpha = 1.0 / self.rsi_period
+            self.avg_gain = np.where(first, gain, np.where(later, self.avg_gain + alpha * (gain - self.avg_gain), self.avg_gain))
+            self.avg_loss = np.where(first, loss, np.where(later, self.avg_loss + alpha * (loss - self.avg_loss), self.avg_loss))
+            self.rsi_obs = self.rsi_obs + valid
+
+            # 波动率、Beta使用收益率窗口；Beta只统计个股与基准收益同时存在的K线
+            ret = close / self.prev_close - 1
+            self.returns.push(ret)
+            market_ret = np.nan if benchmark is None else benchmark / self.prev_benchmark - 1
+            paired = ~np.isnan(ret) & ~np.isnan(market_ret)
+            self.beta_x.push(np.where(paired, ret, np.nan))
+            self.beta_y.push(np.where(paired, market_ret, np.nan))
+            self.beta_xy.push(np.where(paired, ret * market_ret, np.nan))
+
+            # 突破与量比需要“此前N根”，先计算再写入当根
+            resistance = np.where(self.highs.complete(), np.max(self.highs.values, axis=0), np.nan)
+            window = len(self.volumes.values)
+            baseline = np.where(self.volumes.complete(), self.volumes.sum / window, np.nan)
+            ratio = volume / np.where(baseline > 0, baseline, np.nan)
+            self.highs.push(high)
+            self.volumes.push(volume)
+
+        self.prev_close = np.where(np.isnan(close), self.prev_close, close)
+        if benchmark is not None:
+            self.prev_benchmark = benchmark
+        self.last = {'resistance_break': close > resistance, 'volume_ratio': ratio}
+
+    def snapshot(self) -> pd.DataFrame:
+        """当前各股票的指标值，列与 compute_indicators 一致"""
+        width = len(self.symbols)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = 100.0 - 100.0 / (1.0 + self.avg_gain / self.avg_loss)
+            rs = np.where((self.avg_loss == 0) & ~np.isnan(self.avg_gain), 100.0, rs)
+            rs = np.where(self.rsi_obs >= self.rsi_period, rs, np.nan)
+
+            n = len(self.returns.values)
+            var = (self.returns.sumsq - self.returns.sum ** 2 / n) / (n - 1)
+            vol = np.where(self.returns.complete(), np.sqrt(np.maximum(var, 0)), np.nan) * np.sqrt(self.periods_per_year) * 100
+
+            n = len(self.beta_x.values)
+            cov = (self.beta_xy.sum - self.beta_x.sum * self.beta_y.sum / n) / (n - 1)
+            market_var = (self.beta_y.sumsq - self.beta_y.sum ** 2 / n) / (n - 1)
+            beta_value = np.where(self.beta_xy.complete() & (market_var > 0), cov / market_var, np.nan)
+
+        ratio = self.last.get('volume_ratio', np.full(width, np.nan))
+        return pd.DataFrame({
+            'rsi': rs,
+            'volatility_30d': vol,
+            'resistance_break': self.last.get('resistance_break', np.zeros(width, dtype=bool)),
+            'volume_ratio': ratio,
+            'volume_spike': ratio > self.volume_spike_ratio,
+            'beta': beta_value,
+        }, index=self.symbols)
+
+
+def main():
+    """测试函数"""
+    import os
+    import sys
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import Ashare
+
+    codes = ['sh600519', 'sz000001', 'sh601988']
+    bars = Ashare.get_price_many(codes, count=120, frequency='1d')
+    benchmark = Ashare.get_price('sh000001', count=120, frequency='1d')['close']
+    panels = stack_bars(bars)
+    print(compute_indicators(panels, benchmark))
+
+
+if __name__ == "__main__":
+    main()
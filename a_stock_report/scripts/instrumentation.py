@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行记录 - A股深度优化日报系统v2.0.0
+功能：按阶段记录墙钟/CPU耗时、峰值内存和输入输出行数，运行结束后在报告旁写出JSON运行清单；
+     可选开启 cProfile 与 tracemalloc，定位耗时与内存热点
+"""
+
+import cProfile
+import io
+import json
+import logging
+import os
+import platform
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_mb() -> Optional[float]:
+    """进程启动以来的峰值常驻内存（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为KB，macOS 为字节
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """当前常驻内存（MB），仅Linux可用"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def row_count(obj: Any) -> Optional[int]:
+    """DataFrame/列表/字典等返回长度，字符串等其他对象返回None"""
+    if isinstance(obj, (str, bytes)):
+        return None
+    try:
+        return len(obj)
+    except TypeError:
+        return None
+
+
+class StageRecord:
+    """单个阶段的记录，阶段内可设置 rows_in/rows_out 和附加信息"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows_in: Optional[int] = None
+        self.rows_out: Optional[int] = None
+        self.extra: Dict[str, Any] = {}
+        self.status = 'running'
+        self.error: Optional[str] = None
+        self.started_at = datetime.now().isoformat(timespec='milliseconds')
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.rss_mb: Optional[float] = None
+        self.traced_peak_mb: Optional[float] = None
+        # 执行期间是否有其他阶段同时在运行，此时 tracemalloc 峰值无法归属到单个阶段
+        self.overlapped = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {
+            'name': self.name,
+            'status': self.status,
+            'started_at': self.started_at,
+            'wall_s': round(self.wall_s, 6),
+            'cpu_s': round(self.cpu_s, 6),
+            'rows_in': self.rows_in,
+            'rows_out': self.rows_out,
+            'rss_mb': self.rss_mb,
+        }
+        if self.traced_peak_mb is not None:
+            record['traced_peak_mb'] = self.traced_peak_mb
+        if self.error:
+            record['error'] = self.error
+        if self.extra:
+            record['extra'] = self.extra
+        return record
+
+
+class RunManifest:
+    """
+    一次运行的阶段记录
+
+    用法：
+        manifest = RunManifest('daily_report', date)
+        with manifest.stage('classification') as stage:
+            stage.rows_in = len(stocks)
+            result = ...
+            stage.rows_out = len(result)
+        manifest.write(manifest.path_for(report_path))
+
+    注意：CPU时间取进程级 time.process_time()，多个阶段并发执行时各自的CPU时间会相互包含；
+    峰值常驻内存（ru_maxrss）是进程级的，只在运行级记录；tracemalloc 峰值只记到没有与其他阶段
+    并发的阶段上，需要每个阶段的峰值时应串行执行各阶段
+    """
+
+    def __init__(self, run_name: str, date: Optional[str] = None, profile: bool = False, trace_memory: bool = False):
+        """
+        Args:
+            run_name: 运行名称，写入清单
+            date: 报告日期
+            profile: 开启 cProfile，写清单时另存 .prof 文件并在清单中附热点函数
+            trace_memory: 开启 tracemalloc，记录每个阶段的Python分配峰值和整体分配热点
+        """
+        self.run_name = run_name
+        self.date = date
+        self.stages: List[StageRecord] = []
+        self.extra: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._started_at = datetime.now().isoformat(timespec='milliseconds')
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+
+        # Python 3.11 及以前 cProfile 只采集启用它的线程，在其他线程中执行的阶段各自采集，写清单时合并；
+        # 3.12 起 cProfile 基于 sys.monitoring，进程内同时只能启用一个且覆盖所有线程，不再另建
+        self.profiler = cProfile.Profile() if profile else None
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._owner_thread = threading.get_ident()
+        if self.profiler is not None:
+            try:
+                self.profiler.enable()
+            except ValueError as e:
+                logger.warning(f"cProfile 无法启用，本次运行不采集性能数据: {e}")
+                self.profiler = None
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+        self._active: List[StageRecord] = []
+        self._traced_peak = 0
+
+    @contextmanager
+    def stage(self, name: str):
+        """记录一个阶段；阶段内抛出的异常会记入清单后继续向上抛出"""
+        record = StageRecord(name)
+        with self._lock:
+            self.stages.append(record)
+            if self._active:
+                record.overlapped = True
+                for other in self._active:
+                    other.overlapped = True
+            elif self.trace_memory:
+                # 没有其他阶段在运行时才重置峰值，重置前计入运行级峰值
+                self._traced_peak = max(self._traced_peak, tracemalloc.get_traced_memory()[1])
+                tracemalloc.reset_peak()
+            self._active.append(record)
+        thread_profile = None
+        if self.profiler is not None and threading.get_ident() != self._owner_thread:
+            thread_profile = cProfile.Profile()
+            try:
+                thread_profile.enable()
+            except ValueError:
+                # Python 3.12+：运行级 profiler 已覆盖所有线程
+                thread_profile = None
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+            record.status = 'ok'
+        except BaseException as e:
+            record.status = 'error'
+            record.error = f'{type(e).__name__}: {e}'
+            raise
+        finally:
+            if thread_profile is not None:
+                thread_profile.disable()
+                with self._lock:
+                    self._thread_profiles.append(thread_profile)
+            record.wall_s = time.perf_counter() - wall_start
+            record.cpu_s = time.process_time() - cpu_start
+            record.rss_mb = current_rss_mb()
+            with self._lock:
+                self._active.remove(record)
+                if self.trace_memory:
+                    traced_peak = tracemalloc.get_traced_memory()[1]
+                    self._traced_peak = max(self._traced_peak, traced_peak)
+                    if record.overlapped:
+                        record.extra['traced_peak'] = '与其他阶段并发执行，未单独记录'
+                    else:
+                        record.traced_peak_mb = traced_peak / 1024 ** 2
+            logger.info(f"阶段 {name} {record.status}: 耗时 {record.wall_s:.3f}s，CPU {record.cpu_s:.3f}s，"
+                        f"行数 {record.rows_in} -> {record.rows_out}")
+
+    @staticmethod
+    def path_for(report_path: str) -> str:
+        """报告文件旁的清单路径：xxx.md -> xxx.manifest.json"""
+        return os.path.splitext(report_path)[0] + '.manifest.json'
+
+    def _profile_summary(self, prof_path: str, limit: int = 30) -> List[str]:
+        self.profiler.disable()
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stream)
+        for profile in self._thread_profiles:
+            stats.add(profile)
+        stats.dump_stats(prof_path)
+        stats.sort_stats('cumulative').print_stats(limit)
+        return [line for line in stream.getvalue().splitlines() if line.strip()]
+
+    @staticmethod
+    def _memory_summary(limit: int = 20) -> List[Dict[str, Any]]:
+        snapshot = tracemalloc.take_snapshot()
+        return [{'location': str(stat.traceback[0]), 'size_mb': round(stat.size / 1024 ** 2, 3), 'count': stat.count}
+                for stat in snapshot.statistics('lineno')[:limit]]
+
+    def to_dict(self) -> Dict[str, Any]:
+        manifest = {
+            'run': self.run_name,
+            'date': self.date,
+            'started_at': self._started_at,
+            'finished_at': datetime.now().isoformat(timespec='milliseconds'),
+            'status': 'error' if any(stage.status == 'error' for stage in self.stages) else 'ok',
+            'wall_s': round(time.perf_counter() - self._wall_start, 6),
+            'cpu_s': round(time.process_time() - self._cpu_start, 6),
+            'peak_rss_mb': peak_rss_mb(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'argv': sys.argv,
+            'stages': [stage.to_dict() for stage in self.stages],
+            'extra': self.extra,
+        }
+        if self.trace_memory and tracemalloc.is_tracing():
+            traced_peak = max(self._traced_peak, tracemalloc.get_traced_memory()[1])
+            manifest['traced_peak_mb'] = traced_peak / 1024 ** 2
+        return manifest
+
+    def write(self, path: str) -> str:
+        """
+        写出JSON清单；开启 profile 时同名另存 .prof 文件
+
+        Returns:
+            清单文件路径
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        manifest = self.to_dict()
+        if self.profiler is not None:
+            prof_path = os.path.splitext(path)[0] + '.prof'
+            manifest['profile'] = {'path': prof_path, 'top_cumulative': self._profile_summary(prof_path)}
+        if self.trace_memory and tracemalloc.is_tracing():
+            manifest['memory_top'] = self._memory_summary()
+            tracemalloc.stop()
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+        logger.info(f"运行清单已写入: {path}")
+        return path
+
+
+def main():
+    """测试函数"""
+    import pandas as pd
+
+    manifest = RunManifest('demo', datetime.now().strftime('%Y-%m-%d'), trace_memory=True)
+    with manifest.stage('build') as stage:
+        df = pd.DataFrame({'x': range(200000)})
+        stage.rows_out = row_count(df)
+    with manifest.stage('aggregate') as stage:
+        stage.rows_in = row_count(df)
+        result = df.groupby(df['x'] % 100).sum()
+        stage.rows_out = row_count(result)
+    print(json.dumps(manifest.to_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
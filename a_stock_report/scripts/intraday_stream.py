@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+盘中行情订阅 - A股深度优化日报系统v2.0.0
+功能：按固定间隔轮询一组股票的分钟K线（腾讯 get_price_min_tx），每次只请求上次之后的尾部几根，
+     与内存中的滚动窗口比对后只把新增或被修改的K线推送给订阅回调 / 异步迭代器，
+     并可同步驱动 IncrementalIndicators 增量更新盘中指标
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ashare
+from scripts.indicators import IncrementalIndicators, stack_bars
+from scripts.kline_store import normalize_code
+from scripts.trade_calendar import BARS_PER_DAY, get_calendar
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BAR_FIELDS = ['open', 'close', 'high', 'low', 'volume']
+
+# 轮询时段：集合竞价前后与收盘后各留几分钟，让最后一根K线定型
+SESSIONS = (((9, 25), (11, 35)), ((12, 55), (15, 5)))
+
+
+class BarUpdate:
+    """一次K线推送：新出现的K线（is_new=True）或当前K线的价格/成交量被修改"""
+
+    __slots__ = ('code', 'time', 'open', 'close', 'high', 'low', 'volume', 'is_new')
+
+    def __init__(self, code: str, time: pd.Timestamp, values: Dict[str, float], is_new: bool):
+        self.code = code
+        self.time = time
+        for field in BAR_FIELDS:
+            setattr(self, field, float(values[field]))
+        self.is_new = is_new
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        kind = '新K线' if self.is_new else '更新'
+        return (f"BarUpdate({self.code} {self.time:%Y-%m-%d %H:%M} {kind} "
+                f"O={self.open} H={self.high} L={self.low} C={self.close} V={self.volume:.0f})")
+
+
+class IntradayStream:
+    """
+    分钟K线轮询订阅
+
+    - 首次轮询取满 window 根作为滚动窗口（历史K线不推送，可由 window_frame 读取）；
+      之后按距该股票上次成功取数经过的分钟数只取尾部，外加 overlap 根用于发现修改
+    - 比对尾部与窗口：时间更晚的为新K线，同一时间但OHLCV变化的为更新（盘中最后一根持续变化）
+    - 回调在轮询线程中按时间顺序调用；异步迭代器 updates() 在事件循环中驱动轮询
+    - indicators=True 时用窗口历史初始化 IncrementalIndicators，新K线追加、当前K线更新用 replace_last 改写
+    """
+
+    def __init__(self,
+                 symbols: Iterable[str],
+                 frequency: str = '1m',
+                 window: int = 240,
+                 interval: float = 5.0,
+                 overlap: int = 1,
+                 fetcher: Optional[Callable[..., pd.DataFrame]] = None,
+                 max_workers: int = 16,
+                 indicators: bool = False,
+                 indicator_options: Optional[Dict] = None):
+        """
+        Args:
+            symbols: 股票代码，支持 sh600519 / 600519.XSHG 两种写法
+            frequency: 分钟周期，'1m'/'5m'/'15m'/'30m'/'60m'
+            window: 每只股票在内存中保留的K线根数
+            interval: 轮询间隔（秒）
+            overlap: 每次额外重取的已知K线根数，用于发现最后几根的修改
+            fetcher: 取数函数，签名同 Ashare.get_price，默认 Ashare.get_price（1m 走腾讯 get_price_min_tx）
+            max_workers: 并发请求的线程数
+            indicators: 是否同步维护 IncrementalIndicators
+            indicator_options: 传给 IncrementalIndicators 的参数，如 rsi_period、volume_window
+        """
+        if frequency not in BARS_PER_DAY:
+            raise ValueError(f"只支持分钟周期: {frequency}")
+        self.symbols = list(dict.fromkeys(normalize_code(code) for code in symbols))
+        self.frequency = frequency
+        self.minutes = int(frequency[:-1])
+        self.window = window
+        self.interval = interval
+        self.overlap = overlap
+        self.fetcher = fetcher or Ashare.get_price
+
+        self.bars: Dict[str, pd.DataFrame] = {}
+        self.stats = {'polls': 0, 'requests': 0, 'bars_fetched': 0, 'new': 0, 'updated': 0, 'errors': 0}
+        self._callbacks: List[Callable[[BarUpdate], None]] = []
+        self._fetched_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='intraday')
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self.indicators: Optional[IncrementalIndicators] = None
+        self._indicator_time: Optional[pd.Timestamp] = None
+        if indicators:
+            options = {'periods_per_year': 250 * BARS_PER_DAY[frequency]}
+            options.update(indicator_options or {})
+            self.indicators = IncrementalIndicators(self.symbols, **options)
+
+    # ------------------------------------------------------------------ 订阅
+
+    def subscribe(self, callback: Callable[[BarUpdate], None]) -> Callable[[], None]:
+        """
+        注册回调，每根新增或修改的K线调用一次
+
+        Returns:
+            取消订阅的函数
+        """
+        self._callbacks.append(callback)
+        return lambda: self._callbacks.remove(callback) if callback in self._callbacks else None
+
+    def in_session(self, now: Optional[datetime] = None) -> bool:
+        """当前是否处于交易日的轮询时段"""
+        now = now or datetime.now()
+        if not get_calendar().is_trading_day(now):
+            return False
+        clock = (now.hour, now.minute)
+        return any(start <= clock <= end for start, end in SESSIONS)
+
+    # ------------------------------------------------------------------ 轮询
+
+    def _tail_count(self, code: str, now: float) -> int:
+        """本次需要请求的K线数：首次取满窗口，之后按距上次成功取数的时间估算新K线数（午休多取几根无妨）"""
+        if code not in self.bars:
+            return self.window
+        elapsed = int((now - self._fetched_at[code]) // (60 * self.minutes)) + 1
+        return min(self.window, elapsed + self.overlap)
+
+    def _fetch(self, code: str, count: int) -> Tuple[Optional[pd.DataFrame], int, bool]:
+        """
+        取尾部K线；尾部与窗口不衔接（估计的根数不够）时放大请求直到衔接或取满窗口
+
+        Returns:
+            (K线，失败或无数据时为None, 请求次数, 是否失败)
+        """
+        cached = self.bars.get(code)
+        requests = 0
+        while True:
+            requests += 1
+            try:
+                df = self.fetcher(code, count=count, frequency=self.frequency)
+            except Exception as e:
+                logger.warning(f"{code} 分钟线获取失败: {e}")
+                return None, requests, True
+            if df is None or df.empty:
+                return None, requests, False
+            if cached is None or df.index[0] <= cached.index[-1] or count >= self.window:
+                return df[BAR_FIELDS], requests, False
+            count = min(self.window, count * 4)
+
+    def _diff(self, code: str, fresh: pd.DataFrame) -> List[BarUpdate]:
+        """把尾部合并进滚动窗口，返回新增/修改的K线"""
+        cached = self.bars.get(code)
+        if cached is None:
+            self.bars[code] = fresh.iloc[-self.window:]
+            return []
+
+        updates = []
+        known = fresh.index.isin(cached.index)
+        if known.any():
+            before = cached.loc[fresh.index[known], BAR_FIELDS].to_numpy()
+            after = fresh[known].to_numpy()
+            changed = ~np.isclose(before, after, rtol=0, atol=1e-9, equal_nan=True).all(axis=1)
+            for ts, row in zip(fresh.index[known][changed], fresh[known][changed].to_dict('records')):
+                updates.append(BarUpdate(code, ts, row, False))
+        newer = fresh[fresh.index > cached.index[-1]]
+        updates.extend(BarUpdate(code, ts, row, True) for ts, row in zip(newer.index, newer.to_dict('records')))
+        if updates:
+            merged = pd.concat([cached[~cached.index.isin(fresh.index)], fresh]).sort_index()
+            self.bars[code] = merged.iloc[-self.window:]
+        return updates
+
+    def poll(self) -> List[BarUpdate]:
+        """
+        轮询一次：并发请求所有股票的尾部K线，更新滚动窗口与指标，调用回调
+
+        Returns:
+            本次新增或修改的K线，按时间、代码排序
+        """
+        with self._lock:
+            started = time.time()
+            seeding = self.indicators is not None and self._indicator_time is None
+            futures = {code: self._pool.submit(self._fetch, code, self._tail_count(code, started))
+                       for code in self.symbols}
+            updates = []
+            for code, future in futures.items():
+                fresh, requests, failed = future.result()
+                self.stats['requests'] += requests
+                self.stats['errors'] += failed
+                if fresh is None:
+                    continue
+                self.stats['bars_fetched'] += len(fresh)
+                updates.extend(self._diff(code, fresh))
+                self._fetched_at[code] = started
+            updates.sort(key=lambda u: (u.time, u.code))
+            self.stats['polls'] += 1
+            self.stats['new'] += sum(u.is_new for u in updates)
+            self.stats['updated'] += sum(not u.is_new for u in updates)
+            if seeding and self.bars:
+                self.indicators.seed(stack_bars(self.bars))
+                self._indicator_time = max(df.index[-1] for df in self.bars.values())
+            elif self.indicators is not None and updates:
+                self._update_indicators(updates)
+
+        for update in updates:
+            for callback in list(self._callbacks):
+                try:
+                    callback(update)
+                except Exception as e:
+                    logger.error(f"订阅回调出错: {e}")
+        return updates
+
+    def _update_indicators(self, updates: List[BarUpdate]):
+        """
+        按时间顺序处理涉及的K线：晚于指标当前K线的追加，等于的用 replace_last 改写；
+        早于指标当前K线的修改（个别股票迟到的K线）无法回溯，忽略
+        """
+        for ts in sorted({u.time for u in updates if u.time >= self._indicator_time}):
+            bar = {field: pd.Series({code: df.at[ts, field] for code, df in self.bars.items() if ts in df.index},
+                                    dtype=float)
+                   for field in ('close', 'high', 'volume')}
+            self.indicators.update(bar, replace_last=ts == self._indicator_time)
+            self._indicator_time = ts
+
+    # ------------------------------------------------------------------ 持续运行
+
+    def start(self, session_only: bool = True):
+        """在后台线程中按 interval 持续轮询；session_only 时非交易时段只等待不请求"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+
+        def run():
+            while not self._stop.is_set():
+                if not session_only or self.in_session():
+                    try:
+                        self.poll()
+                    except Exception as e:
+                        logger.error(f"盘中轮询出错: {e}")
+                self._stop.wait(self.interval)
+
+        self._thread = threading.Thread(target=run, name='intraday-stream', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台轮询并关闭请求线程池"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._pool.shutdown(wait=True)
+
+    async def updates(self, session_only: bool = True) -> AsyncIterator[BarUpdate]:
+        """
+        异步迭代新增/修改的K线，轮询在默认线程池中执行，不阻塞事件循环
+
+        用法：
+            async for update in stream.updates():
+                ...
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            if not session_only or self.in_session():
+                for update in await loop.run_in_executor(None, self.poll):
+                    yield update
+            await asyncio.sleep(self.interval)
+
+    def window_frame(self, code: str) -> Optional[pd.DataFrame]:
+        """某只股票当前的滚动窗口"""
+        return self.bars.get(normalize_code(code))
+
+
+def main():
+    """测试函数"""
+    stream = IntradayStream(['sh600519', 'sz000001', 'sh000001'], frequency='1m', window=120, interval=10,
+                            indicators=True)
+    stream.subscribe(lambda update: print(update) if not update.is_new or update.time.minute % 30 == 0 else None)
+    stream.poll()
+    time.sleep(stream.interval)
+    stream.poll()
+    print('轮询统计:', stream.stats)
+    print(stream.indicators.snapshot())
+    stream.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线本地缓存 - A股深度优化日报系统v2.0.0
+功能：按 (股票代码, 周期) 把K线持久化为列式文件，历史部分直接读盘，只向行情接口补取缺失的尾部；
+     重叠K线或每个交易日核对一次的最后一根K线价格不一致时（前复权价格因除权除息被整体修订）整段失效重取，
+     总容量超限时按最近访问淘汰；索引在内存中更新，批量取数结束或调用 flush 时一次写盘
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ashare
+from scripts.trade_calendar import BARS_PER_DAY, get_calendar
+
+try:
+    import pyarrow  # noqa: F401
+    CACHE_FORMAT = 'parquet'
+except ImportError:
+    CACHE_FORMAT = 'pickle'
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 收盘后多久认为当日K线已定型（15:00收盘，留出行情源落库时间）
+SESSION_CLOSE = (15, 5)
+SESSION_END = datetime.strptime('15:00', '%H:%M').time()
+
+
+def normalize_code(code: str) -> str:
+    """与 Ashare.get_price 一致的代码转换：600519.XSHG -> sh600519"""
+    return Ashare._xcode(code)
+
+
+def settled_session(now: Optional[datetime] = None) -> str:
+    """最近一个已收盘定型的交易日，格式 YYYY-MM-DD"""
+    now = pd.Timestamp(now or datetime.now())
+    day = now.normalize()
+    if (now.hour, now.minute) < SESSION_CLOSE:
+        day -= pd.Timedelta(days=1)
+    return get_calendar().previous_trading_day(day).strftime('%Y-%m-%d')
+
+
+class KlineStore:
+    """
+    K线磁盘缓存
+
+    每个 (code, frequency) 对应一个数据文件，元数据（最后K线时间、文件大小、最近访问时间、
+    最近一次核对前复权价格的交易日）集中保存在 index.json 中。对外提供与 Ashare.get_price 相同签名的 get_price。
+    单只写入只标记索引已修改，get_price_many 结束时写盘一次；逐只调用 get_price 的使用方在一轮取数后调用 flush。
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_bytes: int = 2 * 1024 ** 3,
+                 overlap: int = 3,
+                 fetcher: Optional[Callable[..., pd.DataFrame]] = None):
+        """
+        Args:
+            cache_dir: 缓存目录，默认 a_stock_report/data/kline_cache
+            max_bytes: 缓存文件总大小上限，超出后按最近访问时间淘汰
+            overlap: 补取尾部时与已缓存数据重叠的K线数，用于检测前复权价格修订
+            fetcher: 行情获取函数，签名同 Ashare.get_price
+        """
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(__file__), '..', 'data', 'kline_cache')
+        self.max_bytes = max_bytes
+        self.overlap = overlap
+        self.fetcher = fetcher or Ashare.get_price
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._index_path = os.path.join(self.cache_dir, 'index.json')
+        self._lock = threading.RLock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.index = self._load_index()
+        self._dirty = False
+        self.stats = {'hits': 0, 'tail_fetches': 0, 'full_fetches': 0, 'verifications': 0, 'revisions': 0,
+                      'evictions': 0}
+
+    # ------------------------------------------------------------------ 索引与文件
+
+    def _load_index(self) -> Dict[str, Dict]:
+        if not os.path.exists(self._index_path):
+            return {}
+        with open(self._index_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def flush(self):
+        """索引有修改时原子写回磁盘"""
+        with self._lock:
+            if not self._dirty:
+                return
+            tmp_path = self._index_path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.index, f, ensure_ascii=False)
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+
+    @staticmethod
+    def _key(code: str, frequency: str) -> str:
+        return f'{code}_{frequency}'
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.{CACHE_FORMAT}')
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+
+    def _read(self, key: str) -> Optional[pd.DataFrame]:
+        # 持锁读取，避免其他线程写入时的容量淘汰在读取过程中删除该文件
+        with self._lock:
+            path = self._path(key)
+            if key not in self.index or not os.path.exists(path):
+                return None
+            df = pd.read_parquet(path) if CACHE_FORMAT == 'parquet' else pd.read_pickle(path)
+            self.index[key]['last_access'] = time.time()
+        return df
+
+    def _write(self, key: str, df: pd.DataFrame, head_complete: bool):
+        path = self._path(key)
+        tmp_path = path + '.tmp'
+        if CACHE_FORMAT == 'parquet':
+            df.to_parquet(tmp_path)
+        else:
+            df.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.index[key] = {
+                'rows': len(df),
+                'first_bar': df.index[0].isoformat() if len(df) else None,
+                'last_bar': df.index[-1].isoformat() if len(df) else None,
+                'head_complete': head_complete,
+                'verified': settled_session(),
+                'bytes': os.path.getsize(path),
+                'fetched_at': time.time(),
+                'last_access': time.time(),
+            }
+            self._dirty = True
+            self._evict()
+
+    def _evict(self):
+        """
+        总大小超过上限时，按最近访问时间从旧到新删除
+
+        正在被某个线程读写的键（持有键锁，包括刚写入的这一个）不淘汰，否则调用方随后访问其索引项会失败
+        """
+        total = sum(meta['bytes'] for meta in self.index.values())
+        if total <= self.max_bytes:
+            return
+        for key in sorted(self.index, key=lambda k: self.index[k]['last_access']):
+            if total <= self.max_bytes:
+                break
+            if key in self._key_locks and self._key_locks[key].locked():
+                continue
+            total -= self.index.pop(key)['bytes']
+            if os.path.exists(self._path(key)):
+                os.remove(self._path(key))
+            self.stats['evictions'] += 1
+
+    def invalidate(self, code: Optional[str] = None, frequency: Optional[str] = None):
+        """删除指定代码/周期的缓存，参数为空表示不限"""
+        code = normalize_code(code) if code else None
+        with self._lock:
+            for key in list(self.index):
+                key_code, key_freq = key.rsplit('_', 1)
+                if (code is None or key_code == code) and (frequency is None or key_freq == frequency):
+                    del self.index[key]
+                    if os.path.exists(self._path(key)):
+                        os.remove(self._path(key))
+                    self._dirty = True
+            self.flush()
+
+    # ------------------------------------------------------------------ 缺失K线计算
+
+    @staticmethod
+    def _bars_between(start: pd.Timestamp, stop: pd.Timestamp, frequency: str) -> int:
+        """(start, stop] 区间内的K线数量，按交易日历计（周末、节假日休市不计）"""
+        return get_calendar().bars_between(start, stop, frequency)
+
+    def _missing_bars(self, key: str, last_bar: pd.Timestamp, target: pd.Timestamp, frequency: str) -> int:
+        """last_bar 之后到 target 为止还缺多少根K线；为0且最后一根已定型时缓存即已取全"""
+        missing = self._bars_between(last_bar, target, frequency)
+        if frequency in BARS_PER_DAY and not (self._is_settled(key, last_bar) and last_bar.time() >= SESSION_END):
+            missing += BARS_PER_DAY[frequency]       # 最后一个交易日的分钟线尚未取全
+        return missing
+
+    def _is_settled(self, key: str, last_bar: pd.Timestamp) -> bool:
+        """最后一根K线是否已定型：当日盘中抓到的K线在收盘后需要重新获取"""
+        fetched_at = datetime.fromtimestamp(self.index[key]['fetched_at'])
+        if last_bar.date() < fetched_at.date():
+            return True
+        return (fetched_at.hour, fetched_at.minute) >= SESSION_CLOSE
+
+    # ------------------------------------------------------------------ 对外接口
+
+    def get_price(self, code: str, end_date='', count: int = 10, frequency: str = '1d',
+                  fields: List[str] = []) -> pd.DataFrame:
+        """
+        带磁盘缓存的K线获取，签名与 Ashare.get_price 一致
+
+        缓存中每个 (code, frequency) 始终是一段连续的K线：尾部不足时向后补取，
+        请求窗口早于缓存首根K线时从首根K线向前补取。
+
+        Args:
+            code: 股票代码，支持 sh600519 / 600519.XSHG 两种写法
+            end_date: 结束日期，空表示最新
+            count: K线数量
+            frequency: 周期
+
+        Returns:
+            以时间为索引的K线DataFrame
+        """
+        xcode = normalize_code(code)
+        key = self._key(xcode, frequency)
+        now = pd.Timestamp(datetime.now())
+        end = pd.Timestamp(end_date) if end_date else None
+        if end is not None and frequency not in BARS_PER_DAY:
+            end = end.normalize()
+        target = min(end, now) if end is not None else now
+
+        with self._key_lock(key):
+            df = self._read(key)
+            if df is None or df.empty:
+                df = self.fetcher(xcode, end_date=end_date, count=count, frequency=frequency)
+                self._count('full_fetches')
+                if df is None or df.empty:
+                    return df
+                self._write(key, df, head_complete=len(df) < count)
+            else:
+                df = self._top_up(xcode, key, df, target, end_date, frequency)
+                available = int((df.index <= end).sum()) if end is not None else len(df)
+                if available < count and not self.index[key]['head_complete']:
+                    needed = count - available
+                    if end is not None and end < df.index[0]:
+                        needed = count + self._bars_between(end, df.index[0], frequency)
+                    df = self._extend_head(xcode, key, df, needed, frequency)
+
+        if end is not None:
+            df = df[df.index <= end]
+        return df.iloc[-count:]
+
+    def get_price_many(self, codes: List[str], end_date='', count: int = 10, frequency: str = '1d',
+                       max_workers: int = 16, errors: Optional[Dict[str, Exception]] = None) -> Dict[str, pd.DataFrame]:
+        """批量获取，由 Ashare.get_price_many 并发调用本缓存的 get_price，结束后索引写盘一次"""
+        try:
+            return Ashare.get_price_many(codes, end_date=end_date, count=count, frequency=frequency,
+                                         max_workers=max_workers, errors=errors, fetcher=self.get_price)
+        finally:
+            self.flush()
+
+    # ------------------------------------------------------------------ 取数细节
+
+    def _top_up(self, xcode: str, key: str, cached: pd.DataFrame, target: pd.Timestamp,
+                end_date, frequency: str) -> pd.DataFrame:
+        """只补取 cached 最后一根K线之后缺失的部分"""
+        last_bar = cached.index[-1]
+        missing = self._missing_bars(key, last_bar, target, frequency)
+        if last_bar >= target or (missing <= 0 and self._is_settled(key, last_bar)):
+            if frequency not in BARS_PER_DAY and not self._verify(xcode, key, cached, frequency):
+                return self._refetch(xcode, key, len(cached), frequency)
+            self._count('hits')
+            return cached
+
+        tail = self.fetcher(xcode, end_date=end_date, count=missing + self.overlap, frequency=frequency)
+        self._count('tail_fetches')
+        if tail is None or tail.empty:
+            return cached
+        if tail.index[0] > last_bar:
+            logger.info(f"{key} 补取的尾部与缓存不衔接，整段重取")
+            return self._refetch(xcode, key, len(cached) + missing + self.overlap, frequency)
+        if not self._consistent(cached, tail):
+            logger.info(f"{key} 前复权价格已修订，整段重取")
+            self._count('revisions')
+            return self._refetch(xcode, key, len(cached) + missing + self.overlap, frequency)
+
+        df = self._merge(cached, tail)
+        self._write(key, df, self.index[key]['head_complete'])
+        return df
+
+    def _extend_head(self, xcode: str, key: str, cached: pd.DataFrame, needed: int, frequency: str) -> pd.DataFrame:
+        """从缓存首根K线向前补取 needed 根历史K线"""
+        if frequency in BARS_PER_DAY:
+            # 分钟线接口不支持结束时间，只能取最新的更长窗口
+            fresh = self.fetcher(xcode, end_date='', count=len(cached) + needed, frequency=frequency)
+            head_complete = len(fresh) < len(cached) + needed
+        else:
+            fresh = self.fetcher(xcode, end_date=cached.index[0].strftime('%Y-%m-%d'),
+                                 count=needed + self.overlap, frequency=frequency)
+            head_complete = len(fresh) < needed + self.overlap
+        self._count('full_fetches')
+        if fresh is None or fresh.empty:
+            with self._lock:
+                self.index[key]['head_complete'] = True
+            self._dirty = True
+            return cached
+        if not self._consistent(cached, fresh):
+            logger.info(f"{key} 前复权价格已修订，整段重取")
+            self._count('revisions')
+            return self._refetch(xcode, key, len(cached) + needed, frequency)
+
+        df = self._merge(cached, fresh)
+        self._write(key, df, head_complete)
+        return df
+
+    def _refetch(self, xcode: str, key: str, count: int, frequency: str) -> pd.DataFrame:
+        """丢弃旧缓存，重新获取最新的 count 根K线"""
+        df = self.fetcher(xcode, end_date='', count=count, frequency=frequency)
+        self._count('full_fetches')
+        self._write(key, df, head_complete=len(df) < count)
+        return df
+
+    def _verify(self, xcode: str, key: str, cached: pd.DataFrame, frequency: str) -> bool:
+        """
+        每个已收盘交易日对命中的缓存核对一次最后一根K线的收盘价
+
+        除权除息后前复权价格整体修订，只读缓存、不补取尾部的请求也要能发现；分钟线不复权，不核对
+
+        Returns:
+            缓存是否仍然有效
+        """
+        session = settled_session()
+        if self.index[key].get('verified') == session:
+            return True
+        last_bar = cached.index[-1]
+        probe = self.fetcher(xcode, end_date=last_bar.strftime('%Y-%m-%d'), count=1, frequency=frequency)
+        self._count('verifications')
+        if probe is not None and not probe.empty and probe.index[-1] == last_bar:
+            if not np.isclose(probe['close'].iloc[-1], cached['close'].iloc[-1], rtol=1e-6, atol=1e-4):
+                logger.info(f"{key} 前复权价格已修订，整段重取")
+                self._count('revisions')
+                return False
+        with self._lock:
+            self.index[key]['verified'] = session
+            self._dirty = True
+        return True
+
+    @staticmethod
+    def _consistent(cached: pd.DataFrame, fresh: pd.DataFrame) -> bool:
+        """重叠区间（不含缓存最后一根，它可能是盘中未定型K线）的收盘价是否一致"""
+        overlap = cached.index[:-1].intersection(fresh.index)
+        if overlap.empty:
+            return True
+        return bool(np.allclose(cached.loc[overlap, 'close'].to_numpy(), fresh.loc[overlap, 'close'].to_numpy(),
+                                rtol=1e-6, atol=1e-4))
+
+    @staticmethod
+    def _merge(cached: pd.DataFrame, fresh: pd.DataFrame) -> pd.DataFrame:
+        """按时间拼接，fresh 覆盖的时间段以新数据为准（包括标签已变化的未完成周线/月线）"""
+        if set(fresh.columns) == set(cached.columns):
+            fresh = fresh[cached.columns]
+        before = cached[cached.index < fresh.index[0]]
+        after = cached[cached.index > fresh.index[-1]]
+        return pd.concat([before, fresh, after])
+
+
+def main():
+    """测试函数"""
+    store = KlineStore()
+    df = store.get_price('sh000001', count=10, frequency='1d')
+    print('上证指数日线（首次获取）\n', df)
+    df = store.get_price('sh000001', count=5, frequency='1d')
+    print('上证指数日线（读缓存）\n', df)
+    store.flush()
+    print('缓存统计:', store.stats)
+
+
+if __name__ == "__main__":
+    main()
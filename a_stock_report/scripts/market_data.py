@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情数据准备 - A股深度优化日报系统v2.0.0
+功能：读取 config/stock_universe.csv 股票池，当日价格、涨跌幅、量比与估值由一次批量快照取得，
+     日线K线只用于需要历史的技术指标；整理成以股票代码为索引的一张行情表，供策略细分、交叉分析与报告使用
+"""
+
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ashare
+from scripts.indicators import BETA_WINDOW, compute_indicators, stack_bars
+from scripts.trade_calendar import get_calendar
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_UNIVERSE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'config', 'stock_universe.csv')
+
+# 市场概况中的主要指数
+INDEX_CODES = {'sh': 'sh000001', 'sz': 'sz399001', 'cyb': 'sz399006'}
+BENCHMARK_CODE = INDEX_CODES['sh']
+
+# 收盘后行情定型的时刻，与 intraday_stream 轮询时段的结束时刻一致
+SETTLE_TIME = (15, 5)
+
+# 每只股票取的日线根数：Beta窗口之外再留出余量
+HISTORY_BARS = BETA_WINDOW + 20
+
+# 报告日期为当天时取自批量快照的行情字段；历史日期或快照中缺失（停牌）的股票由最后一根日线补出价格与涨跌幅
+QUOTE_FIELDS = ['price', 'prev_close', 'change_pct', 'volume', 'amount', 'volume_ratio', 'turnover', 'pe', 'pb', 'mcap']
+
+
+def full_code(code: str) -> str:
+    """'688031'、'688031.XSHG'、'sh688031' 统一为带交易所前缀的代码"""
+    code = Ashare._xcode(str(code).strip())
+    if code.isdigit() and len(code) == 6:
+        prefix = 'sh' if code[0] in '569' else 'bj' if code[0] in '48' else 'sz'
+        return prefix + code
+    return code
+
+
+def load_universe(path: Optional[str] = None) -> pd.DataFrame:
+    """
+    读取股票池
+
+    Args:
+        path: CSV文件路径，默认 config/stock_universe.csv，列为 code/name/industry/business
+
+    Returns:
+        按文件顺序、代码去重后的DataFrame
+    """
+    df = pd.read_csv(path or DEFAULT_UNIVERSE_PATH, dtype=str).fillna('')
+    df['code'] = df['code'].map(full_code)
+    return df.drop_duplicates('code').reset_index(drop=True)
+
+
+def quotes_settled(date, now: Optional[datetime] = None) -> bool:
+    """
+    date 的行情是否已经定型：历史日期、非交易日，或交易日收盘（SETTLE_TIME）之后为True；
+    当天开盘前与盘中的快照和最后一根日线仍会变化
+    """
+    now = now or datetime.now()
+    day = pd.Timestamp(date).date() if date else now.date()
+    if day != now.date():
+        return day < now.date()
+    return not get_calendar().is_trading_day(day) or (now.hour, now.minute) >= SETTLE_TIME
+
+
+def history_end_date(date) -> str:
+    """K线请求的结束日期：报告日期为当天时传空取最新，与缓存键保持一致"""
+    date = str(date or '')
+    return '' if date in ('', datetime.now().strftime('%Y-%m-%d')) else date
+
+
+def fetch_history(code: str, date, fetcher: Optional[Callable[..., pd.DataFrame]] = None,
+                  count: int = HISTORY_BARS) -> pd.DataFrame:
+    """
+    单只股票截至 date 的日线；日报与个股案例使用同一组请求参数，共用 PriceMemo 缓存
+
+    Args:
+        fetcher: 取数函数，签名同 Ashare.get_price（可传入 PriceMemo.get_price / KlineStore.get_price）
+    """
+    fetcher = fetcher or Ashare.get_price
+    return fetcher(full_code(code), end_date=history_end_date(date), count=count, frequency='1d')
+
+
+def _history_many(codes, date, fetcher, max_workers, errors) -> Dict[str, pd.DataFrame]:
+    """多只股票的日线，由 Ashare.get_price_many 并发调用 fetcher，无数据的股票不返回"""
+    bars = Ashare.get_price_many(codes, end_date=history_end_date(date), count=HISTORY_BARS, frequency='1d',
+                                 max_workers=max_workers, errors=errors, fetcher=fetcher)
+    return {code: df for code, df in bars.items() if not df.empty}
+
+
+def _last_quotes(bars: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """每只股票最后一根日线的收盘价、前收、涨跌幅与成交量"""
+    rows = {}
+    for code, df in bars.items():
+        close = df['close'].to_numpy(dtype=float)
+        prev_close = close[-2] if len(close) > 1 else np.nan
+        rows[code] = {'price': close[-1], 'prev_close': prev_close,
+                      'change_pct': (close[-1] / prev_close - 1) * 100 if prev_close else np.nan,
+                      'volume': float(df['volume'].iloc[-1]), 'amount': float(df['volume'].iloc[-1]) * close[-1],
+                      'bar_date': df.index[-1].strftime('%Y-%m-%d')}
+    return pd.DataFrame.from_dict(rows, orient='index',
+                                  columns=['price', 'prev_close', 'change_pct', 'volume', 'amount', 'bar_date'])
+
+
+def fetch_snapshot(codes) -> pd.DataFrame:
+    """股票与指数的当日行情，一次批量请求；失败时返回空表，由日线补出"""
+    try:
+        return Ashare.get_snapshot(codes)[QUOTE_FIELDS].astype(float)
+    except Exception as e:
+        logger.warning(f"批量快照获取失败，改由日线计算行情，估值字段缺失: {e}")
+        return pd.DataFrame(columns=QUOTE_FIELDS, dtype=float)
+
+
+def fetch_market_data(universe: pd.DataFrame, date, fetcher: Optional[Callable[..., pd.DataFrame]] = None,
+                      max_workers: int = 16) -> Dict:
+    """
+    日报所需的全部行情
+
+    Args:
+        universe: load_universe 的返回值
+        date: 报告日期，格式 YYYY-MM-DD
+        fetcher: K线取数函数，签名同 Ashare.get_price
+        max_workers: 并发请求的线程数
+
+    Returns:
+        {'market': 以代码为索引的行情表（股票池字段、快照行情与估值字段、技术指标）,
+         'indices': 以指数代码为索引的 price/change_pct 表,
+         'summary': {'date', 'stocks', 'with_bars', 'from_snapshot', 'up_count', 'down_count', 'amount_yi', 'errors'}}
+    """
+    codes = universe['code'].tolist()
+    index_codes = list(INDEX_CODES.values())
+    if history_end_date(date):
+        snapshot = pd.DataFrame(columns=QUOTE_FIELDS, dtype=float)
+    else:
+        snapshot = fetch_snapshot(codes + index_codes)
+
+    # 日线只用于需要历史的指标（RSI、波动率、突破、Beta）；指数只取Beta基准及快照中缺失的
+    errors: Dict[str, Exception] = {}
+    bars = _history_many(codes, date, fetcher, max_workers, errors)
+    index_bars = _history_many([code for code in index_codes if code == BENCHMARK_CODE or code not in snapshot.index],
+                               date, fetcher, max_workers, errors)
+    if errors:
+        logger.warning(f"{len(errors)}只股票/指数日线获取失败: "
+                       + ', '.join(f'{code}({type(e).__name__})' for code, e in list(errors.items())[:5]))
+
+    quotes = snapshot.reindex(codes).combine_first(_last_quotes(bars))
+    market = universe.set_index('code').join(quotes)
+    if bars:
+        benchmark = index_bars[BENCHMARK_CODE]['close'] if BENCHMARK_CODE in index_bars else None
+        indicators = compute_indicators(stack_bars(bars), benchmark)
+        for column in indicators.columns:
+            # 量比以快照（按当日已过时间折算）为准，快照缺失时用日线计算的值
+            values = indicators[column].reindex(market.index)
+            market[column] = market[column].fillna(values) if column in market.columns else values
+    market.index.name = 'code'
+
+    index_quotes = _last_quotes(index_bars)[['price', 'change_pct']]
+    indices = snapshot.reindex(index_codes)[['price', 'change_pct']].combine_first(index_quotes)
+    indices = indices.reindex(index_codes).dropna(how='all')
+    indices.index.name = 'code'
+    summary = {
+        'date': str(date),
+        'stocks': len(market),
+        'with_bars': len(bars),
+        'from_snapshot': int(snapshot.index.isin(codes).sum()),
+        'up_count': int((market['change_pct'] > 0).sum()),
+        'down_count': int((market['change_pct'] < 0).sum()),
+        'amount_yi': round(float(np.nansum(market['amount'].to_numpy(dtype=float))) / 1e8, 2),
+        'errors': len(errors),
+    }
+    logger.info(f"行情数据就绪: {summary['from_snapshot']}/{summary['stocks']}只股票取自快照，"
+                f"{summary['with_bars']}只有日线，上涨{summary['up_count']}家，下跌{summary['down_count']}家")
+    return {'market': market, 'indices': indices, 'summary': summary}
+
+
+def main():
+    """测试函数"""
+    universe = load_universe()
+    data = fetch_market_data(universe.head(5), datetime.now().strftime('%Y-%m-%d'))
+    print(data['market'][['name', 'price', 'change_pct', 'rsi', 'volatility_30d', 'beta']])
+    print(data['indices'])
+    print(data['summary'])
+
+
+if __name__ == "__main__":
+    main()
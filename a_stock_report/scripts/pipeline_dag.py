@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+阶段依赖图 - A股深度优化日报系统v2.0.0
+功能：把日报流程描述为阶段依赖图，互不依赖的阶段（如策略细分与标的分类）在线程池中并发执行；
+     同一张图也可以只重跑某个阶段，上游输出直接取自已有结果；
+     每个阶段的哈希由自身配置与上游哈希链式计算，用作阶段产物缓存的键
+"""
+
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.artifact_store import fingerprint
+from scripts.instrumentation import RunManifest, row_count
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """
+    图中的一个阶段
+
+    func 以关键字参数接收各依赖阶段的输出，参数名即依赖阶段名；
+    config 为影响该阶段输出的配置（可JSON序列化或DataFrame），参与阶段哈希；
+    persist 为False的阶段（如直接写文件的报告渲染）不缓存产物
+    """
+
+    def __init__(self, name: str, func: Callable[..., Any], deps: Sequence[str] = (),
+                 config: Any = None, persist: bool = True):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.config = config
+        self.persist = persist
+
+    def __call__(self, inputs: Dict[str, Any]) -> Any:
+        return self.func(**{dep: inputs[dep] for dep in self.deps})
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, deps={list(self.deps)})"
+
+
+class PipelineGraph:
+    """
+    阶段依赖图
+
+    用法：
+        graph = PipelineGraph()
+        graph.add('refine', lambda: refiner.refine_strategies(date))
+        graph.add('classify', lambda: classifier.classify_stocks(date))
+        graph.add('cross', lambda refine, classify: analyzer.perform_cross_analysis(refine, classify, date),
+                  deps=['refine', 'classify'])
+        outputs = graph.run()                                        # refine 与 classify 并发
+        outputs = graph.run(['cross'], cached={'refine': ..., 'classify': ...})   # 只重跑 cross
+
+    阶段在线程中执行，适合以网络取数/IO为主的阶段；CPU密集的阶段之间并发收益有限
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Args:
+            max_workers: 线程数，默认等于可同时就绪的阶段数上限（阶段总数）
+        """
+        self.stages: Dict[str, Stage] = {}
+        self.max_workers = max_workers
+
+    def add(self, name: str, func: Callable[..., Any], deps: Sequence[str] = (),
+            config: Any = None, persist: bool = True) -> 'PipelineGraph':
+        """添加阶段，依赖阶段须先添加，因此图天然无环；参数含义见 Stage"""
+        if name in self.stages:
+            raise ValueError(f"阶段重复: {name}")
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"阶段 {name} 的依赖未定义: {missing}")
+        self.stages[name] = Stage(name, func, deps, config, persist)
+        return self
+
+    def upstream(self, names: Iterable[str]) -> Set[str]:
+        """给定阶段及其全部上游阶段"""
+        result: Set[str] = set()
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"未知阶段: {name}")
+            if name not in result:
+                result.add(name)
+                pending.extend(self.stages[name].deps)
+        return result
+
+    def downstream(self, names: Iterable[str]) -> Set[str]:
+        """给定阶段及其全部下游阶段（按添加顺序即拓扑序遍历）"""
+        result = set(names)
+        for name, stage in self.stages.items():
+            if any(dep in result for dep in stage.deps):
+                result.add(name)
+        return result
+
+    def order(self) -> List[str]:
+        """拓扑序（即添加顺序）"""
+        return list(self.stages)
+
+    def keys(self, salt: Any = None) -> Dict[str, str]:
+        """
+        各阶段的链式哈希：阶段名 + 自身配置 + 上游阶段哈希
+
+        某阶段配置变化时，只有它和它的下游阶段哈希改变
+
+        Args:
+            salt: 参与所有阶段哈希的额外内容，如代码版本
+        """
+        keys: Dict[str, str] = {}
+        for name, stage in self.stages.items():
+            keys[name] = fingerprint(name, stage.config, [keys[dep] for dep in stage.deps], salt)
+        return keys
+
+    def run(self,
+            targets: Optional[Sequence[str]] = None,
+            cached: Optional[Dict[str, Any]] = None,
+            force: Sequence[str] = (),
+            manifest: Optional[RunManifest] = None,
+            on_complete: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Any]:
+        """
+        执行图
+
+        Args:
+            targets: 需要产出的阶段，默认全部；只执行这些阶段及其尚无结果的上游阶段
+            cached: 已有的阶段输出，对应阶段不再执行
+            force: 即使 cached 中已有结果也要重跑的阶段，其下游的已有结果一并作废
+            manifest: 运行记录，每个阶段在 manifest.stage() 中执行并记录输入/输出行数
+            on_complete: 阶段成功后回调 (阶段名, 输出)，在工作线程中调用
+
+        Returns:
+            {阶段名: 输出}，包含 cached 中用到的上游结果
+
+        Raises:
+            任一阶段抛出的第一个异常；尚未开始的阶段不再执行
+        """
+        needed = self.upstream(targets if targets is not None else self.stages)
+        # 重跑的阶段其下游已有结果随之作废
+        stale = self.downstream(force)
+        outputs = {name: value for name, value in (cached or {}).items()
+                   if name in needed and name not in stale}
+        # 只需执行尚无结果、且被目标实际用到的阶段：已有结果的阶段不必再追溯其上游
+        todo: Set[str] = set()
+        pending = [name for name in (targets if targets is not None else self.stages) if name not in outputs]
+        while pending:
+            name = pending.pop()
+            if name in todo:
+                continue
+            todo.add(name)
+            pending.extend(dep for dep in self.stages[name].deps if dep not in outputs)
+        if not todo:
+            return outputs
+
+        def execute(stage: Stage) -> Any:
+            inputs = {dep: outputs[dep] for dep in stage.deps}
+            context = manifest.stage(stage.name) if manifest is not None else nullcontext()
+            start = time.perf_counter()
+            with context as record:
+                result = stage(inputs)
+                if record is not None:
+                    counts = [row_count(value) for value in inputs.values()]
+                    counts = [count for count in counts if count is not None]
+                    record.rows_in = max(counts) if counts else None
+                    record.rows_out = row_count(result)
+            if on_complete is not None:
+                on_complete(stage.name, result)
+            logger.debug(f"阶段 {stage.name} 完成，耗时 {time.perf_counter() - start:.3f}s")
+            return result
+
+        workers = self.max_workers or len(todo)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='stage') as pool:
+            running = {}
+            while todo or running:
+                ready = [name for name in self.stages
+                         if name in todo and all(dep in outputs for dep in self.stages[name].deps)]
+                for name in ready:
+                    todo.discard(name)
+                    running[pool.submit(execute, self.stages[name])] = name
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        for other in running:
+                            other.cancel()
+                        raise error
+                    outputs[name] = future.result()
+        return outputs
+
+    def run_stage(self, name: str, cached: Dict[str, Any], manifest: Optional[RunManifest] = None) -> Any:
+        """
+        用已有的上游输出只重跑一个阶段
+
+        Raises:
+            KeyError: cached 中缺少该阶段的直接依赖
+        """
+        missing = [dep for dep in self.stages[name].deps if dep not in cached]
+        if missing:
+            raise KeyError(f"重跑阶段 {name} 缺少上游输出: {missing}")
+        return self.run([name], cached=cached, force=[name], manifest=manifest)[name]
+
+
+def main():
+    """测试函数"""
+    def slow(value, seconds=0.5):
+        time.sleep(seconds)
+        return value
+
+    graph = PipelineGraph()
+    graph.add('refine', lambda: slow(['a', 'b']))
+    graph.add('classify', lambda: slow([1, 2, 3]))
+    graph.add('cross', lambda refine, classify: {'pairs': len(refine) * len(classify)}, deps=['refine', 'classify'])
+    graph.add('report', lambda refine, classify, cross: f"{cross['pairs']} pairs", deps=['refine', 'classify', 'cross'])
+
+    start = time.perf_counter()
+    outputs = graph.run()
+    print(f"全图执行 {time.perf_counter() - start:.2f}s（两个0.5s阶段并发）: {outputs['report']}")
+
+    start = time.perf_counter()
+    report = graph.run_stage('report', dict(outputs, cross={'pairs': 42}))
+    print(f"只重跑 report {time.perf_counter() - start:.3f}s: {report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+行情内存缓存 - A股深度优化日报系统v2.0.0
+功能：在一次日报运行内，为 Ashare.get_price 提供带TTL的LRU内存缓存；
+     相同请求并发进行时只发起一次网络请求（single-flight），并统计命中/未命中次数
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ashare
+from scripts.kline_store import BARS_PER_DAY, normalize_code
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class PriceMemo:
+    """
+    get_price 的内存缓存
+
+    - 键为 (代码, 结束日期, 数量, 周期)，值为对应的K线DataFrame
+    - 日内周期使用短TTL，保证分钟线新鲜；日线及以上使用长TTL
+    - 按条目数和DataFrame内存占用双重上限做LRU淘汰
+    """
+
+    def __init__(self,
+                 fetcher: Optional[Callable[..., pd.DataFrame]] = None,
+                 max_entries: int = 20000,
+                 max_bytes: int = 512 * 1024 ** 2,
+                 daily_ttl: float = 3600.0,
+                 intraday_ttl: float = 30.0):
+        """
+        Args:
+            fetcher: 实际取数函数，签名同 Ashare.get_price（可传入 KlineStore.get_price）
+            max_entries: 最多缓存的请求数
+            max_bytes: 缓存DataFrame的内存占用上限
+            daily_ttl: 日线/周线/月线的有效期（秒）
+            intraday_ttl: 分钟线的有效期（秒）
+        """
+        self.fetcher = fetcher or Ashare.get_price
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.daily_ttl = daily_ttl
+        self.intraday_ttl = intraday_ttl
+
+        self._entries: "OrderedDict[Tuple, Tuple[float, int, pd.DataFrame]]" = OrderedDict()
+        self._inflight: Dict[Tuple, Future] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'expired': 0, 'evictions': 0}
+
+    def _ttl(self, frequency: str) -> float:
+        return self.intraday_ttl if frequency in BARS_PER_DAY else self.daily_ttl
+
+    def get_price(self, code: str, end_date='', count: int = 10, frequency: str = '1d',
+                  fields: List[str] = []) -> pd.DataFrame:
+        """
+        带内存缓存的K线获取，签名与 Ashare.get_price 一致
+
+        Returns:
+            K线DataFrame的副本，调用方修改不会污染缓存
+        """
+        key = (normalize_code(code), str(end_date), count, frequency)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, _, df = entry
+                if time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return df.copy()
+                self._discard(key)
+                self.stats['expired'] += 1
+
+            future = self._inflight.get(key)
+            if future is not None:
+                # 同一请求正在进行，等待其结果而不是重复请求
+                self.stats['coalesced'] += 1
+                leader = False
+            else:
+                future = self._inflight[key] = Future()
+                self.stats['misses'] += 1
+                leader = True
+
+        if not leader:
+            df = future.result()
+            return df.copy() if df is not None else df
+
+        try:
+            df = self.fetcher(code, end_date=end_date, count=count, frequency=frequency, fields=fields)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            del self._inflight[key]
+            if df is not None:
+                self._store(key, df, time.monotonic() + self._ttl(frequency))
+        future.set_result(df)
+        return df.copy() if df is not None else df
+
+    def _store(self, key: Tuple, df: pd.DataFrame, expires_at: float):
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        self._entries[key] = (expires_at, size, df)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            oldest = next(iter(self._entries))
+            self._discard(oldest)
+            self.stats['evictions'] += 1
+
+    def _discard(self, key: Tuple):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        """清空缓存（进行中的请求不受影响）"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def summary(self) -> Dict[str, float]:
+        """命中统计及当前占用"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hit_rate': (self.stats['hits'] + self.stats['coalesced']) / lookups if lookups else 0.0,
+            }
+
+
+def main():
+    """测试函数"""
+    memo = PriceMemo()
+    for _ in range(3):
+        df = memo.get_price('sh000001', count=10, frequency='1d')
+    print('上证指数日线\n', df)
+    print('缓存统计:', memo.summary())
+
+
+if __name__ == "__main__":
+    main()
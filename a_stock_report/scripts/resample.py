@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+K线周期聚合 - A股深度优化日报系统v2.0.0
+功能：由已取得的细周期K线在本地合成粗周期K线，按A股交易时段（9:30-11:30、13:00-15:00）切分，
+     60分钟线为 10:30/11:30/14:00/15:00 四根，与行情接口一致；周线/月线以周期内最后一个交易日为标签。
+     多周期分析时每只股票只请求一次最细的周期，其余周期全部本地聚合
+"""
+
+import logging
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import reduce
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Ashare
+from scripts.trade_calendar import BARS_PER_DAY, get_calendar
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_SESSION = 120            # 上午、下午各120分钟
+MORNING_OPEN = 9 * 60 + 30           # 9:30
+AFTERNOON_OPEN = 13 * 60             # 13:00
+DAILY_FREQUENCIES = ('1d', '1w', '1M')
+
+# 单次请求能取到的分钟K线上限（新浪/腾讯接口约一千根），日线周期超出此范围时改为单独请求日线
+MAX_MINUTE_BARS = 1000
+
+# 每根周线/月线最多包含的交易日数，用于估计需要多少根日线
+DAYS_PER_PERIOD = {'1d': 1, '1w': 5, '1M': 23}
+
+
+def _minutes(frequency: str) -> int:
+    """'5m' -> 5；日线及以上返回0"""
+    return int(frequency[:-1]) if frequency in BARS_PER_DAY else 0
+
+
+def _check(source: str, target: str):
+    """分钟线可聚合为其整数倍的分钟线及日/周/月线，日线可聚合为周/月线"""
+    for frequency in (source, target):
+        if frequency not in BARS_PER_DAY and frequency not in DAILY_FREQUENCIES:
+            raise ValueError(f"不支持的周期: {frequency}")
+    if source in DAILY_FREQUENCIES:
+        if target != source and (source != '1d' or target in BARS_PER_DAY):
+            raise ValueError(f"{target} 不能由 {source} 聚合")
+    elif target in BARS_PER_DAY and _minutes(target) % _minutes(source):
+        raise ValueError(f"{target} 不能由 {source} 聚合")
+
+
+def _session_minute(index: pd.DatetimeIndex) -> np.ndarray:
+    """
+    K线结束时间 -> 当日第几个交易分钟（1..240）
+
+    上午 9:31-11:30 对应 1-120，下午 13:01-15:00 对应 121-240；9:30 的集合竞价K线并入第一分钟
+    """
+    clock = ((index - index.normalize()) // pd.Timedelta(minutes=1)).to_numpy()
+    minute = np.where(clock <= MORNING_OPEN + MINUTES_PER_SESSION, clock - MORNING_OPEN,
+                      clock - AFTERNOON_OPEN + MINUTES_PER_SESSION)
+    return np.clip(minute, 1, 2 * MINUTES_PER_SESSION)
+
+
+def _minute_labels(index: pd.DatetimeIndex, minutes: int) -> np.ndarray:
+    """每根细周期K线所属的 minutes 分钟K线的结束时间（int64纳秒）"""
+    bucket = -(-_session_minute(index) // minutes) * minutes
+    clock = np.where(bucket <= MINUTES_PER_SESSION, MORNING_OPEN + bucket,
+                     AFTERNOON_OPEN + bucket - MINUTES_PER_SESSION)
+    days = index.normalize().asi8
+    return days + clock.astype(np.int64) * 60_000_000_000
+
+
+def _period_labels(index: pd.DatetimeIndex, target: str) -> np.ndarray:
+    """每根K线所属的日/周/月K线标签：日线为当日零点，周线/月线为周期内最后一根K线的日期"""
+    days = index.normalize()
+    if target == '1d':
+        return days.asi8
+    codes = pd.factorize(days.to_period('W' if target == '1w' else 'M'))[0]
+    last = np.r_[np.flatnonzero(np.diff(codes)), len(codes) - 1]
+    return days.asi8[last][codes]
+
+
+def _aggregate(df: pd.DataFrame, labels: np.ndarray) -> pd.DataFrame:
+    """按已排序的标签分组：开盘取首根、最高/最低取极值、收盘取末根、成交量求和"""
+    starts = np.r_[0, np.flatnonzero(np.diff(labels)) + 1]
+    ends = np.r_[starts[1:], len(labels)] - 1
+    columns = {}
+    for column in df.columns:
+        values = df[column].to_numpy()
+        if column == 'open':
+            columns[column] = values[starts]
+        elif column == 'high':
+            columns[column] = np.maximum.reduceat(values, starts)
+        elif column == 'low':
+            columns[column] = np.minimum.reduceat(values, starts)
+        elif column in ('volume', 'amount'):
+            columns[column] = np.add.reduceat(values, starts)
+        else:
+            columns[column] = values[ends]
+    index = pd.DatetimeIndex(labels[starts].view('datetime64[ns]'), name=df.index.name)
+    return pd.DataFrame(columns, index=index)
+
+
+def _head_complete(index: pd.DatetimeIndex, source: str, target: str) -> bool:
+    """第一根聚合K线是否包含了完整周期（窗口从周期中间开始时第一根只有部分数据）"""
+    first = index[0]
+    if source in BARS_PER_DAY:
+        minute = _session_minute(index[:1])[0]
+        if target in BARS_PER_DAY:
+            return (minute - 1) % _minutes(target) < _minutes(source)
+        if minute > _minutes(source):
+            return False
+    if target == '1d':
+        return True
+    # 周线/月线：前一个交易日落在上一个周期，第一根才是完整的
+    previous = get_calendar().previous_trading_day(first.normalize() - pd.Timedelta(days=1))
+    freq = 'W' if target == '1w' else 'M'
+    return previous.to_period(freq) != first.to_period(freq)
+
+
+def resample(df: pd.DataFrame, source: str, target: str, drop_partial_head: bool = True) -> pd.DataFrame:
+    """
+    把 source 周期的K线聚合为 target 周期
+
+    分钟线按交易时段切分（跨午休的K线不会合并上午与下午），最后一根可能是尚未走完的周期，与行情接口一致
+
+    Args:
+        df: 以K线结束时间为索引的DataFrame，含 open/high/low/close/volume 列
+        source: 原周期，'1m'/'5m'/'15m'/'30m'/'60m'/'1d'
+        target: 目标周期，须为 source 的整数倍，或 '1d'/'1w'/'1M'
+        drop_partial_head: 窗口从周期中间开始时丢弃不完整的第一根
+
+    Returns:
+        target 周期的K线DataFrame
+
+    Raises:
+        ValueError: target 不能由 source 聚合
+    """
+    _check(source, target)
+    if df is None or df.empty or source == target:
+        return df
+    df = df.sort_index()
+    index = pd.DatetimeIndex(df.index.to_numpy().astype('datetime64[ns]'))      # 统一为纳秒精度再按整数计算标签
+    labels = _minute_labels(index, _minutes(target)) if target in BARS_PER_DAY else _period_labels(index, target)
+    result = _aggregate(df, labels)
+    if drop_partial_head and not _head_complete(index, source, target):
+        result = result.iloc[1:]
+    return result
+
+
+def plan_fetches(frequencies: List[str], counts: Dict[str, int], end_date='') -> Dict[str, str]:
+    """
+    多周期请求计划：每个周期由哪个源周期聚合而来
+
+    分钟周期以所有分钟周期的最大公约数为源周期（如 15m/30m/60m 只取 15m）；
+    日线及以上在一次分钟线请求装得下（不超过 MAX_MINUTE_BARS）时也由分钟线聚合，否则另取一次日线。
+    指定了结束日期时分钟线接口只返回最新数据，日线及以上总是单独取日线
+
+    Returns:
+        {目标周期: 源周期}
+    """
+    minute = [f for f in frequencies if f in BARS_PER_DAY]
+    daily = [f for f in frequencies if f in DAILY_FREQUENCIES]
+    base = f"{reduce(math.gcd, (_minutes(f) for f in minute))}m" if minute else None
+    days = max((counts[f] + 1) * DAYS_PER_PERIOD[f] for f in daily) if daily else 0
+    daily_source = base if base and not end_date and (days + 1) * BARS_PER_DAY[base] <= MAX_MINUTE_BARS else '1d'
+    return {f: base if f in BARS_PER_DAY else daily_source for f in frequencies}
+
+
+def _source_counts(plan: Dict[str, str], counts: Dict[str, int]) -> Dict[str, int]:
+    """每个源周期需要请求的K线数量，多取一个目标周期以便丢弃不完整的第一根"""
+    needed = {}
+    for target, source in plan.items():
+        if target in BARS_PER_DAY:
+            n = (counts[target] + 1) * (_minutes(target) // _minutes(source))
+        else:
+            days = (counts[target] + 1) * DAYS_PER_PERIOD[target]
+            n = (days + 1) * BARS_PER_DAY[source] if source in BARS_PER_DAY else days
+        needed[source] = max(needed.get(source, 0), n)
+    return needed
+
+
+def get_multi_timeframe(code: str, frequencies: List[str], count: Union[int, Dict[str, int]] = 10,
+                        end_date='', fetcher: Optional[Callable[..., pd.DataFrame]] = None) -> Dict[str, pd.DataFrame]:
+    """
+    一只股票的多周期K线，每个源周期只请求一次，其余周期本地聚合
+
+    Args:
+        code: 股票代码
+        frequencies: 需要的周期列表，如 ['5m', '15m', '60m', '1d', '1w']
+        count: 每个周期的K线数量，可按周期分别指定 {周期: 数量}
+        end_date: 结束日期，空表示最新
+        fetcher: 取数函数，签名同 Ashare.get_price（可传入 KlineStore.get_price / PriceMemo.get_price 复用缓存）
+
+    Returns:
+        {周期: K线DataFrame}
+    """
+    fetcher = fetcher or Ashare.get_price
+    counts = count if isinstance(count, dict) else {f: count for f in frequencies}
+    plan = plan_fetches(frequencies, counts, end_date)
+    sources = {freq: fetcher(code, end_date=end_date, count=n, frequency=freq)
+               for freq, n in _source_counts(plan, counts).items()}
+
+    result = {}
+    for frequency, source in plan.items():
+        df = resample(sources[source], source, frequency)
+        result[frequency] = df.iloc[-counts[frequency]:] if df is not None else df
+    return result
+
+
+def get_multi_timeframe_many(codes: List[str], frequencies: List[str], count: Union[int, Dict[str, int]] = 10,
+                             end_date='', fetcher: Optional[Callable[..., pd.DataFrame]] = None,
+                             max_workers: int = 16,
+                             errors: Optional[Dict[str, Exception]] = None) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """
+    多只股票并发获取多周期K线，语义同 Ashare.get_price_many
+
+    Returns:
+        {代码: {周期: K线DataFrame}}，按输入顺序
+    """
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(get_multi_timeframe, code, frequencies, count, end_date, fetcher): code
+                   for code in dict.fromkeys(codes)}
+        for future in as_completed(futures):
+            code = futures[future]
+            try:
+                results[code] = future.result()
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors[code] = e
+    return {code: results[code] for code in codes if code in results}
+
+
+def main():
+    """测试函数"""
+    frames = get_multi_timeframe('sh000001', ['15m', '30m', '60m', '1d'], count=4)
+    for frequency, df in frames.items():
+        print(f'上证指数 {frequency}（由一次分钟线请求聚合）\n', df)
+
+    daily = Ashare.get_price('sh000001', count=60, frequency='1d')
+    print('上证指数周线（由日线聚合）\n', resample(daily, '1d', '1w').tail())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则引擎 - A股深度优化日报系统v2.0.0
+功能：把 config/strategy_config.yaml 中各子策略的 filter_criteria 一次性编译为向量化条件，
+     在全市场DataFrame上一次求出 股票×子策略 的布尔矩阵
+"""
+
+import logging
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import yaml
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'config', 'strategy_config.yaml')
+
+# filter_criteria 中描述策略本身、不参与筛选的字段
+META_KEYS = {'historical_win_rate', 'risk_level'}
+
+# 配置字段名 -> 行情/财务DataFrame中的常用列名；DataFrame中已有配置字段同名列时优先使用同名列
+COLUMN_ALIASES = {
+    'price_change_pct': 'change_pct',
+    'pe_ratio': 'pe',
+    'pb_ratio': 'pb',
+    'concept_tags': 'concepts',
+    'sector': 'industry',
+    'resistance_break': 'breakout',
+}
+
+# 日报流程中有数据来源的列：Ashare.get_snapshot 的快照字段、indicators.compute_indicators 的技术指标、
+# 股票池的行业/主营、StockClassifier 的概念/行业标签。配置条件的字段不在其中（且没有别名）时编译期告警
+PRODUCED_COLUMNS = frozenset([
+    'name', 'price', 'prev_close', 'open', 'high', 'low', 'volume', 'amount', 'change_pct',
+    'volume_ratio', 'turnover', 'pe', 'pb', 'mcap',
+    'rsi', 'volatility_30d', 'resistance_break', 'volume_spike', 'beta',
+    'industry', 'business', 'concepts', 'industries',
+])
+
+# 布尔条件接受的字符串取值（不区分大小写），其余字符串与缺失值视为无法判断，两种布尔条件都不满足
+TRUE_STRINGS = frozenset(['true', 't', 'yes', 'y', '1', '是', '真'])
+FALSE_STRINGS = frozenset(['false', 'f', 'no', 'n', '0', '否', '假'])
+
+_NUMBER = r'[-+]?\d+(?:\.\d+)?'
+_COMPARISON = re.compile(rf'^\s*(>=|<=|>|<|==|=)\s*({_NUMBER})\s*$')
+_RANGE = re.compile(rf'^\s*({_NUMBER})\s*-\s*({_NUMBER})\s*$')
+
+
+def parse_bools(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    把一列解析为布尔值
+
+    Returns:
+        (真值, 是否可解析)：布尔列直接使用；数值按非零为真；字符串按 TRUE_STRINGS/FALSE_STRINGS 解析
+    """
+    if pd.api.types.is_bool_dtype(values.dtype):
+        truth = values.fillna(False).to_numpy(dtype=bool)
+        return truth, values.notna().to_numpy()
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        numbers = values.to_numpy(dtype=np.float64)
+        valid = ~np.isnan(numbers)
+        return valid & (numbers != 0), valid
+
+    def parse(value) -> Optional[bool]:
+        if isinstance(value, (bool, np.bool_)):
+            return bool(value)
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return None if np.isnan(value) else bool(value)
+        if isinstance(value, str):
+            text = value.strip().lower()
+            if text in TRUE_STRINGS:
+                return True
+            if text in FALSE_STRINGS:
+                return False
+        return None
+
+    parsed = [parse(value) for value in values]
+    valid = np.fromiter((value is not None for value in parsed), dtype=bool, count=len(parsed))
+    truth = np.fromiter((bool(value) for value in parsed), dtype=bool, count=len(parsed))
+    return truth, valid
+
+
+class Criterion:
+    """
+    单个筛选条件
+
+    支持的表达式：
+    - 比较：">7"、"<-5"、">=1.5"、"=0"
+    - 闭区间："15-30"
+    - 布尔：true/false，与列的真值比较，字符串取值按 TRUE_STRINGS/FALSE_STRINGS 解析
+    - 列表：标量列取值属于列表，或列表列（如概念标签）与列表有交集
+    - 其他标量：相等比较
+    """
+
+    def __init__(self, field: str, expression):
+        self.field = field
+        self.expression = expression
+        if isinstance(expression, bool):
+            self.kind, self.args = 'bool', (expression,)
+        elif isinstance(expression, (list, tuple, set)):
+            self.kind, self.args = 'in', (tuple(expression),)
+        elif isinstance(expression, str) and _COMPARISON.match(expression):
+            op, value = _COMPARISON.match(expression).groups()
+            self.kind, self.args = 'cmp', ('==' if op == '=' else op, float(value))
+        elif isinstance(expression, str) and _RANGE.match(expression):
+            low, high = (float(v) for v in _RANGE.match(expression).groups())
+            self.kind, self.args = 'range', (low, high)
+        else:
+            self.kind, self.args = 'eq', (expression,)
+
+    @property
+    def key(self) -> Tuple:
+        """条件的规范化标识，相同标识的条件在一次求值中只计算一次"""
+        return (self.field, self.kind, self.args)
+
+    def resolve_name(self, names) -> Optional[str]:
+        """在给定的字段名集合中确定条件作用的字段，同名字段优先，其次是别名"""
+        if self.field in names:
+            return self.field
+        alias = COLUMN_ALIASES.get(self.field)
+        return alias if alias in names else None
+
+    def resolve_column(self, df: pd.DataFrame) -> Optional[str]:
+        """确定条件作用的列，找不到时返回None"""
+        return self.resolve_name(df.columns)
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        在DataFrame上求值
+
+        Returns:
+            长度为行数的布尔数组；列缺失或取值缺失的行为False
+        """
+        column = self.resolve_column(df)
+        if column is None:
+            return np.zeros(len(df), dtype=bool)
+        return self.apply(df[column])
+
+    def apply(self, values: pd.Series) -> np.ndarray:
+        """对一列取值求值，缺失值为False"""
+        if self.kind in ('cmp', 'range'):
+            numbers = pd.to_numeric(values, errors='coerce').to_numpy(dtype=np.float64)
+            with np.errstate(invalid='ignore'):
+                if self.kind == 'range':
+                    low, high = self.args
+                    return (numbers >= low) & (numbers <= high)
+                op, value = self.args
+                return {'>': np.greater, '<': np.less, '>=': np.greater_equal,
+                        '<=': np.less_equal, '==': np.equal}[op](numbers, value)
+
+        if self.kind == 'bool':
+            truth, valid = parse_bools(values)
+            return valid & (truth if self.args[0] else ~truth)
+
+        if self.kind == 'in':
+            options = list(self.args[0])
+            is_list = values.map(lambda v: isinstance(v, (list, tuple, set, np.ndarray)))
+            if not is_list.any():
+                return values.isin(options).to_numpy()
+            # 列表列：展开后判断是否与条件列表有交集
+            exploded = values.where(is_list, None).explode()
+            hit = exploded.isin(options).groupby(level=0, sort=False).any()
+            return hit.reindex(values.index, fill_value=False).to_numpy(dtype=bool)
+
+        return (values == self.args[0]).fillna(False).to_numpy(dtype=bool)
+
+
+class RuleEngine:
+    """
+    子策略规则引擎
+
+    - 启动时读取配置并把每个子策略的 filter_criteria 编译为 Criterion 列表
+    - evaluate 对整张表求值，相同条件在各子策略间共享，只计算一次
+    - 配置条件用到输入中没有的字段时，有备用规则的子策略改用备用规则求值
+    """
+
+    def __init__(self, config_path: Optional[str] = None, config: Optional[Dict] = None,
+                 fallbacks: Optional[Dict[str, List[Dict]]] = None,
+                 known_columns: Iterable[str] = PRODUCED_COLUMNS):
+        """
+        Args:
+            config_path: 策略配置文件路径，默认 config/strategy_config.yaml
+            config: 直接传入已解析的配置字典，优先于 config_path
+            fallbacks: 备用规则 {子策略键或中文名: [条件字典, ...]}，条件字典内为与、字典之间为或
+            known_columns: 有数据来源的列，用于编译期检查无法满足的条件
+        """
+        if config is None:
+            with open(config_path or DEFAULT_CONFIG_PATH, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f)
+
+        self.base_strategies: Dict[str, List[str]] = {}
+        self.sub_strategies: Dict[str, Dict] = {}
+        self.rules: Dict[str, List[Criterion]] = {}
+        for base_strategy, subs in (config.get('strategy_subdivisions') or {}).items():
+            self.base_strategies[base_strategy] = list(subs)
+            for sub_strategy, spec in subs.items():
+                criteria = spec.get('filter_criteria') or {}
+                self.sub_strategies[sub_strategy] = {
+                    'name': spec.get('name', sub_strategy),
+                    'base_strategy': base_strategy,
+                    'historical_win_rate': criteria.get('historical_win_rate'),
+                    'risk_level': criteria.get('risk_level'),
+                }
+                self.rules[sub_strategy] = [Criterion(field, expression)
+                                            for field, expression in criteria.items()
+                                            if field not in META_KEYS]
+
+        self.fallbacks: Dict[str, List[List[Criterion]]] = {}
+        for key, groups in (fallbacks or {}).items():
+            sub_strategy = key if key in self.rules else self.find_by_name(key)
+            if sub_strategy is None:
+                logger.warning(f"备用规则对应的子策略不存在: {key}")
+                continue
+            self.fallbacks[sub_strategy] = [[Criterion(field, expression) for field, expression in group.items()]
+                                            for group in groups]
+
+        logger.info(f"规则引擎编译完成：{len(self.rules)}个子策略，"
+                    f"{len({c.key for rules in self.rules.values() for c in rules})}个不同条件")
+        self._check_fields(known_columns)
+
+    def _check_fields(self, known_columns: Iterable[str]):
+        """
+        编译期检查：配置条件的字段没有数据来源时，该子策略在日报数据上不会按配置命中；
+        备用规则也只有在至少一个条件组的字段都有数据来源时才可能命中
+        """
+        known = set(known_columns)
+        unsatisfiable = {}
+        for sub_strategy, rules in self.rules.items():
+            fields = [c.field for c in rules if c.resolve_name(known) is None]
+            if not fields:
+                continue
+            fallback = self.fallbacks.get(sub_strategy)
+            if fallback and any(all(c.resolve_name(known) is not None for c in group) for group in fallback):
+                status = '改用备用规则'
+            elif fallback:
+                missing = dict.fromkeys(c.field for group in fallback for c in group if c.resolve_name(known) is None)
+                status = f"备用规则的 {', '.join(missing)} 也没有数据来源，不会命中"
+            else:
+                status = '不会命中'
+            unsatisfiable[sub_strategy] = (fields, status)
+        if not unsatisfiable:
+            return
+        described = '；'.join(f"{self.sub_strategies[sub]['name']}({', '.join(fields)}，{status})"
+                             for sub, (fields, status) in unsatisfiable.items())
+        logger.warning(f"以下子策略的条件字段没有数据来源: {described}")
+
+    def rule_groups(self, sub_strategy: str, available: Iterable[str]) -> List[List[Criterion]]:
+        """
+        子策略实际求值的条件组（组内为与、组间为或）
+
+        配置条件的字段都能在 available 中找到时使用配置条件，否则有备用规则时使用备用规则
+        """
+        rules = self.rules[sub_strategy]
+        fallback = self.fallbacks.get(sub_strategy)
+        if fallback and any(c.resolve_name(available) is None for c in rules):
+            return fallback
+        return [rules] if rules else []
+
+    def evaluate(self, df: pd.DataFrame, sub_strategies: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        一次性求出每只股票满足哪些子策略
+
+        Args:
+            df: 全市场行情/财务DataFrame，每行一只股票
+            sub_strategies: 只求值这些子策略，默认全部
+
+        Returns:
+            与df同索引、以子策略为列的布尔DataFrame；没有任何条件的子策略全部为False
+        """
+        names = list(self.rules) if sub_strategies is None else list(sub_strategies)
+        available = set(df.columns)
+        cache: Dict[Tuple, np.ndarray] = {}
+        result = np.zeros((len(df), len(names)), dtype=bool)
+        for col, name in enumerate(names):
+            for group in self.rule_groups(name, available):
+                combined = np.ones(len(df), dtype=bool)
+                for criterion in group:
+                    if criterion.key not in cache:
+                        cache[criterion.key] = criterion.mask(df)
+                    combined &= cache[criterion.key]
+                result[:, col] |= combined
+        return pd.DataFrame(result, index=df.index, columns=names)
+
+    def evaluate_panel(self,
+                       panels: Dict[str, np.ndarray],
+                       static: Optional[pd.DataFrame] = None,
+                       sub_strategies: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        在 时间×股票 面板上求值，用于历史回放
+
+        Args:
+            panels: {字段: 形状为(时间数, 股票数)的数组}，随日期变化的行情/技术指标
+            static: 与面板列顺序一致、每行一只股票的DataFrame，放不随日期变化的字段（行业、概念、财务等），
+                    这些条件只按股票求值一次再广播到所有日期
+            sub_strategies: 只求值这些子策略，默认全部
+
+        Returns:
+            {子策略: 形状为(时间数, 股票数)的布尔数组}
+        """
+        names = list(self.rules) if sub_strategies is None else list(sub_strategies)
+        shape = next(iter(panels.values())).shape if panels else (1, len(static) if static is not None else 0)
+        static_columns = static.columns if static is not None else []
+        cache: Dict[Tuple, np.ndarray] = {}
+
+        def criterion_mask(criterion: Criterion) -> np.ndarray:
+            field = criterion.resolve_name(panels)
+            if field is not None:
+                return criterion.apply(pd.Series(panels[field].ravel())).reshape(shape)
+            column = criterion.resolve_name(static_columns)
+            if column is not None:
+                return np.broadcast_to(criterion.apply(static[column]), shape)
+            return np.zeros(shape, dtype=bool)
+
+        available = set(panels) | set(static_columns)
+        result = {}
+        for name in names:
+            matched = np.zeros(shape, dtype=bool)
+            for group in self.rule_groups(name, available):
+                combined = np.ones(shape, dtype=bool)
+                for criterion in group:
+                    if criterion.key not in cache:
+                        cache[criterion.key] = criterion_mask(criterion)
+                    combined &= cache[criterion.key]
+                matched |= combined
+            result[name] = matched
+        return result
+
+    def find_by_name(self, name: str) -> Optional[str]:
+        """按中文名称查找配置中的子策略键"""
+        for sub_strategy, info in self.sub_strategies.items():
+            if info['name'] == name:
+                return sub_strategy
+        return None
+
+
+def main():
+    """测试函数"""
+    engine = RuleEngine()
+    market = pd.DataFrame({
+        'code': ['600519', '300750', '601988', '688981'],
+        'change_pct': [8.2, -6.1, -0.4, 3.5],
+        'volume_ratio': [2.1, 0.8, 1.0, 1.6],
+        'rsi': [72, 25, 48, 60],
+        'pe': [28.0, 18.5, 5.2, 60.0],
+        'pb': [8.1, 4.2, 0.6, 3.3],
+        'roe': [30.0, 22.0, 11.0, 6.0],
+        'dividend_yield': [1.8, 0.5, 5.6, 0.0],
+        'beta': [0.9, 1.3, 0.5, 1.4],
+        'industry': ['食品饮料', '电力设备', '公用事业', '电子'],
+        'concepts': [['消费'], ['新能源', '锂电'], ['银行'], ['芯片', '半导体']],
+        'us_correlation': [0.2, 0.8, 0.1, 0.85],
+    }).set_index('code')
+    print(engine.evaluate(market).T)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片并行执行 - A股深度优化日报系统v2.0.0
+功能：日报 标的分类 → 策略细分 → 交叉分析 三个阶段的多进程分片版本，每个分片调用的就是单进程DAG中的阶段函数：
+     股票池按行切成若干分片，表格数据以 Arrow IPC 格式写入一块共享内存、标签归属位图与子策略归属矩阵放在
+     共享数组中，各进程零拷贝读取自己的行区间并把逐股结果写回共享数组；交叉分析只有各分片未归一化的
+     累加和与三维候选经进程间传回，合并后再统一归一化，结果与单进程完全一致
+"""
+
+import argparse
+import functools
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.cross_analyzer import CrossAnalyzer
+from scripts.stock_classifier import StockClassifier
+from scripts.strategy_refiner import StrategyRefiner
+
+try:
+    import pyarrow as pa
+except ImportError:  # 没有 pyarrow 时分片DataFrame经pickle传给子进程
+    pa = None
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 可分片执行的日报阶段
+STAGES = ['stock_classification', 'strategy_refinement', 'cross_analysis']
+
+# 每个进程内的分析器（_init_worker 创建）与当前一轮分片的共享内存视图（_attach_pass 打开）
+_WORKER: Dict = {}
+
+
+class SharedArrays:
+    """
+    一组放在共享内存中的numpy数组
+
+    父进程 create 创建，子进程用 spec 按名称 attach；父进程负责 close + unlink
+    """
+
+    def __init__(self, blocks: Dict[str, shared_memory.SharedMemory], specs: Dict[str, Tuple]):
+        self.blocks = blocks
+        self.specs = specs
+        self.arrays = {name: np.ndarray(shape, dtype=dtype, buffer=blocks[name].buf)
+                       for name, (_, shape, dtype) in specs.items()}
+
+    @classmethod
+    def create(cls, shapes: Dict[str, Tuple[Tuple[int, ...], str]]) -> 'SharedArrays':
+        blocks, specs = {}, {}
+        for name, (shape, dtype) in shapes.items():
+            size = max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize)
+            blocks[name] = shared_memory.SharedMemory(create=True, size=size)
+            specs[name] = (blocks[name].name, shape, dtype)
+        shared = cls(blocks, specs)
+        for array in shared.arrays.values():
+            array.fill(0)
+        return shared
+
+    @classmethod
+    def attach(cls, specs: Dict[str, Tuple]) -> 'SharedArrays':
+        return cls({name: _attach(block_name) for name, (block_name, _, _) in specs.items()}, specs)
+
+    def release(self, unlink: bool = False):
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if unlink:
+                block.unlink()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    子进程按名称打开共享内存，生命周期由创建它的父进程管理
+
+    Python 3.13 起可以不登记到 resource_tracker；更早的版本打开时也会登记，但进程池子进程与父进程
+    共用同一个 resource_tracker，重复登记是空操作，不能在子进程中撤销登记，否则父进程 unlink 时会报错
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def _share_table(universe: pd.DataFrame) -> shared_memory.SharedMemory:
+    """把DataFrame按 Arrow IPC 流格式直接写入一块共享内存（只拷贝一次）"""
+    table = pa.Table.from_pandas(universe, preserve_index=True)
+    mock = pa.MockOutputStream()
+    with pa.ipc.new_stream(mock, table.schema) as writer:
+        writer.write_table(table)
+    block = shared_memory.SharedMemory(create=True, size=max(1, mock.size()))
+    with pa.ipc.new_stream(pa.FixedSizeBufferWriter(pa.py_buffer(block.buf)), table.schema) as writer:
+        writer.write_table(table)
+    return block
+
+
+def _init_worker():
+    """子进程初始化：创建分析器（每个进程一份，使用默认配置），进程池的各轮分片共用"""
+    logging.disable(logging.INFO)
+    _WORKER['context'] = {'classifier': StockClassifier(), 'refiner': StrategyRefiner(), 'analyzer': CrossAnalyzer()}
+
+
+def _attach_pass(table_name: Optional[str], input_specs: Dict[str, Tuple], output_specs: Dict[str, Tuple]) -> Dict:
+    """
+    打开本轮分片的共享内存，同一轮的后续分片直接复用；换到下一轮时关闭上一轮的映射（unlink 由父进程负责）
+    """
+    key = (table_name, tuple(spec[0] for spec in input_specs.values()),
+           tuple(spec[0] for spec in output_specs.values()))
+    current = _WORKER.get('pass')
+    if current is not None and current['key'] == key:
+        return current
+    if current is not None:
+        _WORKER.pop('pass')
+        current['table'] = None
+        try:
+            current['inputs'].release()
+            current['outputs'].release()
+            if current['block'] is not None:
+                current['block'].close()
+        except BufferError:  # 仍有视图引用该映射时留给垃圾回收关闭
+            pass
+    block = _attach(table_name) if table_name is not None else None
+    current = {
+        'key': key,
+        'block': block,
+        'table': pa.ipc.open_stream(pa.py_buffer(block.buf)).read_all() if block is not None else None,
+        'inputs': SharedArrays.attach(input_specs),
+        'outputs': SharedArrays.attach(output_specs),
+    }
+    _WORKER['pass'] = current
+    return current
+
+
+def _run_shard(task: Tuple):
+    """
+    子进程中执行一个分片
+
+    task 为 (分片函数名, start, stop, 附加参数, 共享内存描述, 无 pyarrow 时的分片DataFrame)
+    """
+    name, start, stop, extra, specs, shard = task
+    shared = _attach_pass(*specs)
+    if shard is None:
+        shard = shared['table'].slice(start, stop - start).to_pandas()
+    return _TASKS[name](_WORKER['context'], shard, shared['inputs'].arrays, shared['outputs'].arrays,
+                        slice(start, stop), extra)
+
+
+def _classification(classifier: StockClassifier, codes: List, names: List,
+                    concept_bits: np.ndarray, industry_bits: np.ndarray) -> pd.DataFrame:
+    """由标签归属位图还原 classify_stocks_batch 格式的分类结果"""
+    return classifier.classification_frame(codes, names,
+                                           pd.DataFrame(concept_bits, columns=list(classifier.concept_tags)),
+                                           pd.DataFrame(industry_bits, columns=list(classifier.industry_tags)))
+
+
+def _tag_bits(classifier: StockClassifier, stock_classification: pd.DataFrame, positions: np.ndarray) -> Dict:
+    """
+    把分类结果中的概念/行业列表转成归属位图，行按 positions 重排（-1 表示该行没有分类结果）
+
+    Returns:
+        {'concepts', 'industries': 布尔位图, 'tagged': 每行是否有分类结果}
+    """
+    tagged = positions >= 0
+    bits = {'tagged': tagged}
+    for column, tags in (('concepts', classifier.concept_tags), ('industries', classifier.industry_tags)):
+        lists = stock_classification[column].tolist()
+        rows = np.repeat(np.arange(len(lists)), [len(items) for items in lists])
+        cols = pd.Index(list(tags)).get_indexer([tag for items in lists for tag in items])
+        matrix = np.zeros((len(lists), len(tags)), dtype=bool)
+        matrix[rows[cols >= 0], cols[cols >= 0]] = True
+        aligned = np.zeros((len(positions), len(tags)), dtype=bool)
+        aligned[tagged] = matrix[positions[tagged]]
+        bits[column] = aligned
+    return bits
+
+
+def _membership_task(context: Dict, shard: pd.DataFrame, inputs: Dict, outputs: Dict, rows: slice, extra):
+    """关键词匹配：分片的概念/行业归属写入共享位图"""
+    concept_matrix, industry_matrix = context['classifier'].classify_membership(shard)
+    outputs['concepts'][rows] = concept_matrix.to_numpy(dtype=bool)
+    outputs['industries'][rows] = industry_matrix.to_numpy(dtype=bool)
+
+
+def _refine_task(context: Dict, shard: pd.DataFrame, inputs: Dict, outputs: Dict, rows: slice, extra):
+    """策略细分：StrategyRefiner.refine_matrix 作用于行情表的一个分片，归属矩阵写入共享数组"""
+    classification = None
+    if extra['classified']:
+        tagged = inputs['tagged'][rows]
+        codes = shard.index[tagged].tolist()
+        classification = _classification(context['classifier'], codes, [''] * len(codes),
+                                         inputs['concepts'][rows][tagged], inputs['industries'][rows][tagged])
+    matrix = context['refiner'].refine_matrix({'market': shard}, classification)
+    outputs['refined'][rows] = matrix.to_numpy(dtype=bool)
+
+
+def _cross_task(context: Dict, shard: pd.DataFrame, inputs: Dict, outputs: Dict, rows: slice, extra) -> Dict:
+    """交叉分析：CrossAnalyzer.cross_partials 作用于一个分片，返回可合并的累加和与三维候选"""
+    codes = shard['stock_code'].tolist()
+    classification = _classification(context['classifier'], codes, shard['stock_name'].tolist(),
+                                     inputs['concepts'][rows], inputs['industries'][rows])
+    matrix = pd.DataFrame(inputs['refined'][rows], index=codes, columns=extra['sub_strategies'])
+    market_data = {'market': shard.set_index('stock_code')[['industry']]} if 'industry' in shard.columns else None
+    return context['analyzer'].cross_partials(matrix, classification, market_data, extra['top_n'])
+
+
+_TASKS = {'membership': _membership_task, 'refine': _refine_task, 'cross': _cross_task}
+
+
+class ShardedRunner:
+    """
+    日报 标的分类/策略细分/交叉分析 的分片并行执行器
+
+    各方法的输出与对应的单进程阶段函数相同；股票数不足 2 个分片（每片至少 min_shard_rows 只）时直接在当前进程内执行。
+    进程池在第一次分片执行时创建，多个阶段共用，用完调用 close（或作为上下文管理器使用）
+    """
+
+    def __init__(self, n_shards: Optional[int] = None, max_workers: Optional[int] = None,
+                 min_shard_rows: int = 500, start_method: str = 'spawn'):
+        """
+        Args:
+            n_shards: 分片数，默认等于进程数
+            max_workers: 进程数，默认CPU核数；为1时在当前进程内顺序执行各分片
+            min_shard_rows: 每个分片至少的股票数，避免为少量股票启动进程池
+            start_method: 子进程启动方式；日报各阶段在线程池中执行，默认 spawn 避免 fork 时复制其他线程持有的锁
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.n_shards = n_shards or self.max_workers
+        self.min_shard_rows = min_shard_rows
+        self.start_method = start_method
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def __enter__(self) -> 'ShardedRunner':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """关闭进程池；之后再分片执行时重新创建"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                             mp_context=multiprocessing.get_context(self.start_method),
+                                             initializer=_init_worker)
+        return self._pool
+
+    def _bounds(self, n: int) -> np.ndarray:
+        n_shards = max(1, min(self.n_shards, n // max(1, self.min_shard_rows)))
+        return np.linspace(0, n, n_shards + 1).astype(int)
+
+    def _map(self, task: str, table: pd.DataFrame, context: Dict, inputs: Dict[str, np.ndarray],
+             output_shapes: Dict[str, Tuple], extra=None) -> Tuple[Dict[str, np.ndarray], List]:
+        """
+        在 table 的各行分片上执行 task
+
+        Args:
+            task: _TASKS 中的分片函数名
+            table: 按行切分的DataFrame，经 Arrow 共享内存传给子进程
+            context: 在当前进程内执行时使用的分析器
+            inputs: 与 table 行对齐的只读数组，放入共享内存
+            output_shapes: {名称: (每行的形状, dtype)}，各分片写入自己的行区间
+
+        Returns:
+            (输出数组, 各分片返回值列表)
+        """
+        n = len(table)
+        bounds = self._bounds(n)
+        shapes = {name: ((n, *shape), dtype) for name, (shape, dtype) in output_shapes.items()}
+        ranges = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        if len(ranges) == 1 or self.max_workers == 1:
+            outputs = {name: np.zeros(shape, dtype=dtype) for name, (shape, dtype) in shapes.items()}
+            parts = [_TASKS[task](context, table.iloc[start:stop], inputs, outputs, slice(start, stop), extra)
+                     for start, stop in ranges]
+            return outputs, parts
+
+        logger.info(f"分片执行 {task}：{n} 只股票，{len(ranges)} 个分片，{self.max_workers} 个进程")
+        shared_inputs = SharedArrays.create({name: (array.shape, array.dtype.str) for name, array in inputs.items()})
+        shared_outputs = SharedArrays.create(shapes)
+        table_block = None
+        try:
+            for name, array in inputs.items():
+                shared_inputs.arrays[name][...] = array
+            if pa is not None:
+                table_block = _share_table(table)
+            specs = (table_block.name if table_block is not None else None, shared_inputs.specs,
+                     shared_outputs.specs)
+            tasks = [(task, start, stop, extra, specs, None if table_block is not None else table.iloc[start:stop])
+                     for start, stop in ranges]
+            parts = list(self._executor().map(_run_shard, tasks))
+            outputs = {name: array.copy() for name, array in shared_outputs.arrays.items()}
+        finally:
+            shared_inputs.release(unlink=True)
+            shared_outputs.release(unlink=True)
+            if table_block is not None:
+                table_block.close()
+                table_block.unlink()
+        return outputs, parts
+
+    def classify_membership(self, classifier: StockClassifier,
+                            stocks_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """分片并行的 StockClassifier.classify_membership"""
+        # 与 classify_membership 拼接匹配文本的方式相同（f-string），缺失值在两条路径上得到同样的文本
+        columns = [column for column in ('code', 'name', 'industry', 'business') if column in stocks_df.columns]
+        table = pd.DataFrame({column: [f"{value}" for value in stocks_df[column].tolist()] for column in columns})
+        shapes = {'concepts': ((len(classifier.concept_tags),), 'bool'),
+                  'industries': ((len(classifier.industry_tags),), 'bool')}
+        outputs, _ = self._map('membership', table, {'classifier': classifier}, {}, shapes)
+        index = pd.Index(stocks_df['code'].tolist(), name='code') if 'code' in stocks_df.columns else stocks_df.index
+        return (pd.DataFrame(outputs['concepts'], index=index, columns=list(classifier.concept_tags)),
+                pd.DataFrame(outputs['industries'], index=index, columns=list(classifier.industry_tags)))
+
+    def classify_stocks(self, classifier: StockClassifier, date: str, universe: pd.DataFrame) -> pd.DataFrame:
+        """分片并行的 StockClassifier.classify_stocks：有 TagStore 时只有缓存中没有的文本做分片匹配"""
+        return classifier.classify_stocks(date, universe, membership=functools.partial(self.classify_membership,
+                                                                                       classifier))
+
+    def refine_strategies(self, refiner: StrategyRefiner, classifier: StockClassifier, date: str,
+                          market_data: Dict, stock_classification: Optional[pd.DataFrame] = None) -> Dict:
+        """分片并行的 StrategyRefiner.refine_strategies：各分片求归属矩阵，汇总在整个股票池上计算"""
+        market = market_data['market']
+        inputs = {}
+        if stock_classification is not None:
+            positions = pd.Index(stock_classification['stock_code']).get_indexer(market.index)
+            inputs = _tag_bits(classifier, stock_classification, positions)
+        sub_strategies = [refiner.sub_strategies[sub]['name']
+                          for subs in refiner.base_sub_strategies.values() for sub in subs]
+        outputs, _ = self._map('refine', market, {'classifier': classifier, 'refiner': refiner}, inputs,
+                               {'refined': ((len(sub_strategies),), 'bool')},
+                               {'classified': stock_classification is not None})
+        matrix = pd.DataFrame(outputs['refined'], index=market.index, columns=sub_strategies)
+        return {'matrix': matrix, 'summary': refiner.summarize(matrix, market), 'date': str(date)}
+
+    def perform_cross_analysis(self, analyzer: CrossAnalyzer, classifier: StockClassifier,
+                               strategy_refinement: Dict, stock_classification: pd.DataFrame, date: str,
+                               market_data: Optional[Dict] = None, top_n: int = 20) -> Dict:
+        """分片并行的 CrossAnalyzer.perform_cross_analysis：各分片的累加和相加后归一化，三维候选取全局前N"""
+        codes = stock_classification['stock_code'].tolist()
+        table = pd.DataFrame({'stock_code': codes, 'stock_name': stock_classification['stock_name'].tolist()})
+        if market_data is not None and 'industry' in market_data['market'].columns:
+            table['industry'] = market_data['market']['industry'].reindex(codes).tolist()
+        matrix = strategy_refinement['matrix'].reindex(codes, fill_value=False)
+        inputs = _tag_bits(classifier, stock_classification, np.arange(len(codes)))
+        inputs['refined'] = matrix.to_numpy(dtype=bool)
+        _, parts = self._map('cross', table, {'classifier': classifier, 'analyzer': analyzer}, inputs, {},
+                             {'sub_strategies': list(matrix.columns), 'top_n': top_n})
+        return analyzer.merge_cross_partials(parts, date, top_n)
+
+
+def run_stages(classifier: StockClassifier, refiner: StrategyRefiner, analyzer: CrossAnalyzer,
+               universe: pd.DataFrame, market_data: Dict, date: str,
+               runner: Optional[ShardedRunner] = None, top_n: int = 20) -> Dict:
+    """
+    依次执行日报的 标的分类 → 策略细分 → 交叉分析
+
+    Args:
+        runner: 为 None 时调用与 main_enhanced 单进程DAG相同的阶段函数，否则分片并行执行
+
+    Returns:
+        {阶段名: 输出}，阶段名与 main_enhanced 的日报DAG一致
+    """
+    if runner is None:
+        classification = classifier.classify_stocks(date, universe)
+        refinement = refiner.refine_strategies(date, market_data, classification)
+        cross = analyzer.perform_cross_analysis(refinement, classification, date, market_data=market_data,
+                                                top_n=top_n)
+    else:
+        classification = runner.classify_stocks(classifier, date, universe)
+        refinement = runner.refine_strategies(refiner, classifier, date, market_data, classification)
+        cross = runner.perform_cross_analysis(analyzer, classifier, refinement, classification, date,
+                                              market_data, top_n)
+    return {'stock_classification': classification, 'strategy_refinement': refinement, 'cross_analysis': cross}
+
+
+def compare_stage_outputs(expected: Dict, actual: Dict) -> List[str]:
+    """
+    逐阶段比较两次运行的输出（如单进程与分片并行），返回不一致的阶段名，空列表表示完全一致
+    """
+    checks = {
+        'stock_classification': lambda a, b: a.equals(b),
+        'strategy_refinement': lambda a, b: a['matrix'].equals(b['matrix']) and a['summary'] == b['summary'],
+        'cross_analysis': lambda a, b: (a['concept_strategy_matrix'].equals(b['concept_strategy_matrix'])
+                                        and a['industry_strategy_matrix'].equals(b['industry_strategy_matrix'])
+                                        and a['three_d'] == b['three_d']),
+    }
+    return [stage for stage in STAGES
+            if stage in expected and stage in actual and not checks[stage](expected[stage], actual[stage])]
+
+
+def main():
+    """测试函数：合成股票池上对比分片并行与单进程DAG阶段函数的结果"""
+    sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+    from synthetic import synthetic_universe
+
+    parser = argparse.ArgumentParser(description='分片并行执行日报分类/细分/交叉阶段')
+    parser.add_argument('--stocks', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--shards', type=int, default=None)
+    args = parser.parse_args()
+
+    universe = synthetic_universe(args.stocks)
+    rng = np.random.default_rng(0)
+    n = len(universe)
+    market = universe.set_index('code').assign(change_pct=rng.normal(0, 4, n), pe=rng.uniform(3, 80, n),
+                                               pb=rng.uniform(0.5, 8, n), volume_ratio=rng.uniform(0.2, 4, n),
+                                               rsi=rng.uniform(10, 90, n), volatility_30d=rng.uniform(5, 60, n))
+    market_data = {'market': market}
+    date = pd.Timestamp.now().strftime('%Y-%m-%d')
+    classifier, refiner, analyzer = StockClassifier(), StrategyRefiner(), CrossAnalyzer()
+
+    start = time.perf_counter()
+    single = run_stages(classifier, refiner, analyzer, universe, market_data, date)
+    single_s = time.perf_counter() - start
+    with ShardedRunner(n_shards=args.shards, max_workers=args.workers or max(2, os.cpu_count() or 1)) as runner:
+        start = time.perf_counter()
+        sharded = run_stages(classifier, refiner, analyzer, universe, market_data, date, runner=runner)
+        sharded_s = time.perf_counter() - start
+
+    differences = compare_stage_outputs(single, sharded)
+    print(f"{args.stocks} 只  单进程 {single_s:.2f}s  分片并行 {sharded_s:.2f}s  "
+          f"结果一致: {not differences}{'' if not differences else '，不一致的阶段: ' + ', '.join(differences)}")
+
+
+if __name__ == "__main__":
+    main()
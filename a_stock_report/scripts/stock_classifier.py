@@ -9,15 +9,104 @@
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, List, Tuple, Optional
 import logging
 import json
 import os
+import re
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class KeywordMatcher:
+    """
+    多模式关键词匹配器
+    把概念、行业两套标签的全部关键词编译成一个正则（长词优先），每段文本只做一次非重叠扫描，
+    结果与逐个关键词做 `keyword.lower() in text` 完全一致：
+    - 被命中关键词包含的更短关键词，通过预先计算的包含闭包一并计入
+    - 可能跨过命中关键词结尾的关键词（后缀与其前缀重叠），只在这类关键词内部逐位补查
+    """
+
+    def __init__(self, tag_families: Dict[str, Dict[str, List[str]]]):
+        """
+        Args:
+            tag_families: 标签族名称 -> {标签: 关键词列表}，如 {'concept': ..., 'industry': ...}
+        """
+        self.families = {family: list(tags) for family, tags in tag_families.items()}
+
+        # 关键词(小写) -> 各标签族中命中的标签序号
+        keyword_tags: Dict[str, Dict[str, set]] = {}
+        for family, tags in tag_families.items():
+            for tag_idx, keywords in enumerate(tags.values()):
+                for keyword in keywords:
+                    keyword_tags.setdefault(keyword.lower(), {f: set() for f in tag_families})[family].add(tag_idx)
+        keywords = sorted(keyword_tags, key=len, reverse=True)
+
+        def closure(related) -> Dict[str, Dict[str, List[int]]]:
+            return {k: {f: sorted(set().union(*(keyword_tags[w][f] for w in keywords if related(k, w))))
+                        for f in tag_families} for k in keywords}
+
+        # 同一起点上更短的关键词（前缀）；命中区间内出现的全部关键词（子串）
+        self._prefix_closure = closure(lambda k, w: k.startswith(w))
+        self._substring_closure = closure(lambda k, w: w in k)
+        # 从关键词内部开始、越过其结尾的关键词会被非重叠扫描跳过，这类关键词命中后需逐位补查
+        self._straddled = {k for k in keywords
+                           if any(len(w) > len(k) - i and w.startswith(k[i:]) for i in range(1, len(k)) for w in keywords)}
+        self._pattern = re.compile('|'.join(re.escape(k) for k in keywords))
+
+    def membership(self, texts: Iterable[str], offsets: Dict[str, Iterable[int]]) -> Dict[str, np.ndarray]:
+        """
+        批量匹配
+
+        Args:
+            texts: 已转小写的文本
+            offsets: 标签族 -> 每段文本中参与该族匹配的起始位置（起点在此之前的命中不计入该族）
+
+        Returns:
+            标签族 -> (文本数 × 标签数) 的布尔矩阵
+        """
+        texts = list(texts)
+        offsets = {family: list(values) for family, values in offsets.items()}
+        hits = {family: ([], []) for family in self.families}
+        pattern = self._pattern
+
+        for row, text in enumerate(texts):
+            row_offsets = {family: values[row] for family, values in offsets.items()}
+            split = max(row_offsets.values())
+            found = []   # (关键词, 起点, 闭包)
+
+            # 各族起点不同的前段逐位探测，保证每个命中的起点准确
+            for pos in range(min(row_offsets.values()), split):
+                m = pattern.match(text, pos)
+                if m:
+                    found.append((m.group(), pos, self._prefix_closure))
+
+            # 其余部分对所有族都有效，一次非重叠扫描
+            for m in pattern.finditer(text, split):
+                keyword = m.group()
+                found.append((keyword, m.start(), self._substring_closure))
+                if keyword in self._straddled:
+                    for pos in range(m.start() + 1, m.end()):
+                        inner = pattern.match(text, pos)
+                        if inner and inner.end() > m.end():
+                            found.append((inner.group(), pos, self._substring_closure))
+
+            for keyword, pos, closure in found:
+                for family, (rows, cols) in hits.items():
+                    tag_indices = closure[keyword][family]
+                    if tag_indices and pos >= row_offsets[family]:
+                        rows.extend([row] * len(tag_indices))
+                        cols.extend(tag_indices)
+
+        result = {}
+        for family, (rows, cols) in hits.items():
+            matrix = np.zeros((len(texts), len(self.families[family])), dtype=bool)
+            matrix[rows, cols] = True
+            result[family] = matrix
+        return result
+
+
 class StockClassifier:
     """
     股票分类器类
@@ -27,11 +116,19 @@ class StockClassifier:
     3. 策略匹配度评估
     """
     
-    def __init__(self):
-        """初始化分类器"""
+    def __init__(self, tag_store=None):
+        """
+        初始化分类器
+        
+        Args:
+            tag_store: 可选的 TagStore，批量分类时只对文本有变化的股票做关键词匹配
+        """
+        self.tag_store = tag_store
         self.concept_tags = self._load_concept_tags()
         self.industry_tags = self._load_industry_tags()
         self.strategy_mapping = self._load_strategy_mapping()
+        self.keyword_matcher = KeywordMatcher({'concept': self.concept_tags, 'industry': self.industry_tags})
+        self.strategy_weights = self._build_strategy_weight_matrix()
         
     def _load_concept_tags(self) -> Dict[str, List[str]]:
         """
@@ -274,6 +371,20 @@ class StockClassifier:
         }
         return strategy_mapping
     
+    def _build_strategy_weight_matrix(self) -> np.ndarray:
+        """
+        把策略匹配映射编译成稠密权重矩阵
+        返回：(概念数 + 行业数) × 策略数 的矩阵，行顺序为全部概念标签后接全部行业标签；
+             同名的概念和行业（如"银行"）各占一行、权重相同，未出现在映射中的为0
+        """
+        tags = list(self.concept_tags) + list(self.industry_tags)
+        strategies = list(self.strategy_mapping)
+        weights = np.zeros((len(tags), len(strategies)), dtype=np.float64)
+        for col, strategy in enumerate(strategies):
+            for row, tag in enumerate(tags):
+                weights[row, col] = self.strategy_mapping[strategy].get(tag, 0.0)
+        return weights
+    
     def classify_stock_concepts(self, stock_info: Dict[str, str]) -> List[str]:
         """
         对单只股票进行概念分类
@@ -346,45 +457,157 @@ class StockClassifier:
         
         return max_score
     
-    def classify_stocks_batch(self, stocks_df: pd.DataFrame) -> pd.DataFrame:
+    def classify_membership(self, stocks_df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        批量计算概念/行业归属矩阵
+
+        概念匹配文本为 "名称 行业 主营"，行业匹配文本为 "行业 主营"，后者恰是前者的后缀，
+        因此每只股票只扫描一次：名称部分之后的命中同时计入行业。
+
+        Args:
+            stocks_df: 股票数据DataFrame，包含'name', 'industry', 'business'等列
+
+        Returns:
+            (概念归属矩阵, 行业归属矩阵)，均为以股票代码为索引的布尔DataFrame
+        """
+        def column(name: str) -> List:
+            return stocks_df[name].tolist() if name in stocks_df.columns else [''] * len(stocks_df)
+
+        names = [f"{name}".lower() for name in column('name')]
+        suffixes = [f"{industry} {business}".lower() for industry, business in zip(column('industry'), column('business'))]
+        texts = [f"{name} {suffix}" for name, suffix in zip(names, suffixes)]
+        membership = self.keyword_matcher.membership(
+            texts, {'concept': [0] * len(texts), 'industry': [len(name) + 1 for name in names]}
+        )
+
+        index = pd.Index(column('code'), name='code') if 'code' in stocks_df.columns else stocks_df.index
+        concept_matrix = pd.DataFrame(membership['concept'], index=index, columns=list(self.concept_tags))
+        industry_matrix = pd.DataFrame(membership['industry'], index=index, columns=list(self.industry_tags))
+        return concept_matrix, industry_matrix
+
+    def score_strategies(self,
+                         concept_matrix: pd.DataFrame,
+                         industry_matrix: pd.DataFrame,
+                         dtype=np.float32,
+                         chunk_size: int = 8192) -> pd.DataFrame:
+        """
+        全市场策略匹配度：对 股票×标签 归属矩阵与 标签×策略 权重矩阵做按行最大值归约
+        结果与逐只调用 calculate_strategy_match_score 相同
+        
+        Args:
+            concept_matrix: classify_membership 返回的概念归属矩阵
+            industry_matrix: classify_membership 返回的行业归属矩阵
+            dtype: 结果精度，默认float32
+            chunk_size: 每批处理的股票数，限制 股票×标签×策略 中间数组的内存
+            
+        Returns:
+            以股票代码为索引、策略名称为列的匹配度DataFrame
+        """
+        membership = np.hstack([concept_matrix.to_numpy(dtype=bool), industry_matrix.to_numpy(dtype=bool)])
+        weights = self.strategy_weights.astype(dtype)
+        scores = np.zeros((len(membership), weights.shape[1]), dtype=dtype)
+        for start in range(0, len(membership), chunk_size):
+            block = membership[start:start + chunk_size]
+            scores[start:start + chunk_size] = np.max(block[:, :, None] * weights[None, :, :], axis=1, initial=0)
+        return pd.DataFrame(scores, index=concept_matrix.index, columns=list(self.strategy_mapping))
+    
+    def classify_stocks_batch(self, stocks_df: pd.DataFrame, membership=None) -> pd.DataFrame:
         """
         批量分类股票
         
         Args:
             stocks_df: 股票数据DataFrame，包含'name', 'industry', 'business'等列
+            membership: 可选的关键词匹配函数，签名同 classify_membership（如分片并行的版本）；
+                有 TagStore 时只用于缓存中没有的文本
             
         Returns:
             带有分类标签和策略匹配度的DataFrame
         """
-        results = []
-        
-        for idx, row in stocks_df.iterrows():
-            stock_info = row.to_dict()
-            
-            # 概念分类
-            concepts = self.classify_stock_concepts(stock_info)
-            
-            # 行业分类
-            industries = self.classify_stock_industry(stock_info)
-            
-            # 计算各策略匹配度
-            strategy_scores = {}
-            all_strategies = list(self.strategy_mapping.keys())
-            for strategy in all_strategies:
-                score = self.calculate_strategy_match_score(concepts, industries, strategy)
-                strategy_scores[strategy] = score
-            
-            result_row = {
-                'stock_code': row.get('code', ''),
-                'stock_name': row.get('name', ''),
-                'concepts': concepts,
-                'industries': industries,
-                **strategy_scores
-            }
-            results.append(result_row)
+        if self.tag_store is not None:
+            concept_matrix, industry_matrix = self.tag_store.membership(stocks_df, self, classify=membership)
+        else:
+            concept_matrix, industry_matrix = (membership or self.classify_membership)(stocks_df)
+        codes = stocks_df['code'].tolist() if 'code' in stocks_df.columns else [''] * len(stocks_df)
+        names = stocks_df['name'].tolist() if 'name' in stocks_df.columns else [''] * len(stocks_df)
+        return self.classification_frame(codes, names, concept_matrix, industry_matrix)
+
+    def classification_frame(self, codes: List, names: List,
+                             concept_matrix: pd.DataFrame, industry_matrix: pd.DataFrame) -> pd.DataFrame:
+        """
+        由概念/行业归属矩阵构建 classify_stocks_batch 格式的分类结果，策略匹配度由归属矩阵计算
+
+        Args:
+            codes: 股票代码，与归属矩阵行顺序一致
+            names: 股票名称
+            concept_matrix: 概念归属矩阵（列为概念标签）
+            industry_matrix: 行业归属矩阵（列为行业标签）
+        """
+        strategy_scores = self.score_strategies(concept_matrix, industry_matrix, dtype=np.float64)
+        concept_names = np.array(concept_matrix.columns, dtype=object)
+        industry_names = np.array(industry_matrix.columns, dtype=object)
+        concept_rows = concept_matrix.to_numpy()
+        industry_rows = industry_matrix.to_numpy()
         
-        return pd.DataFrame(results)
+        result = pd.DataFrame({
+            'stock_code': list(codes),
+            'stock_name': list(names),
+            'concepts': [concept_names[row].tolist() for row in concept_rows],
+            'industries': [industry_names[row].tolist() for row in industry_rows],
+        })
+        for strategy in strategy_scores.columns:
+            result[strategy] = strategy_scores[strategy].to_numpy()
+        return result
     
+    def classify_stocks(self, date: str, universe: pd.DataFrame, membership=None) -> pd.DataFrame:
+        """
+        日报标的分类：对股票池批量打标签并计算策略匹配度
+
+        Args:
+            date: 报告日期，格式 YYYY-MM-DD（标签只取决于股票文本，日期仅用于日志）
+            universe: 股票池DataFrame，包含'code', 'name', 'industry', 'business'列
+            membership: 可选的关键词匹配函数，见 classify_stocks_batch
+
+        Returns:
+            classify_stocks_batch 的结果
+        """
+        classified = self.classify_stocks_batch(universe, membership)
+        tagged = int((classified['concepts'].str.len() > 0).sum())
+        logger.info(f"{date} 标的分类完成: {len(classified)}只股票，{tagged}只命中概念标签")
+        return classified
+
+    def get_stock_details(self, stock_code: str, date: str, universe: pd.DataFrame,
+                          stock_name: Optional[str] = None) -> Dict:
+        """
+        个股分类详情
+
+        Args:
+            stock_code: 带交易所前缀的股票代码，如 sh688031
+            date: 报告日期，格式 YYYY-MM-DD
+            universe: 股票池DataFrame；股票不在池中时只按名称匹配标签
+            stock_name: 股票名称，股票不在池中时使用
+
+        Returns:
+            {'code', 'name', 'industry', 'business', 'concepts', 'industries', 'strategy_scores', 'date'}，
+            strategy_scores 为按匹配度降序的 {策略: 匹配度}
+        """
+        rows = universe[universe['code'] == stock_code]
+        if rows.empty:
+            logger.warning(f"{stock_code} 不在股票池中，仅按名称匹配标签")
+            rows = pd.DataFrame([{'code': stock_code, 'name': stock_name or '', 'industry': '', 'business': ''}])
+        info = rows.iloc[0].to_dict()
+        classified = self.classify_stocks_batch(rows.head(1)).iloc[0]
+        scores = {strategy: float(classified[strategy]) for strategy in self.strategy_mapping}
+        return {
+            'code': stock_code,
+            'name': info.get('name') or stock_name or '',
+            'industry': info.get('industry', ''),
+            'business': info.get('business', ''),
+            'concepts': list(classified['concepts']),
+            'industries': list(classified['industries']),
+            'strategy_scores': dict(sorted(scores.items(), key=lambda item: item[1], reverse=True)),
+            'date': date,
+        }
+
     def get_top_stocks_by_strategy(self, classified_stocks_df: pd.DataFrame, strategy: str, top_n: int = 20) -> pd.DataFrame:
         """
         获取特定策略下匹配度最高的股票
@@ -5,8 +5,39 @@
 将5大基础策略细分为15+子策略，提供更精准的投资指导
 """
 
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.backtest import load_win_rates
+from scripts.indicators import compute_indicators, stack_bars
+from scripts.rule_engine import RuleEngine
+
+# 备用规则：配置条件用到的字段（如 us_correlation、roe、dividend_yield）在输入中不存在时按这些条件求值，
+# 条件字典内为与、字典之间为或。只使用日报流程有数据来源的列（rule_engine.PRODUCED_COLUMNS）：
+# 财务指标用估值近似——ROE = PB / PE，PE 10-20 且 PB>=3 即 ROE>=15%；高股息股以低估值、低Beta近似
+FALLBACK_RULES = {
+    'strong_momentum': [{'change_pct': '>7'}],
+    'reversal_momentum': [{'change_pct': '<-5'}],
+    'deep_value': [{'pe': '<15', 'pb': '<1.5'}],
+    'reasonable_value': [{'pe': '15-30'}],
+    'quality_value': [{'pe': '10-20', 'pb': '>=3'}],
+    'anti_decline_defensive': [{'change_pct': '-1-1'}],
+    'stable_defensive': [{'volatility_30d': '<=15'}],
+    'dividend_defensive': [{'pe': '<12', 'beta': '<0.8'}],
+    'defense_mapping': [{'sector': '国防军工'}, {'concepts': ['军工']}],
+    'ai_chip_mapping': [{'sector': '半导体', 'concepts': ['AI芯片']}],
+    'new_energy_mapping': [{'sector': '电力设备', 'concepts': ['新能源']}],
+    'consumer_electronics_mapping': [{'sector': '电子', 'concepts': ['消费电子']}],
+    'biopharma_mapping': [{'sector': '医药生物', 'concepts': ['创新药']}],
+}
+
 class StrategyRefiner:
-    def __init__(self):
+    def __init__(self, config_path=None, win_rates_path=None):
         # 基础策略配置
         self.base_strategies = {
             'momentum': '动量策略',
@@ -123,6 +154,27 @@ class StrategyRefiner:
                 'historical_win_rate': 0.52
             }
         }
+        
+        # 有回测结果时，用回测得到的胜率替换上面的内置常量
+        backtest_win_rates = load_win_rates(win_rates_path)
+        for info in self.sub_strategies.values():
+            win_rate = backtest_win_rates.get(info['name'])
+            if win_rate is not None:
+                info['historical_win_rate'] = win_rate
+        
+        # 筛选条件由配置文件中的 filter_criteria 编译而来，配置与本类的子策略按中文名称对应；
+        # 配置条件的字段在输入中缺失时改用 FALLBACK_RULES
+        fallbacks = {self.sub_strategies[sub]['name']: groups for sub, groups in FALLBACK_RULES.items()}
+        self.rule_engine = RuleEngine(config_path, fallbacks=fallbacks)
+        self.rule_keys = {}
+        for sub_strategy, info in self.sub_strategies.items():
+            rule_key = self.rule_engine.find_by_name(info['name'])
+            if rule_key is not None:
+                self.rule_keys[sub_strategy] = rule_key
+        self.base_sub_strategies = {
+            base_strategy: [sub for sub, rule_key in self.rule_keys.items() if rule_key in rule_subs]
+            for base_strategy, rule_subs in self.rule_engine.base_strategies.items()
+        }
     
     def refine_strategy(self, base_strategy, stock_data):
         """
@@ -135,58 +187,111 @@ class StrategyRefiner:
         Returns:
             list: 匹配的子策略列表
         """
-        matched_sub_strategies = []
+        sub_strategies = self.base_sub_strategies.get(base_strategy, [])
+        if not sub_strategies:
+            return []
         
-        if base_strategy == 'momentum':
-            # 动量策略细分逻辑
-            if stock_data.get('change_pct', 0) > 7.0:
-                matched_sub_strategies.append('strong_momentum')
-            elif stock_data.get('change_pct', 0) < -5.0:
-                matched_sub_strategies.append('reversal_momentum')
-            # 这里可以添加更多技术形态判断逻辑
-            
-        elif base_strategy == 'value':
-            # 价值策略细分逻辑
-            pe = stock_data.get('pe', float('inf'))
-            roe = stock_data.get('roe', 0)
-            
-            if pe < 15.0 and roe >= 8.0:
-                matched_sub_strategies.append('deep_value')
-            elif 15.0 <= pe <= 30.0 and roe >= 10.0:
-                matched_sub_strategies.append('reasonable_value')
-            elif roe >= 15.0 and pe >= 10.0:
-                matched_sub_strategies.append('quality_value')
-                
-        elif base_strategy == 'defensive':
-            # 防御策略细分逻辑
-            decline_pct = abs(stock_data.get('change_pct', 0))
-            dividend_yield = stock_data.get('dividend_yield', 0)
-            volatility = stock_data.get('volatility', float('inf'))
-            
-            if decline_pct < 1.0:
-                matched_sub_strategies.append('anti_decline_defensive')
-            if dividend_yield >= 3.0:
-                matched_sub_strategies.append('dividend_defensive')
-            if volatility <= 0.15:
-                matched_sub_strategies.append('stable_defensive')
-                
-        elif base_strategy == 'us_market_mapping':
-            # 美股映射策略细分逻辑
-            sector = stock_data.get('sector', '')
-            concepts = stock_data.get('concepts', [])
+        # 单只股票按一行DataFrame交给规则引擎求值，与全市场批量求值使用同一套条件
+        matched = self.rule_engine.evaluate(pd.DataFrame([stock_data]),
+                                            [self.rule_keys[sub] for sub in sub_strategies]).iloc[0]
+        return [sub for sub in sub_strategies if matched[self.rule_keys[sub]]]
+    
+    def refine_universe(self, market_df, base_strategies=None, packed=False, use_names=False,
+                        bars=None, benchmark=None):
+        """
+        一次性对全市场求出 股票×子策略 归属矩阵
+        
+        Args:
+            market_df (pd.DataFrame): 全市场行情/财务数据，每行一只股票
+            base_strategies (list): 只包含这些基础策略下的子策略，默认全部
+            packed (bool): 为True时按位压缩，每只股票每8个子策略占1字节
+            use_names (bool): 列名使用子策略中文名称（与 StockClassifier/CrossAnalyzer 的策略名一致）
+            bars: 可选的K线（Ashare.get_price_many 的返回值，代码与market_df索引一致），
+                  提供时计算 rsi/volatility_30d/resistance_break/volume_spike/beta 等技术指标补入缺失的列
+            benchmark (pd.Series): 计算Beta用的基准收盘价
             
-            if '国防军工' in sector or '军工' in concepts:
-                matched_sub_strategies.append('defense_mapping')
-            if '半导体' in sector and 'AI芯片' in concepts:
-                matched_sub_strategies.append('ai_chip_mapping')
-            if '电力设备' in sector and '新能源' in concepts:
-                matched_sub_strategies.append('new_energy_mapping')
-            if '电子' in sector and '消费电子' in concepts:
-                matched_sub_strategies.append('consumer_electronics_mapping')
-            if '医药生物' in sector and '创新药' in concepts:
-                matched_sub_strategies.append('biopharma_mapping')
+        Returns:
+            packed=False: 与market_df同索引的布尔DataFrame
+            packed=True: (np.packbits 压缩后的uint8矩阵, 子策略列表)，可用 unpack_universe 还原
+        """
+        if base_strategies is None:
+            base_strategies = list(self.base_sub_strategies)
+        sub_strategies = [sub for base in base_strategies for sub in self.base_sub_strategies.get(base, [])]
         
-        return matched_sub_strategies
+        if bars is not None:
+            indicators = compute_indicators(stack_bars(bars), benchmark)
+            missing = [column for column in indicators.columns if column not in market_df.columns]
+            market_df = market_df.join(indicators[missing])
+        
+        matrix = self.rule_engine.evaluate(market_df, [self.rule_keys[sub] for sub in sub_strategies])
+        matrix.columns = [self.sub_strategies[sub]['name'] for sub in sub_strategies] if use_names else sub_strategies
+        if packed:
+            return np.packbits(matrix.to_numpy(), axis=1), list(matrix.columns)
+        return matrix
+    
+    def refine_strategies(self, date, market_data, stock_classification=None):
+        """
+        日报策略细分：对股票池求出 股票×子策略 归属矩阵，并按基础策略汇总各子策略当日的表现
+
+        Args:
+            date (str): 报告日期，格式 YYYY-MM-DD
+            market_data (dict): market_data.fetch_market_data 的返回值
+            stock_classification (pd.DataFrame): StockClassifier.classify_stocks 的结果，
+                为映射类子策略补充概念标签
+
+        Returns:
+            dict: {'matrix': 以股票代码为索引、子策略中文名为列的布尔归属矩阵,
+                   'summary': {基础策略名: {子策略名: {'matched': 命中股票数, 'marginal_change': 命中股票平均涨跌幅}}},
+                   'date': 报告日期}
+        """
+        matrix = self.refine_matrix(market_data, stock_classification)
+        return {'matrix': matrix, 'summary': self.summarize(matrix, market_data['market']), 'date': str(date)}
+
+    def refine_matrix(self, market_data, stock_classification=None):
+        """
+        refine_strategies 的归属矩阵部分，逐股独立求值，可对股票池的任意分片分别计算后按行拼接
+
+        Returns:
+            pd.DataFrame: 以股票代码为索引、子策略中文名为列的布尔归属矩阵
+        """
+        market = market_data['market']
+        if stock_classification is not None:
+            tags = stock_classification.set_index('stock_code')[['concepts', 'industries']]
+            market = market.join(tags[tags.columns.difference(market.columns)])
+        return self.refine_universe(market, use_names=True)
+
+    def summarize(self, matrix, market):
+        """
+        按基础策略汇总归属矩阵：各子策略命中股票数与命中股票的平均涨跌幅
+
+        Args:
+            matrix (pd.DataFrame): refine_matrix 的结果（整个股票池）
+            market (pd.DataFrame): 与 matrix 同索引的行情表，提供 change_pct 列
+        """
+        if 'change_pct' in market.columns:
+            change = market['change_pct'].to_numpy(dtype=np.float64)
+        else:
+            change = np.full(len(market), np.nan)
+        summary = {}
+        for base_strategy, sub_strategies in self.base_sub_strategies.items():
+            base_name = self.base_strategies.get(base_strategy, base_strategy)
+            summary[base_name] = {}
+            for sub in sub_strategies:
+                name = self.sub_strategies[sub]['name']
+                hits = matrix[name].to_numpy(dtype=bool)
+                moves = change[hits]
+                moves = moves[np.isfinite(moves)]
+                summary[base_name][name] = {
+                    'matched': int(hits.sum()),
+                    'marginal_change': round(float(moves.mean()), 2) if len(moves) else 0.0,
+                }
+        return summary
+
+    @staticmethod
+    def unpack_universe(bits, sub_strategies, index=None):
+        """把 refine_universe(packed=True) 的结果还原为布尔DataFrame"""
+        matrix = np.unpackbits(bits, axis=1, count=len(sub_strategies)).astype(bool)
+        return pd.DataFrame(matrix, index=index, columns=sub_strategies)
     
     def get_sub_strategy_info(self, sub_strategy_name):
         """获取子策略详细信息"""
@@ -210,10 +315,16 @@ if __name__ == "__main__":
     print(f"共定义 {len(refiner.get_all_sub_strategies())} 个子策略")
     
     # 测试动量策略细分
-    test_stock = {'change_pct': 8.5, 'pe': 25, 'roe': 12}
+    test_stock = {'change_pct': 8.5, 'volume_ratio': 2.0, 'pe': 25, 'roe': 12}
     momentum_subs = refiner.refine_strategy('momentum', test_stock)
     print(f"动量策略测试结果: {momentum_subs}")
     
+    # 测试全市场批量细分
+    market = pd.DataFrame([test_stock, {'change_pct': -6.0, 'rsi': 25, 'pe': 12, 'pb': 1.2, 'dividend_yield': 4.0}],
+                          index=['600519', '000001'])
+    print("全市场子策略归属矩阵:")
+    print(refiner.refine_universe(market, use_names=True).T)
+    
     # 显示所有子策略胜率
     win_rates = refiner.get_sub_strategy_win_rates()
     print("\n子策略历史胜率:")
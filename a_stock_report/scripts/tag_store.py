@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标签缓存 - A股深度优化日报系统v2.0.0
+功能：概念/行业标签只取决于股票的 名称/行业/主营 文本和标签词典，
+     按 文本内容哈希 持久化每只股票的标签归属，词典哈希变化时整体失效；
+     每日运行只对新上市或文本有变化的股票做关键词匹配
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.artifact_store import fingerprint
+
+# 配置日志
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TAG_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'data', 'tag_store')
+
+# 文本字段的分隔符，避免 ("ab", "c") 与 ("a", "bc") 拼接后相同
+_SEPARATOR = '\x1f'
+
+
+def text_hashes(stocks_df: pd.DataFrame) -> np.ndarray:
+    """
+    每只股票分类文本（名称、行业、主营）的64位内容哈希
+
+    取值方式与 StockClassifier.classify_membership 相同，缺失的列按空串处理
+    """
+    def column(name: str) -> List:
+        return stocks_df[name].tolist() if name in stocks_df.columns else [''] * len(stocks_df)
+
+    texts = [f"{name}{_SEPARATOR}{industry}{_SEPARATOR}{business}"
+             for name, industry, business in zip(column('name'), column('industry'), column('business'))]
+    return pd.util.hash_array(np.array(texts, dtype=object))
+
+
+class TagStore:
+    """
+    以文本哈希为键的标签归属缓存
+
+    - 表：文本哈希 -> 各概念/行业标签是否命中 + 最近一次出现的日期
+    - 元数据：标签词典哈希与标签列顺序，词典变化时整表重建
+    - 长期未出现的文本（退市、改名前的旧文本）在保存时清理
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age_days: int = 90, autosave: bool = True):
+        """
+        Args:
+            path: 缓存目录，默认 a_stock_report/data/tag_store
+            max_age_days: 超过该天数未出现的文本在保存时删除
+            autosave: membership 有新增或更新时自动写盘
+        """
+        self.path = path or DEFAULT_TAG_STORE_DIR
+        self.max_age_days = max_age_days
+        self.autosave = autosave
+        self.stats = {'reused': 0, 'classified': 0, 'rebuilds': 0}
+        self._dirty = False
+        # 日报与个股案例分析可能在不同线程中同时分类
+        self._lock = threading.RLock()
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+
+    @property
+    def _table_path(self) -> str:
+        return os.path.join(self.path, 'tags.npz')
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, 'meta.json')
+
+    def _reset(self, dictionary_hash: Optional[str], concepts: List[str], industries: List[str]):
+        self.dictionary_hash = dictionary_hash
+        self.concepts = list(concepts)
+        self.industries = list(industries)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.bits = np.zeros((0, len(self.concepts) + len(self.industries)), dtype=bool)
+        self.last_seen = np.empty(0, dtype='datetime64[D]')
+
+    def _load(self):
+        self._reset(None, [], [])
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            table = np.load(self._table_path)
+        except (OSError, ValueError, EOFError) as e:
+            if os.path.exists(self._meta_path):
+                logger.warning(f"标签缓存读取失败，将重新分类: {e}")
+            return
+        self._reset(meta['dictionary_hash'], meta['concepts'], meta['industries'])
+        self.hashes = table['hashes']
+        self.bits = np.unpackbits(table['bits'], axis=1, count=len(self.concepts) + len(self.industries)).astype(bool)
+        self.last_seen = table['last_seen']
+
+    def save(self):
+        """清理过期文本后写盘（先写临时文件再替换）"""
+        with self._lock:
+            if self.max_age_days is not None and len(self.hashes):
+                cutoff = np.datetime64(datetime.now().date() - timedelta(days=self.max_age_days), 'D')
+                keep = self.last_seen >= cutoff
+                self.hashes, self.bits, self.last_seen = self.hashes[keep], self.bits[keep], self.last_seen[keep]
+
+            tmp = self._table_path + '.tmp.npz'
+            np.savez(tmp, hashes=self.hashes, bits=np.packbits(self.bits, axis=1), last_seen=self.last_seen)
+            os.replace(tmp, self._table_path)
+            meta = {
+                'dictionary_hash': self.dictionary_hash,
+                'concepts': self.concepts,
+                'industries': self.industries,
+                'entries': int(len(self.hashes)),
+                'updated_at': datetime.now().isoformat(timespec='seconds'),
+            }
+            with open(self._meta_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.replace(self._meta_path + '.tmp', self._meta_path)
+            self._dirty = False
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def membership(self, stocks_df: pd.DataFrame, classifier, classify=None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        与 StockClassifier.classify_membership 返回相同的归属矩阵，只对缓存中没有的文本做匹配
+
+        Args:
+            stocks_df: 股票数据DataFrame，包含'name', 'industry', 'business'等列
+            classifier: StockClassifier，提供标签词典与 classify_membership
+            classify: 对缓存中没有的文本做匹配的函数，默认 classifier.classify_membership（可传入分片并行的版本）
+
+        Returns:
+            (概念归属矩阵, 行业归属矩阵)，均为以股票代码为索引的布尔DataFrame
+        """
+        with self._lock:
+            dictionary_hash = fingerprint(classifier.concept_tags, classifier.industry_tags)
+            if dictionary_hash != self.dictionary_hash:
+                if self.dictionary_hash is not None:
+                    logger.info("标签词典已变化，标签缓存整体重建")
+                    self.stats['rebuilds'] += 1
+                self._reset(dictionary_hash, list(classifier.concept_tags), list(classifier.industry_tags))
+                self._dirty = True
+
+            hashes = text_hashes(stocks_df)
+            positions = pd.Index(self.hashes).get_indexer(hashes)
+            missing = positions < 0
+            if missing.any():
+                new_hashes, first = np.unique(hashes[missing], return_index=True)
+                rows = np.flatnonzero(missing)[first]
+                classify = classify or classifier.classify_membership
+                concept_matrix, industry_matrix = classify(stocks_df.iloc[rows])
+                new_bits = np.hstack([concept_matrix.to_numpy(dtype=bool), industry_matrix.to_numpy(dtype=bool)])
+                self.hashes = np.concatenate([self.hashes, new_hashes])
+                self.bits = np.vstack([self.bits, new_bits])
+                unseen = np.full(len(new_hashes), np.datetime64('NaT'), dtype='datetime64[D]')
+                self.last_seen = np.concatenate([self.last_seen, unseen])
+                positions = pd.Index(self.hashes).get_indexer(hashes)
+                self._dirty = True
+            self.stats['classified'] += int(missing.sum())
+            self.stats['reused'] += int(len(hashes) - missing.sum())
+
+            today = np.datetime64(datetime.now().date(), 'D')
+            if (self.last_seen[positions] != today).any():
+                self.last_seen[positions] = today
+                self._dirty = True
+            # 写盘时会清理过期文本，行号随之变化，先取出本次的归属
+            bits = self.bits[positions]
+            concepts, industries = self.concepts, self.industries
+            if self.autosave and self._dirty:
+                self.save()
+
+        logger.info(f"标签缓存: {len(hashes) - int(missing.sum())} 只复用，{int(missing.sum())} 只重新分类")
+        index = pd.Index(stocks_df['code'].tolist(), name='code') if 'code' in stocks_df.columns else stocks_df.index
+        n_concepts = len(concepts)
+        return (pd.DataFrame(bits[:, :n_concepts], index=index, columns=concepts),
+                pd.DataFrame(bits[:, n_concepts:], index=index, columns=industries))
+
+
+def main():
+    """测试函数"""
+    import tempfile
+    from scripts.stock_classifier import StockClassifier
+
+    classifier = StockClassifier()
+    store = TagStore(tempfile.mkdtemp())
+    stocks = pd.DataFrame([
+        {'code': '600519', 'name': '贵州茅台', 'industry': '食品饮料', 'business': '白酒生产销售'},
+        {'code': '002475', 'name': '立讯精密', 'industry': '电子', 'business': '消费电子、AI服务器、汽车电子'},
+        {'code': '688981', 'name': '中芯国际', 'industry': '半导体', 'business': '集成电路制造、AI芯片代工'},
+    ])
+    store.membership(stocks, classifier)
+
+    # 次日：一只股票主营变化、一只新上市
+    stocks.loc[0, 'business'] = '白酒生产销售、数字化营销'
+    stocks.loc[3] = {'code': '688031', 'name': '星环科技', 'industry': '计算机', 'business': '大数据、AI平台'}
+    concept_matrix, industry_matrix = TagStore(store.path).membership(stocks, classifier)
+    print(pd.DataFrame({'concepts': concept_matrix.apply(lambda row: list(row.index[row]), axis=1),
+                        'industries': industry_matrix.apply(lambda row: list(row.index[row]), axis=1)}))
+
+
+if __name__ == "__main__":
+    main()
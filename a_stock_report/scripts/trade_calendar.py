@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+交易日历 - A股深度优化日报系统v2.0.0
+功能：读取 config/trade_calendar.yaml 中的沪深交易所休市安排，离线判断交易日、
+     计算任意区间内的K线根数，供 Ashare 按结束日期精确取数、KlineStore 判断缓存是否已取全
+"""
+
+import logging
+import os
+import sys
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import yaml
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 不在导入时配置根日志：Ashare 会按需加载本模块，日志配置留给调用方（见 main）
+logger = logging.getLogger(__name__)
+
+DEFAULT_CALENDAR_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     'config', 'trade_calendar.yaml')
+
+# 日内周期 -> 每个交易日的K线数量（9:30-11:30、13:00-15:00 共240分钟）
+BARS_PER_DAY = {'1m': 240, '5m': 48, '15m': 16, '30m': 8, '60m': 4}
+
+
+def _day(value) -> np.datetime64:
+    """日期、字符串、datetime、Timestamp 统一转为 datetime64[D]"""
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+class TradeCalendar:
+    """
+    沪深交易所交易日历
+
+    交易日 = 周一至周五且不在休市日列表中；覆盖年份之外只排除周末并记录一次警告
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: 日历数据文件路径，默认 config/trade_calendar.yaml
+        """
+        self.path = path or DEFAULT_CALENDAR_PATH
+        with open(self.path, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+
+        days = []
+        for entries in (config.get('holidays') or {}).values():
+            for entry in entries:
+                days.extend(entry if isinstance(entry, list) else [entry])
+        self.holidays = np.array(sorted({_day(d) for d in days}), dtype='datetime64[D]')
+        self.first_year = int(config.get('first_year', min((int(str(d)[:4]) for d in self.holidays), default=0)))
+        self.last_year = int(config.get('last_year', max((int(str(d)[:4]) for d in self.holidays), default=0)))
+        self._busdaycal = np.busdaycalendar(weekmask='1111100', holidays=self.holidays)
+        self._warned = False
+        logger.debug(f"交易日历已加载: {self.first_year}-{self.last_year}年, {len(self.holidays)}个休市日")
+        if pd.Timestamp.now().year > self.last_year:
+            logger.warning(f"交易日历只覆盖到{self.last_year}年，{self.last_year + 1}年起的节假日休市不会被排除，"
+                           f"K线根数与交易日判断可能偏多，请在 {self.path} 中补充休市安排")
+
+    def covers(self, day) -> bool:
+        """日期是否在休市安排的覆盖年份内"""
+        return self.first_year <= pd.Timestamp(day).year <= self.last_year
+
+    def _check(self, *days):
+        outside = [d for d in days if not self.covers(d)]
+        if outside and not self._warned:
+            logger.warning(f"日期 {pd.Timestamp(outside[0]).date()} 超出交易日历覆盖范围"
+                           f"({self.first_year}-{self.last_year}年)，该年节假日休市不会被排除，只按周末计算，"
+                           f"请在 {self.path} 中补充休市安排")
+            self._warned = True
+
+    def is_trading_day(self, day) -> bool:
+        self._check(day)
+        return bool(np.is_busday(_day(day), busdaycal=self._busdaycal))
+
+    def previous_trading_day(self, day) -> pd.Timestamp:
+        """day 当天（若为交易日）或之前最近的交易日"""
+        self._check(day)
+        return pd.Timestamp(np.busday_offset(_day(day), 0, roll='backward', busdaycal=self._busdaycal))
+
+    def trading_days_between(self, start, stop) -> int:
+        """(start, stop] 区间内的交易日数，stop 不晚于 start 时为0"""
+        self._check(start, stop)
+        begin, end = _day(start) + 1, _day(stop) + 1
+        return int(np.busday_count(begin, end, busdaycal=self._busdaycal)) if end > begin else 0
+
+    def sessions(self, start, stop) -> pd.DatetimeIndex:
+        """(start, stop] 区间内的全部交易日"""
+        self._check(start, stop)
+        days = np.arange(_day(start) + 1, _day(stop) + 1, dtype='datetime64[D]')
+        return pd.DatetimeIndex(days[np.is_busday(days, busdaycal=self._busdaycal)])
+
+    def bars_between(self, start, stop, frequency: str) -> int:
+        """
+        (start, stop] 区间内的K线根数
+
+        日线按交易日计；分钟线按交易日 × 每日根数计（不含 start 当日剩余的K线）；
+        周线/月线按包含交易日的自然周/月计，stop 所在的未完结周期也算一根
+
+        Args:
+            start: 起点（不含）
+            stop: 终点（含）
+            frequency: 周期，'1m'...'60m'、'1d'、'1w'、'1M'
+        """
+        if frequency in ('1w', '1M'):
+            days = self.sessions(start, stop)
+            return int(days.to_period('W' if frequency == '1w' else 'M').nunique()) if len(days) else 0
+        return self.trading_days_between(start, stop) * BARS_PER_DAY.get(frequency, 1)
+
+
+@lru_cache(maxsize=None)
+def get_calendar(path: Optional[str] = None) -> TradeCalendar:
+    """进程内共享的交易日历实例"""
+    return TradeCalendar(path)
+
+
+def main():
+    """测试函数"""
+    logging.basicConfig(level=logging.INFO)
+    calendar = get_calendar()
+    print('2025-10-08 是否交易日:', calendar.is_trading_day('2025-10-08'))
+    print('2025-10-09 是否交易日:', calendar.is_trading_day('2025-10-09'))
+    print('国庆前最后交易日:', calendar.previous_trading_day('2025-10-05').date())
+    for frequency in ['1d', '1w', '1M', '60m']:
+        print(f"2025-01-01 至 2025-12-31 的 {frequency} K线根数:",
+              calendar.bars_between('2024-12-31', '2025-12-31', frequency))
+
+
+if __name__ == "__main__":
+    main()